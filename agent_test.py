@@ -7,13 +7,28 @@ interface, but cannot be automatically assessed for correctness.
 STUDENTS SHOULD NOT NEED TO MODIFY THIS CODE.  IT WOULD BE BEST TO TREAT THIS
 FILE AS A BLACK BOX FOR TESTING.
 """
+import argparse
+import json
+import math
+import os
+import pickle
 import random
+import tempfile
 import unittest
+import unittest.mock
+import time
 import timeit
 import sys
 
+import datagen
 import isolation
 import game_agent
+import sample_players
+import tournament
+import tuner
+
+from isolation import batch
+from isolation.endgame import EndgameSolver
 
 from collections import Counter
 from copy import deepcopy
@@ -545,5 +560,738 @@ class Project1Test(unittest.TestCase):
                 legal_moves, chosen_move))
 
 
+class InPlaceSearchTest(unittest.TestCase):
+
+    def test_in_place_matches_forecast(self):
+        """ Walking one board in place gives the same result as copying it """
+        for method in ("minimax", "alphabeta"):
+            agentUT = game_agent.CustomPlayer(4, game_agent.custom_score_weighted,
+                                              False, method)
+            agentUT.time_left = lambda: 1e3
+            results = []
+            for board_cls in (isolation.Board, CounterBoard):
+                board = board_cls(agentUT, 'null_agent', 7, 7)
+                for move in [(3, 3), (0, 0), (1, 2), (2, 2)]:
+                    board.apply_move(move)
+                before = board.to_string()
+                results.append(getattr(agentUT, method)(board, 4))
+                self.assertEqual(board.to_string(), before)
+            self.assertEqual(results[0], results[1])
+
+
+class TranspositionTableTest(unittest.TestCase):
+
+    def test_replacement_policy(self):
+        """ Deep entries are kept, shallower ones go to the other slot """
+        table = game_agent.TranspositionTable(size_mb=0)
+        self.assertEqual(table.num_buckets, 1)
+        table.store(1, 5, game_agent.EXACT, 1., (0, 0))
+        table.store(2, 3, game_agent.LOWER, 2., (1, 1))
+        table.store(3, 2, game_agent.UPPER, 3., (2, 2))
+        self.assertEqual(table.lookup(1)[1:], (5, game_agent.EXACT, 1., (0, 0)))
+        self.assertIsNone(table.lookup(2))
+        self.assertEqual(table.lookup(3)[3], 3.)
+        table.store(4, 6, game_agent.EXACT, 4., (3, 3))
+        self.assertIsNone(table.lookup(1))
+        self.assertEqual((table.hits, table.misses, table.overwrites), (2, 2, 2))
+
+    def test_aging(self):
+        """ Entries of an earlier search give way to any new result """
+        table = game_agent.TranspositionTable(size_mb=0)
+        table.store(1, 5, game_agent.EXACT, 1., (0, 0))
+        table.new_search()
+        self.assertEqual(table.peek(1)[1], 5)
+        table.store(2, 1, game_agent.EXACT, 2., (1, 1))
+        self.assertIsNone(table.peek(1))
+        table.store(3, 0, game_agent.EXACT, 3., (2, 2))
+        self.assertEqual(table.peek(2)[3], 2.)
+        self.assertEqual(table.peek(3)[3], 3.)
+        self.assertEqual((table.hits, table.misses), (0, 0))
+
+    def test_reuse_across_turns(self):
+        """ A later turn starts deeper and searches the predicted move first """
+        agentUT = game_agent.CustomPlayer(score_fn=game_agent.custom_score_weighted,
+                                          method="alphabeta", tt_size_mb=1,
+                                          move_ordering=True, collect_stats=True)
+        board = isolation.Board(agentUT, 'null_agent', 7, 7)
+        board.apply_move((3, 3))
+        board.apply_move((0, 0))
+        start = curr_time_millis()
+        move = agentUT.get_move(board, board.get_legal_moves(),
+                                lambda: 100 - (curr_time_millis() - start))
+        pv = agentUT.principal_variation
+        self.assertEqual(pv[0], move)
+        self.assertGreater(len(pv), 2)
+        board.apply_move(pv[0])
+        board.apply_move(pv[1])
+        agentUT._start_turn(board)
+        self.assertEqual(agentUT._root_best, pv[2])
+        start_depth, start_move = agentUT._start_depth(board, board.get_legal_moves())
+        self.assertGreater(start_depth, 1)
+        self.assertEqual(start_move, pv[2])
+
+    def test_search_with_table(self):
+        """ alphabeta returns the same scores with a transposition table """
+        agents = [game_agent.CustomPlayer(5, game_agent.custom_score_weighted,
+                                          False, "alphabeta", tt_size_mb=size)
+                  for size in (0, 1)]
+        results = []
+        for agentUT in agents:
+            agentUT.time_left = lambda: 1e3
+            board = isolation.Board(agentUT, 'null_agent', 7, 7)
+            for move in [(3, 3), (0, 0), (1, 2), (2, 2)]:
+                board.apply_move(move)
+            results.append([agentUT.alphabeta(board, depth)[0] for depth in range(1, 6)])
+        self.assertEqual(results[0], results[1])
+        self.assertGreater(agents[1].tt.hits, 0)
+
+    def test_table_lifetime(self):
+        """ Entries survive get_move calls but not the start of a new game """
+        agentUT = game_agent.CustomPlayer(3, game_agent.custom_score_weighted,
+                                          False, "alphabeta", tt_size_mb=1)
+        board = isolation.Board(agentUT, 'null_agent', 7, 7)
+        board.apply_move((3, 3))
+        board.apply_move((0, 0))
+        agentUT.get_move(board, board.get_legal_moves(), lambda: 1e3)
+        stored = len(agentUT.tt)
+        self.assertGreater(stored, 0)
+        board.apply_move(board.get_legal_moves()[0])
+        board.apply_move(board.get_legal_moves()[0])
+        agentUT.get_move(board, board.get_legal_moves(), lambda: 1e3)
+        self.assertGreater(len(agentUT.tt), stored)
+        agentUT.search_depth = 0
+        board = isolation.Board(agentUT, 'null_agent', 7, 7)
+        agentUT.get_move(board, board.get_legal_moves(), lambda: 1e3)
+        self.assertEqual(len(agentUT.tt), 1)
+
+
+class MoveOrderingTest(unittest.TestCase):
+
+    def search(self, **kwargs):
+        """ Run iterative deepening to depth 7 on a fixed position and return
+        the scores and node counts of every completed depth """
+        agentUT = game_agent.CustomPlayer(7, game_agent.custom_score_weighted,
+                                          False, "alphabeta", **kwargs)
+        agentUT.time_left = lambda: 1e3
+        board = CounterBoard(agentUT, 'null_agent', 7, 7)
+        for move in [(3, 3), (0, 0), (1, 2), (2, 2)]:
+            board.apply_move(move)
+        agentUT._start_turn(board)
+        scores, counts = [], []
+        for depth in range(1, 8):
+            board.counter.clear()
+            score, agentUT._root_best = agentUT.alphabeta(board, depth)
+            scores.append(score)
+            counts.append(board.counts[0])
+        return scores, counts
+
+    def test_ordering_reduces_nodes(self):
+        """ Move ordering keeps the scores and expands fewer nodes """
+        scores, counts = self.search()
+        for options in [{"move_ordering": True},
+                        {"move_ordering": True, "static_ordering": True},
+                        {"move_ordering": True, "tt_size_mb": 1}]:
+            ordered_scores, ordered_counts = self.search(**options)
+            self.assertEqual(scores, ordered_scores)
+            self.assertLess(sum(ordered_counts), sum(counts))
+
+
+class PrincipalVariationSearchTest(unittest.TestCase):
+
+    def test_pvs_matches_alphabeta(self):
+        """ pvs and aspiration_search return the alphabeta scores """
+        for options in [{}, {"move_ordering": True, "tt_size_mb": 1}]:
+            agentUT = game_agent.CustomPlayer(5, game_agent.custom_score_weighted,
+                                              False, "pvs", **options)
+            agentUT.time_left = lambda: 1e3
+            board = isolation.Board(agentUT, 'null_agent', 7, 7)
+            for move in [(3, 3), (0, 0), (1, 2), (2, 2)]:
+                board.apply_move(move)
+            agentUT._start_turn(board)
+            for depth in range(1, 6):
+                expected, _ = agentUT.alphabeta(board, depth)
+                self.assertEqual(agentUT.pvs(board, depth)[0], expected)
+                for guess in (expected - 5, expected, expected + 0.5):
+                    score, move = agentUT.aspiration_search(board, depth, guess)
+                    self.assertEqual(score, expected)
+                    self.assertIn(move, board.get_legal_moves())
+
+    def test_get_move_pvs(self):
+        """ get_move returns a legal move with the pvs method """
+        agentUT = game_agent.CustomPlayer(3, game_agent.custom_score_weighted,
+                                          True, "pvs", move_ordering=True)
+        board = isolation.Board(agentUT, 'null_agent', 7, 7)
+        board.apply_move((3, 3))
+        board.apply_move((0, 0))
+        start = curr_time_millis()
+        legal_moves = board.get_legal_moves()
+        move = agentUT.get_move(board, legal_moves,
+                                lambda: 100 - (curr_time_millis() - start))
+        self.assertIn(move, legal_moves)
+
+
+class ParallelSearchTest(unittest.TestCase):
+
+    def test_root_moves_match_alphabeta(self):
+        """ searching every root move gives the alphabeta score """
+        agentUT = game_agent.CustomPlayer(4, game_agent.custom_score_weighted,
+                                          False, "alphabeta")
+        agentUT.time_left = lambda: 1e3
+        board = isolation.Board(agentUT, 'null_agent', 7, 7)
+        for move in [(3, 3), (0, 0), (1, 2)]:
+            board.apply_move(move)
+        moves = board.get_legal_moves()
+        for depth in range(1, 5):
+            expected, _ = agentUT.alphabeta(board, depth)
+            score, move = agentUT.search_root_moves(board, moves, depth)
+            self.assertEqual(score, expected)
+            self.assertIn(move, moves)
+
+    def test_get_move_workers(self):
+        """ get_move returns a legal move in time with worker processes """
+        agentUT = game_agent.CustomPlayer(3, game_agent.custom_score_weighted,
+                                          True, "alphabeta", workers=2)
+        try:
+            board = isolation.Board(agentUT, 'null_agent', 7, 7)
+            board.apply_move((3, 3))
+            board.apply_move((0, 0))
+            for _ in range(2):
+                start = curr_time_millis()
+                time_left = lambda: 200 - (curr_time_millis() - start)
+                legal_moves = board.get_legal_moves()
+                move = agentUT.get_move(board, legal_moves, time_left)
+                self.assertGreater(time_left(), 0)
+                self.assertIn(move, legal_moves)
+                board.apply_move(move)
+                board.apply_move(board.get_legal_moves()[0])
+        finally:
+            agentUT.close()
+
+    def test_worker_keeps_player(self):
+        """ workers get the player once, without the contents of its table,
+        and keep their own table from one turn to the next """
+        agentUT = game_agent.CustomPlayer(3, game_agent.custom_score_weighted,
+                                          True, "alphabeta", tt_size_mb=16, workers=2)
+        state = pickle.dumps(agentUT)
+        self.assertLess(len(state), 10000)
+        game_agent.init_search_worker(pickle.loads(state))
+        worker = game_agent._search_worker['player']
+        self.assertEqual(worker.tt.size_mb, 16)
+
+        board = isolation.Board(agentUT, 'null_agent', 7, 7)
+        board.apply_move((3, 3))
+        board.apply_move((0, 0))
+        for _ in range(2):
+            moves = board.get_legal_moves()
+            snapshot = game_agent.board_snapshot(board, agentUT)
+            results = game_agent.search_root_split(snapshot, moves[::2], time.monotonic() + 0.05)
+            self.assertTrue(results)
+            self.assertIn(results[-1][1], moves[::2])
+            self.assertGreater(worker.tt.stores, 0)
+            board.apply_move(results[-1][1])
+            board.apply_move(board.get_legal_moves()[0])
+        # the second turn aged the entries of the first one instead of
+        # starting a new game
+        self.assertEqual(worker.tt.generation, 1)
+
+    def test_merge_proven_shares(self):
+        """ a share proven lost or won early does not cap the depth of the
+        other shares """
+        inf = float("inf")
+        lost = [(1., (0, 0)), (-2., (0, 0)), (-inf, (0, 0))]
+        deep = [(1., (1, 1)), (2., (1, 2)), (0., (1, 2)), (3., (1, 1)), (-1., (2, 2))]
+        shallow = [(0., (3, 3)), (5., (3, 4)), (4., (3, 4)), (1., (3, 3))]
+        self.assertEqual(game_agent.merge_root_splits([lost, deep, shallow]),
+                         (4, (3., (1, 1))))
+        won = [(1., (4, 4)), (inf, (4, 5))]
+        self.assertEqual(game_agent.merge_root_splits([lost, won, deep]),
+                         (5, (inf, (4, 5))))
+        # every share is proven lost
+        self.assertEqual(game_agent.merge_root_splits([lost]), (3, (-inf, (0, 0))))
+        # a worker that timed out before completing any depth
+        self.assertEqual(game_agent.merge_root_splits([lost, deep, []]),
+                         (0, (-1., (2, 2))))
+        self.assertEqual(game_agent.merge_root_splits([[], []]), (0, None))
+
+
+class OpeningBookTest(unittest.TestCase):
+
+    def test_get_move_book(self):
+        """ get_move plays the book move without searching """
+        handle, path = tempfile.mkstemp(suffix=".bin")
+        os.close(handle)
+        try:
+            board = isolation.Board("Player1", "Player2", 7, 7)
+            board.apply_move((2, 2))
+            isolation.write_book(path, [(board, (6, 6))])
+
+            agentUT = game_agent.CustomPlayer(book=path)
+            board = isolation.Board('null_agent', agentUT, 7, 7)
+            board.apply_move((4, 4))
+            move = agentUT.get_move(board, board.get_legal_moves(), lambda: -1)
+            self.assertEqual(move, (0, 0))
+        finally:
+            os.remove(path)
+
+
+class EndgameTest(unittest.TestCase):
+
+    def test_separated_positions(self):
+        """ alphabeta and get_move answer separated endgames instantly """
+        agentUT = game_agent.CustomPlayer(3, game_agent.custom_score_weighted,
+                                          True, "alphabeta", endgame_cells=20)
+        rng = random.Random(7)
+        solved = 0
+        while solved < 5:
+            board = isolation.Board(agentUT, 'null_agent', 7, 7)
+            while board.get_legal_moves():
+                if board.active_player is agentUT:
+                    result = agentUT.endgame.solve(board)
+                    if result is not None:
+                        break
+                board.apply_move(rng.choice(board.get_legal_moves()))
+            else:
+                continue
+            solved += 1
+            wins, move = result
+            agentUT.time_left = lambda: 1e3
+            score, _ = agentUT.alphabeta(board, 3)
+            self.assertEqual(score, float("inf") if wins else float("-inf"))
+            self.assertEqual(agentUT.get_move(board, board.get_legal_moves(), lambda: 1e3),
+                             move)
+
+
+class SearchStatsTest(unittest.TestCase):
+
+    def test_stats_file(self):
+        """ get_move records its search and appends it to the stats file """
+        handle, path = tempfile.mkstemp(suffix=".jsonl")
+        os.close(handle)
+        try:
+            agentUT = game_agent.CustomPlayer(3, game_agent.custom_score_weighted,
+                                              True, "alphabeta", tt_size_mb=1,
+                                              move_ordering=True, stats_file=path)
+            board = isolation.Board(agentUT, 'null_agent', 7, 7)
+            board.apply_move((3, 3))
+            board.apply_move((0, 0))
+            for _ in range(2):
+                start = curr_time_millis()
+                move = agentUT.get_move(board, board.get_legal_moves(),
+                                        lambda: 50 - (curr_time_millis() - start))
+                stats = agentUT.stats
+                self.assertEqual((stats.move, stats.source), (move, 'search'))
+                self.assertEqual(stats.depth, agentUT.depth_reached)
+                # later turns may start deeper, from the transposition table
+                depths = [it['depth'] for it in stats.iterations]
+                self.assertEqual(depths, list(range(depths[0], stats.depth + 1)))
+                self.assertLessEqual(sum(it["nodes"] for it in stats.iterations), stats.nodes)
+                self.assertGreater(stats.nodes, stats.leaves)
+                self.assertEqual(sum(stats.cutoff_index), stats.cutoffs)
+                self.assertGreater(stats.tt_probes, stats.tt_hits)
+                board.apply_move(move)
+                board.apply_move(board.get_legal_moves()[0])
+
+            with open(path) as f:
+                lines = [json.loads(line) for line in f]
+            self.assertEqual(len(lines), 2)
+            self.assertEqual(lines[-1], json.loads(json.dumps(stats.as_dict())))
+        finally:
+            os.remove(path)
+
+    def test_proven_scores(self):
+        """ proven wins and losses are written as strict JSON """
+        stats = game_agent.SearchStats(10)
+        stats.end_iteration(1, 2.5, (0, 0))
+        stats.end_iteration(2, float("-inf"), (0, 0))
+        stats.end_iteration(3, float("inf"), (1, 2))
+        stats.finish((1, 2), 'search')
+        text = json.dumps(stats.as_dict(), allow_nan=False)
+        self.assertNotIn("Infinity", text)
+        loaded = json.loads(text)
+        self.assertEqual(loaded['score'], 'inf')
+        self.assertEqual([it['score'] for it in loaded['iterations']], [2.5, '-inf', 'inf'])
+        self.assertEqual(stats.score, float("inf"))
+
+    def test_stats_off(self):
+        """ no statistics are kept unless asked for """
+        agentUT = game_agent.CustomPlayer(3, game_agent.custom_score_weighted,
+                                          False, "alphabeta")
+        board = isolation.Board(agentUT, 'null_agent', 7, 7)
+        board.apply_move((3, 3))
+        board.apply_move((0, 0))
+        agentUT.get_move(board, board.get_legal_moves(), lambda: 1e3)
+        self.assertIsNone(agentUT.stats)
+
+
+class DeadlineClockTest(unittest.TestCase):
+
+    def test_clock(self):
+        """ the clock counts down to the deadline and skips most readings """
+        start = curr_time_millis()
+        clock = game_agent.DeadlineClock(lambda: 20 - (curr_time_millis() - start), 1.)
+        values = [clock.time_left()]
+        while values[-1] > 0:
+            values.append(clock.time_left())
+        self.assertEqual(values, sorted(values, reverse=True))
+        self.assertLess(clock.readings * 10, len(values))
+        # the loop only ends once the deadline has passed
+        self.assertGreater(curr_time_millis() - start, 20)
+
+    def test_get_move(self):
+        """ get_move returns in time when it reads the clock every few nodes """
+        agentUT = game_agent.CustomPlayer(3, game_agent.custom_score_weighted,
+                                          True, "alphabeta", adaptive_clock=True,
+                                          collect_stats=True)
+        board = isolation.Board(agentUT, 'null_agent', 7, 7)
+        board.apply_move((3, 3))
+        board.apply_move((0, 0))
+        start = curr_time_millis()
+        time_left = lambda: 100 - (curr_time_millis() - start)
+        legal_moves = board.get_legal_moves()
+        self.assertIn(agentUT.get_move(board, legal_moves, time_left), legal_moves)
+        self.assertGreater(time_left(), 0)
+        self.assertLess(agentUT.clock.readings, agentUT.stats.nodes)
+
+    def separated_positions(self, agentUT, count):
+        """ return separated late positions, with `agentUT` to move, that
+        take the endgame solver long enough to check the time """
+        rng = random.Random(3)
+        positions = []
+        while len(positions) < count:
+            board = isolation.Board("Player1", "Player2", 7, 7)
+            moves = []
+            while board.get_legal_moves():
+                checks = []
+                if 49 - board.move_count <= 20 and \
+                        EndgameSolver(20).solve(board, lambda: checks.append(1)) is not None:
+                    break
+                moves.append(rng.choice(board.get_legal_moves()))
+                board.apply_move(moves[-1])
+            if not checks:
+                continue
+            players = [agentUT, "null_agent"]
+            if len(moves) % 2:
+                players.reverse()
+            board = isolation.Board(players[0], players[1], 7, 7)
+            for move in moves:
+                board.apply_move(move)
+            positions.append(board)
+        return positions
+
+    def test_endgame_reads_clock(self):
+        """ the endgame solver reads the clock instead of the last reading of
+        the adaptive clock, and the search reads the clock again after it """
+        agentUT = game_agent.CustomPlayer(3, game_agent.custom_score_weighted,
+                                          True, "alphabeta", adaptive_clock=True,
+                                          endgame_cells=20)
+        for board in self.separated_positions(agentUT, 3):
+            agentUT.endgame.clear()
+            agentUT.clock = game_agent.DeadlineClock(lambda: 1e3)
+            agentUT.time_left = agentUT.clock.time_left
+            self.assertGreater(agentUT.time_left(), 900)
+            agentUT.clock.deadline = time.perf_counter()
+            self.assertRaises(game_agent.Timeout, agentUT._solve_endgame, board, True)
+            self.assertIs(agentUT.time_left, agentUT.clock.time_left)
+            self.assertLess(agentUT.time_left(), 0)
+
+    def test_get_move_endgame(self):
+        """ get_move returns in time from late, separated positions """
+        agentUT = game_agent.CustomPlayer(3, game_agent.custom_score_weighted,
+                                          True, "alphabeta", move_ordering=True,
+                                          adaptive_clock=True, endgame_cells=20)
+        for board in self.separated_positions(agentUT, 3):
+            agentUT.endgame.clear()
+            start = curr_time_millis()
+            time_left = lambda: 60 - (curr_time_millis() - start)
+            legal_moves = board.get_legal_moves()
+            self.assertIn(agentUT.get_move(board, legal_moves, time_left), legal_moves)
+            self.assertGreater(time_left(), 0)
+
+
+class PonderTest(unittest.TestCase):
+
+    def test_ponder(self):
+        """ replies are searched on the opponent's time and reused """
+        agentUT = game_agent.CustomPlayer(score_fn=game_agent.custom_score_weighted,
+                                          method="alphabeta", move_ordering=True,
+                                          ponder=True, collect_stats=True)
+        rng = random.Random(0)
+        try:
+            board = isolation.Board(agentUT, 'null_agent', 7, 7)
+            board.apply_move((3, 3))
+            board.apply_move((2, 4))
+            for turn in range(3):
+                pondered = None
+                if turn:
+                    # the opponent thinks until its reply has been searched
+                    # as deep as the last search reached, then plays it
+                    reply = rng.choice([move for move in board.get_legal_moves()
+                                        if board.forecast_move(move).get_legal_moves()])
+                    key = board.forecast_move(reply).hash_key
+                    required = max(agentUT.depth_reached, 1)
+                    ponderer = agentUT._ponderer
+                    waited = 0
+                    while ponderer.results.get(key, (0,))[0] < required and waited < 1000:
+                        ponderer._collect(0.01)
+                        waited += 1
+                    ponderer.stop(1.)
+                    board.apply_move(reply)
+                    pondered = ponderer.results[key]
+                    self.assertGreaterEqual(pondered[0], required)
+                start = curr_time_millis()
+                time_left = lambda: 50 - (curr_time_millis() - start)
+                legal_moves = board.get_legal_moves()
+                move = agentUT.get_move(board, legal_moves, time_left)
+                self.assertIn(move, legal_moves)
+                stats = agentUT.stats
+                if pondered is None:
+                    self.assertEqual(stats.source, 'search')
+                else:
+                    self.assertEqual(stats.source, 'ponder')
+                    self.assertEqual(move, pondered[2])
+                    self.assertEqual(stats.depth, pondered[0])
+                    self.assertEqual(agentUT.depth_reached, pondered[0])
+                board.apply_move(move)
+        finally:
+            agentUT.close()
+        self.assertIsNone(agentUT._ponderer)
+
+
+@unittest.skipIf(batch.np is None, "NumPy is not installed")
+class BatchEvaluationTest(unittest.TestCase):
+
+    HEURISTICS = [sample_players.null_score, sample_players.open_move_score,
+                  sample_players.improved_score, game_agent.custom_score_weighted,
+                  game_agent.custom_score_opponent]
+
+    def test_batch_matches_scalar(self):
+        """ batch versions return the scalar scores of every child """
+        for seed in range(5):
+            rng = random.Random(seed)
+            board = isolation.Board("Player1", "Player2", 7, 7)
+            while board.get_legal_moves():
+                moves = board.get_legal_moves()
+                for score_fn in self.HEURISTICS:
+                    for player in ("Player1", "Player2"):
+                        expected = [score_fn(board.forecast_move(m), player) for m in moves]
+                        self.assertEqual(score_fn.batch(board, player, moves), expected)
+                board.apply_move(rng.choice(moves))
+
+    def test_search_matches_scalar(self):
+        """ alphabeta returns the same results with batched leaves """
+        agentUT = game_agent.CustomPlayer(4, sample_players.improved_score,
+                                          False, "alphabeta", batch_leaves=True)
+        agentUT.time_left = lambda: 1e3
+        agentUT.BATCH_MIN_MOVES = 1
+        board = isolation.Board(agentUT, 'null_agent', 7, 7)
+        for move in [(3, 3), (0, 0), (1, 2), (2, 2)]:
+            board.apply_move(move)
+        for depth in range(1, 5):
+            scores = agentUT.alphabeta(board, depth)
+            # a wrapper has no batch version, so every leaf is scored alone
+            agentUT.score = lambda game, player: sample_players.improved_score(game, player)
+            self.assertEqual(agentUT.alphabeta(board, depth), scores)
+            agentUT.score = sample_players.improved_score
+
+
+class ListRecorder(list):
+    """ RecordWriter stand-in that keeps the game records in memory """
+
+    def write(self, record):
+        self.append(record)
+
+
+class TournamentTest(unittest.TestCase):
+
+    def test_seeded_round(self):
+        """ a seeded round plays the same games sequentially and in a pool """
+        agents = [tournament.Agent(sample_players.RandomPlayer(), "Random"),
+                  tournament.Agent(game_agent.CustomPlayer(
+                      1, sample_players.open_move_score, False, "alphabeta"), "AB_Open"),
+                  tournament.Agent(game_agent.CustomPlayer(
+                      1, sample_players.improved_score, False, "alphabeta"), "AB")]
+        rounds = []
+        for workers in (1, 1, 2):
+            recorder = ListRecorder()
+            # the pool is limited to the available cores; pretend there are
+            # two so that it is used on any machine
+            with unittest.mock.patch.object(tournament, "available_cores",
+                                            return_value=[0, 0]):
+                score = tournament.play_round(agents, 2, workers=workers, seed=5,
+                                              recorder=recorder)
+            rounds.append((score, recorder))
+        # two opponents, both orders, two matches of two games
+        self.assertEqual(len(rounds[0][1]), 2 * 2 * 2 * 2)
+        self.assertEqual(rounds[0], rounds[1])
+        self.assertEqual(rounds[0], rounds[2])
+        other = ListRecorder()
+        tournament.play_round(agents, 2, seed=6, recorder=other)
+        self.assertNotEqual([record.moves for record in other],
+                            [record.moves for record in rounds[0][1]])
+
+
+class SprtTest(unittest.TestCase):
+
+    def test_elo_conversions(self):
+        """ elo_difference() inverts expected_score() """
+        self.assertEqual(tournament.expected_score(0.), 0.5)
+        for elo in (-600., -100., 0., 35., 400.):
+            self.assertAlmostEqual(tournament.elo_difference(tournament.expected_score(elo)), elo)
+        for score in (0.01, 0.25, 0.5, 0.9):
+            self.assertAlmostEqual(tournament.expected_score(tournament.elo_difference(score)),
+                                   score)
+
+    def test_elo_estimate(self):
+        """ estimates are antisymmetric, and finite for clean sweeps """
+        self.assertEqual(tournament.elo_estimate(10, 10)[0], 0.)
+        elo, error = tournament.elo_estimate(15, 5)
+        mirrored = tournament.elo_estimate(5, 15)
+        self.assertAlmostEqual(mirrored[0], -elo)
+        self.assertAlmostEqual(mirrored[1], error)
+        self.assertAlmostEqual(elo, tournament.elo_difference(0.75))
+        self.assertGreater(error, 0.)
+        sweep, error = tournament.elo_estimate(8, 0)
+        self.assertTrue(elo < sweep < float("inf"))
+        self.assertRaises(ValueError, tournament.elo_estimate, 0, 0)
+
+    def test_llr_bounds(self):
+        """ a clean sweep accepts H1, and a whitewash H0, after the number of
+        games the log-likelihood ratio per game implies """
+        alpha = beta = 0.05
+        lower, upper = math.log(beta / (1. - alpha)), math.log((1. - beta) / alpha)
+        win = tournament.sprt_llr(1, 0, 0., 100.)
+        loss = tournament.sprt_llr(0, 1, 0., 100.)
+        self.assertGreater(win, 0.)
+        self.assertLess(loss, 0.)
+        games = [n for n in range(1, 100) if tournament.sprt_llr(n, 0, 0., 100.) >= upper]
+        self.assertEqual(games[0], math.ceil(upper / win))
+        games = [n for n in range(1, 100) if tournament.sprt_llr(0, n, 0., 100.) <= lower]
+        self.assertEqual(games[0], math.ceil(lower / loss))
+        # results at the midpoint of the hypotheses favour neither much
+        self.assertTrue(lower < tournament.sprt_llr(14, 11, 0., 100.) < upper)
+
+    def test_sprt_round(self):
+        """ a round against a random player stops once the test decides,
+        and rounds of no matches are rejected """
+        agents = [tournament.Agent(sample_players.RandomPlayer(), "Random"),
+                  tournament.Agent(game_agent.CustomPlayer(
+                      2, sample_players.improved_score, False, "alphabeta"), "AB")]
+        _, outcomes = tournament.play_round_sprt(agents, seed=0, elo0=0., elo1=100.,
+                                                 max_matches=30)
+        outcome = outcomes[0]
+        self.assertEqual(outcome["decision"], "H1")
+        self.assertGreaterEqual(outcome["llr"], math.log(19.))
+        self.assertLess(outcome["wins"] + outcome["losses"], 60)
+        self.assertRaises(ValueError, tournament.play_round_sprt, agents, max_matches=0)
+        self.assertRaises(argparse.ArgumentTypeError, tournament.positive_int, "0")
+
+
+class DatagenTest(unittest.TestCase):
+
+    SETTINGS = {"games_per_shard": 2, "depth": 1, "width": 5, "height": 5,
+                "random_plies": 2, "sample": 1.}
+
+    def test_generate_and_resume(self):
+        """ shards hold valid positions and a resumed run keeps them """
+        with tempfile.TemporaryDirectory() as directory:
+            total = datagen.generate(directory, 30, **self.SETTINGS)
+            self.assertGreaterEqual(total, 30)
+            with open(datagen.shard_path(directory, 0), "rb") as f:
+                first = f.read()
+
+            positions = datagen.load_shards(directory)
+            self.assertEqual(sum(len(shard) for shard in positions), total)
+            shard = positions[0]
+            self.assertEqual(len(shard), len(first) // datagen.RECORD.size)
+            self.assertTrue(((shard["location_1"] >= 0) & (shard["location_1"] < 25)).all())
+            self.assertTrue((shard["active"] == shard["move_count"] % 2).all())
+            self.assertTrue(set(shard["winner"]) <= {0, 1})
+            self.assertTrue((shard["depth"] == 2).all())
+            self.assertEqual(bin(int(shard["blocked"][0])).count("1"), shard["move_count"][0])
+
+            # an interrupted shard is dropped and generated again
+            with open(datagen.shard_path(directory, 99) + ".tmp", "wb") as f:
+                f.write(b"partial")
+            resumed = datagen.generate(directory, total + 30, **self.SETTINGS)
+            self.assertGreaterEqual(resumed, total + 30)
+            with open(datagen.shard_path(directory, 0), "rb") as f:
+                self.assertEqual(f.read(), first)
+            self.assertFalse([name for name in os.listdir(directory) if name.endswith(".tmp")])
+            self.assertEqual(datagen.generate(directory, 10, **self.SETTINGS), resumed)
+
+            self.assertRaises(ValueError, datagen.generate, directory, 10,
+                              **dict(self.SETTINGS, depth=2))
+
+
+class TunerTest(unittest.TestCase):
+
+    def random_positions(self, count, seed=0):
+        """ Return boards of random games with both players on the board """
+        rng = random.Random(seed)
+        boards = []
+        while len(boards) < count:
+            board = isolation.Board("Player1", "Player2", 7, 7)
+            while board.get_legal_moves():
+                board.apply_move(rng.choice(board.get_legal_moves()))
+                if board.move_count >= 2 and board.get_legal_moves():
+                    boards.append(board.copy())
+        return boards[:count]
+
+    def write_shard(self, directory, boards, winners):
+        with open(datagen.shard_path(directory, 0), "wb") as f:
+            for board, winner in zip(boards, winners):
+                locations = [r * 7 + c for r, c in board._slot_locations()]
+                f.write(datagen.RECORD.pack(board._blocked_mask(), locations[0], locations[1],
+                                            board._active_slot(), winner, 7, 7,
+                                            board.move_count, 0., 1))
+
+    def test_features_match_scalar_score(self):
+        """ the vectorised features give the scores of the scalar heuristic """
+        boards = self.random_positions(300)
+        with tempfile.TemporaryDirectory() as directory:
+            self.write_shard(directory, boards, [0] * len(boards))
+            positions = datagen.load_shards(directory)[0]
+            values = tuner.position_features(positions, tuner.FEATURES)
+        for features, weights in tuner.PRESETS.values():
+            score_fn = tuner.LinearScore(features, weights)
+            columns = [tuner.FEATURES.index(name) for name in features]
+            for board, row in zip(boards, values):
+                self.assertAlmostEqual(score_fn(board, board.active_player),
+                                       float(row[columns] @ weights))
+        weighted = tuner.LinearScore(*tuner.PRESETS["weighted"])
+        for board in boards[:50]:
+            self.assertEqual(weighted(board, "Player1"),
+                             game_agent.custom_score_weighted(board, "Player1"))
+
+    def test_recovers_weights(self):
+        """ the fit recovers the weights that generated the game results,
+        and the exported score function survives pickling """
+        boards = self.random_positions(4000, seed=1)
+        rng = random.Random(2)
+        winners = []
+        for board in boards:
+            player, opponent = board.active_player, board.inactive_player
+            logit = 0.5 * len(board.get_legal_moves(player)) - \
+                0.3 * len(board.get_legal_moves(opponent))
+            won = rng.random() < 1. / (1. + math.exp(-logit))
+            winners.append(board._active_slot() if won else 1 - board._active_slot())
+        with tempfile.TemporaryDirectory() as directory:
+            self.write_shard(directory, boards, winners)
+            output = os.path.join(directory, "weights.json")
+            result = tuner.tune(directory, ("own_moves", "opp_moves"), (9., -1.), output)
+            score_fn = tuner.load_score(output)
+        self.assertEqual(result["positions"], len(boards))
+        self.assertAlmostEqual(result["weights"][0], 0.5, delta=0.15)
+        self.assertAlmostEqual(result["weights"][1], -0.3, delta=0.15)
+        self.assertLessEqual(result["loss"], result["baseline"]["loss"])
+
+        clone = pickle.loads(pickle.dumps(score_fn))
+        self.assertEqual(clone.weights, score_fn.weights)
+        board = boards[0]
+        moves = board.get_legal_moves()
+        self.assertEqual(clone.batch(board, "Player1", moves),
+                         [score_fn(board.forecast_move(m), "Player1") for m in moves])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,402 @@
+"""
+Measure the raw speed of the Isolation engine and of the search in
+`game_agent.CustomPlayer`. Unlike `tournament.py`, which only reports win
+ratios, these benchmarks report how much work is done per second so that
+changes to the board or the search can be compared directly.
+
+Usage:
+
+    python benchmark.py search      # nodes/sec of copying vs in-place search
+    python benchmark.py parallel    # depth reached vs number of workers
+    python benchmark.py memory      # bytes per board and copy() speed
+    python benchmark.py perft       # move generation counts and speed
+    python benchmark.py micro       # time of single board operations
+    python benchmark.py clock       # search gained by reading the clock less often
+
+Every benchmark can save its results with --json PATH. The perft and micro
+results can be compared with those of an earlier run with --baseline PATH,
+which flags everything that became slower than --tolerance allows; perft
+also fails if a node count differs from the expected one.
+"""
+
+import argparse
+import json
+import random
+import sys
+import timeit
+
+import game_agent
+import sample_players
+
+from isolation import Board
+from isolation import BitBoard
+from isolation import ENGINES
+from game_agent import CustomPlayer
+from sample_players import improved_score
+
+# perft positions: (width, height, opening moves, depth, expected count)
+PERFT_POSITIONS = [
+    (5, 5, (), 7, 190528),
+    (7, 7, ((3, 3), (2, 4)), 8, 187990),
+    (9, 9, ((4, 4), (3, 6)), 7, 152414),
+]
+
+# heuristics timed by the micro benchmark
+HEURISTICS = [sample_players.null_score,
+              sample_players.open_move_score,
+              sample_players.improved_score,
+              game_agent.custom_score,
+              game_agent.custom_score_weighted,
+              game_agent.custom_score_opponent,
+              game_agent.custom_score_distance,
+              game_agent.custom_score_symmetry,
+              game_agent.custom_score_territory]
+
+
+class CopyingBoard(Board):
+    """Board that always expands the search with forecast_move() (i.e., by
+    copying the board at every node), as the search did before boards
+    supported apply_move()/undo_move().
+    """
+
+    def forecast_move(self, move):
+        return super(CopyingBoard, self).forecast_move(move)
+
+
+def midgame_position(board_cls=Board, player_1="Player1", player_2="Player2",
+                     width=7, height=7, plies=16, seed=0):
+    """
+    Return a board reached by playing `plies` random moves from the empty
+    board. The moves only depend on `seed`, so every board class gets the
+    same position.
+    """
+    rng = random.Random(seed)
+    while True:
+        board = board_cls(player_1, player_2, width, height)
+        for _ in range(plies):
+            moves = board.get_legal_moves()
+            if not moves:
+                break
+            board.apply_move(rng.choice(moves))
+        else:
+            if board.get_legal_moves():
+                return board
+
+
+def count_nodes(agent, game, depth):
+    """ Return the number of nodes alphabeta() visits on `game` to `depth`. """
+    nodes = [0]
+    search = agent.alphabeta
+
+    def counting_search(*args, **kwargs):
+        nodes[0] += 1
+        return search(*args, **kwargs)
+
+    agent.alphabeta = counting_search
+    try:
+        agent.alphabeta(game, depth)
+    finally:
+        del agent.alphabeta
+    return nodes[0]
+
+
+def search_benchmark(depth=8, repeat=3, seed=0):
+    """
+    Time a fixed-depth alpha-beta search from a mid-game 7x7 position, once
+    with a board that is copied at every node and once with a board that is
+    walked in place, and return the nodes per second for both.
+    """
+    results = {}
+    for name, board_cls in [("forecast_move", CopyingBoard), ("in_place", Board)]:
+        agent = CustomPlayer(search_depth=depth, score_fn=improved_score,
+                             iterative=False, method='alphabeta')
+        agent.time_left = lambda: float("inf")
+        game = midgame_position(board_cls, agent, "Opponent", seed=seed)
+        nodes = count_nodes(agent, game, depth)
+        seconds = min(timeit.repeat(lambda: agent.alphabeta(game, depth),
+                                    number=1, repeat=repeat))
+        results[name] = {"nodes": nodes, "seconds": seconds,
+                         "nodes_per_sec": nodes / seconds}
+    return results
+
+
+def parallel_benchmark(workers=(1, 2, 4), time_limit=150, positions=5, seed=0):
+    """
+    Let an iterative deepening agent choose a move in several mid-game 7x7
+    positions with `time_limit` milliseconds per move, once for each number
+    of worker processes, and return the average depth it reached.
+    """
+    results = {}
+    for count in workers:
+        agent = CustomPlayer(score_fn=improved_score, method='alphabeta',
+                             workers=count)
+        depths = []
+        try:
+            for i in range(positions):
+                game = midgame_position(Board, agent, "Opponent", seed=seed + i)
+                end = timeit.default_timer() + time_limit / 1000.
+                agent.get_move(game, game.get_legal_moves(),
+                               lambda: 1000 * (end - timeit.default_timer()))
+                depths.append(agent.depth_reached)
+        finally:
+            agent.close()
+        results[count] = sum(depths) / len(depths)
+    return results
+
+
+def clock_benchmark(time_limit=150, positions=5, seed=0):
+    """
+    Let an iterative deepening agent choose a move in several mid-game 7x7
+    positions with `time_limit` milliseconds per move, once reading the clock
+    at every node and once through `game_agent.DeadlineClock`, and return
+    the average nodes searched and clock readings per move, the average
+    cost of one call of the agent's time_left, and the search time these
+    calls (one per node) take per move.
+
+    The clock is the one `Board.play` passes to get_move().
+    """
+    curr_time_millis = lambda: 1000 * timeit.default_timer()
+    results = {}
+    for name, adaptive in [("every_node", False), ("adaptive", True)]:
+        agent = CustomPlayer(score_fn=improved_score, method='alphabeta',
+                             collect_stats=True, adaptive_clock=adaptive)
+        nodes, readings = [], []
+        for i in range(positions):
+            game = midgame_position(Board, agent, "Opponent", seed=seed + i)
+            move_start = curr_time_millis()
+            time_left = lambda: time_limit - (curr_time_millis() - move_start)
+            agent.get_move(game, game.get_legal_moves(), time_left)
+            nodes.append(agent.stats.nodes)
+            readings.append(agent.clock.readings if adaptive else agent.stats.nodes)
+
+        call_us = min(timeit.repeat(agent.time_left, number=10000, repeat=3)) / 10000 * 1e6
+        results[name] = {"nodes": sum(nodes) / positions,
+                         "readings": sum(readings) / positions,
+                         "call_us": call_us,
+                         "clock_ms": sum(nodes) / positions * call_us / 1000}
+    return results
+
+
+def board_bytes(board):
+    """
+    Return the number of bytes owned by one board: the object itself and
+    every container and value it references, except the objects that all
+    boards share (the players, the move tables of the board size, None and
+    the interned small integers).
+    """
+    shared = {id(board._geometry), id(board.__player_1__), id(board.__player_2__)}
+    seen = set()
+
+    def size(obj):
+        if obj is None or id(obj) in shared or id(obj) in seen or \
+                (type(obj) is int and -5 <= obj <= 256):
+            return 0
+        seen.add(id(obj))
+        total = sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            total += sum(size(k) + size(v) for k, v in obj.items())
+        elif isinstance(obj, (list, tuple)):
+            total += sum(size(item) for item in obj)
+        return total
+
+    total = size(board)
+    if hasattr(board, "__dict__"):
+        total += size(board.__dict__)
+    for cls in type(board).__mro__:
+        for name in getattr(cls, "__slots__", ()):
+            if hasattr(board, name):
+                total += size(getattr(board, name))
+    return total
+
+
+def memory_benchmark(repeat=3, seed=0):
+    """
+    Measure the memory owned by a mid-game 7x7 board and the time taken by
+    its copy() for every board engine.
+    """
+    results = {}
+    for name, board_cls in [("board", Board), ("bitboard", BitBoard)]:
+        game = midgame_position(board_cls, "Player1", "Player2", seed=seed)
+        game.hash_key  # carry the key like a board in the middle of a search
+        seconds = min(timeit.repeat(game.copy, number=10000, repeat=repeat)) / 10000
+        results[name] = {"bytes": board_bytes(game), "copy_us": seconds * 1e6}
+    return results
+
+
+def perft(board, depth):
+    """
+    Return the number of distinct sequences of `depth` legal moves from the
+    game state of `board` (sequences that end the game early are not
+    counted). The board is walked in place and left unchanged.
+    """
+    moves = board.get_legal_moves()
+    if depth <= 1:
+        return len(moves) if depth == 1 else 1
+    nodes = 0
+    for move in moves:
+        board.apply_move(move)
+        nodes += perft(board, depth - 1)
+        board.undo_move()
+    return nodes
+
+
+def perft_benchmark():
+    """
+    Run perft on the PERFT_POSITIONS with every board engine and return one
+    result per engine and position, including whether the node count
+    matches the expected one.
+    """
+    results = []
+    for name, board_cls in sorted(ENGINES.items()):
+        for width, height, opening, depth, expected in PERFT_POSITIONS:
+            board = board_cls("Player1", "Player2", width, height)
+            for move in opening:
+                board.apply_move(move)
+            start = timeit.default_timer()
+            nodes = perft(board, depth)
+            seconds = timeit.default_timer() - start
+            results.append({"engine": name, "size": "{}x{}".format(width, height),
+                            "depth": depth, "nodes": nodes, "expected": expected,
+                            "seconds": seconds, "nodes_per_sec": nodes / seconds})
+    return results
+
+
+def micro_benchmark(number=2000, repeat=3, seed=0):
+    """
+    Time single board operations and every heuristic on a mid-game 7x7
+    position for every board engine. Returns the best time of `repeat`
+    runs in microseconds per call, by engine and operation.
+    """
+    results = {}
+    for name, board_cls in sorted(ENGINES.items()):
+        board = midgame_position(board_cls, "Player1", "Player2", seed=seed)
+        move = board.get_legal_moves()[0]
+
+        def apply_and_undo():
+            board.apply_move(move)
+            board.undo_move()
+
+        operations = [("get_legal_moves", board.get_legal_moves),
+                      ("apply_move+undo_move", apply_and_undo),
+                      ("copy", board.copy),
+                      ("forecast_move", lambda: board.forecast_move(move)),
+                      ("utility", lambda: board.utility("Player1"))]
+        operations += [(fn.__name__, lambda fn=fn: fn(board, "Player1")) for fn in HEURISTICS]
+
+        results[name] = {}
+        for operation, fn in operations:
+            seconds = min(timeit.repeat(fn, number=number, repeat=repeat))
+            results[name][operation] = seconds / number * 1e6
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare perft and micro results with those of an earlier run, and
+    return a line for every measurement that is more than `tolerance` (a
+    fraction, e.g., 0.1 for 10%) slower than in the baseline.
+    """
+    slower = []
+    if "perft" in results and "perft" in baseline:
+        before = {(r["engine"], r["size"], r["depth"]): r for r in baseline["perft"]}
+        for result in results["perft"]:
+            old = before.get((result["engine"], result["size"], result["depth"]))
+            if old and result["nodes_per_sec"] < old["nodes_per_sec"] / (1 + tolerance):
+                slower.append("perft {engine} {size}: {:.0f} -> {:.0f} nodes/sec".format(
+                    old["nodes_per_sec"], result["nodes_per_sec"], **result))
+    if "micro" in results and "micro" in baseline:
+        for engine, timings in results["micro"].items():
+            for operation, us in timings.items():
+                old = baseline["micro"].get(engine, {}).get(operation)
+                if old and us > old * (1 + tolerance):
+                    slower.append("micro {} {}: {:.2f} -> {:.2f} us".format(
+                        engine, operation, old, us))
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("benchmark", choices=["search", "parallel", "memory", "perft", "micro",
+                                              "clock"])
+    parser.add_argument("--depth", type=int, default=8,
+                        help="fixed search depth for the search benchmark")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="number of timed repetitions (the best is kept)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4],
+                        help="worker counts compared by the parallel benchmark")
+    parser.add_argument("--time-limit", type=int, default=150,
+                        help="milliseconds per move for the parallel and clock benchmarks")
+    parser.add_argument("--json", metavar="PATH",
+                        help="write the results to a JSON file")
+    parser.add_argument("--baseline", metavar="PATH",
+                        help="JSON results of an earlier run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="slowdown (fraction) tolerated against the baseline")
+    args = parser.parse_args()
+    results = {}
+    failed = False
+
+    if args.benchmark == "search":
+        results["search"] = search_benchmark(args.depth, args.repeat)
+        for name, result in results["search"].items():
+            print("{:<15}{:>10} nodes {:>10.3f} s {:>12.0f} nodes/sec".format(
+                name, result["nodes"], result["seconds"], result["nodes_per_sec"]))
+        print("speedup: {:.2f}x".format(results["search"]["in_place"]["nodes_per_sec"] /
+                                        results["search"]["forecast_move"]["nodes_per_sec"]))
+
+    if args.benchmark == "parallel":
+        results["parallel"] = parallel_benchmark(args.workers, args.time_limit)
+        for count, depth in results["parallel"].items():
+            print("{:>3} workers: average depth {:.1f}".format(count, depth))
+
+    if args.benchmark == "clock":
+        results["clock"] = clock_benchmark(args.time_limit)
+        for name, result in results["clock"].items():
+            print("{:<12}{:>10.0f} nodes/move {:>8.0f} clock readings/move "
+                  "{:>6.3f} us/call {:>6.2f} ms/move in time_left".format(
+                      name, result["nodes"], result["readings"], result["call_us"],
+                      result["clock_ms"]))
+        print("search nodes gained: {:+.1%}".format(
+            results["clock"]["adaptive"]["nodes"] / results["clock"]["every_node"]["nodes"] - 1))
+
+    if args.benchmark == "memory":
+        results["memory"] = memory_benchmark(args.repeat)
+        for name, result in results["memory"].items():
+            print("{:<10}{:>6} bytes per board {:>8.2f} us per copy()".format(
+                name, result["bytes"], result["copy_us"]))
+
+    if args.benchmark == "perft":
+        results["perft"] = perft_benchmark()
+        for result in results["perft"]:
+            ok = result["nodes"] == result["expected"]
+            failed = failed or not ok
+            print("{engine:<10}{size:>6} depth {depth}{nodes:>10} nodes {:>4} "
+                  "{seconds:>8.3f} s {nodes_per_sec:>10.0f} nodes/sec".format(
+                      "ok" if ok else "FAIL", **result))
+
+    if args.benchmark == "micro":
+        results["micro"] = micro_benchmark(repeat=args.repeat)
+        engines = sorted(results["micro"])
+        print("{:<28}".format("") + "".join("{:>12}".format(e) for e in engines))
+        for operation in results["micro"][engines[0]]:
+            print("{:<28}".format(operation) +
+                  "".join("{:>9.2f} us".format(results["micro"][e][operation]) for e in engines))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            slower = compare(results, json.load(f), args.tolerance)
+        for line in slower:
+            print("SLOWER " + line)
+        failed = failed or bool(slower)
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""
+Generate a dataset of labelled positions for tuning heuristics by playing
+CustomPlayer self-play games in a pool of processes.
+
+Each game starts with a few random moves, for variety, and is then played
+by two agents with a fixed-depth search. A sample of the searched positions
+is kept together with the search score and, once the game is over, the
+winner. The positions are written to shards of fixed-width binary records
+(`RECORD`, or `POSITION_DTYPE` for NumPy) in an output directory:
+
+    shard-00000.bin, shard-00001.bin, ...
+
+Every shard holds the games of one job, seeded from --seed and the shard
+number, and only appears once it is complete, so an interrupted run resumes
+where it stopped: the shards already written are kept and the missing ones
+are generated until the directory holds at least the target number of
+positions. `load_shards()` memory-maps the shards with NumPy.
+
+Usage:
+
+    python datagen.py positions/ --positions 1000000 --depth 3 --workers 4
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import struct
+import timeit
+
+from collections import deque
+
+from isolation import ENGINES
+from game_agent import CustomPlayer
+from game_agent import custom_score
+from game_agent import custom_score_weighted
+from sample_players import improved_score
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# blocked cells (bit row * width + col), cell index of player 1 and player 2
+# (-1 before their first move), slot to move, slot of the winner, width,
+# height, moves played, search score for the player to move, search depth
+RECORD = struct.Struct("<QbbBBBBBfB")
+FIELDS = [("blocked", "<u8"), ("location_1", "i1"), ("location_2", "i1"),
+          ("active", "u1"), ("winner", "u1"), ("width", "u1"), ("height", "u1"),
+          ("move_count", "u1"), ("score", "<f4"), ("depth", "u1")]
+POSITION_DTYPE = np.dtype(FIELDS) if np is not None else None
+
+HEURISTICS = {"improved": improved_score, "weighted": custom_score_weighted,
+              "custom": custom_score}
+
+META_FILE = "meta.json"
+
+
+def shard_path(directory, index):
+    """ Return the name of the shard file `index` in `directory` """
+    return os.path.join(directory, "shard-{:05d}.bin".format(index))
+
+
+def existing_shards(directory):
+    """ Return the number of positions of every complete shard in
+    `directory`, keyed by shard number """
+    shards = {}
+    for name in os.listdir(directory):
+        if name.startswith("shard-") and name.endswith(".bin"):
+            size = os.path.getsize(os.path.join(directory, name))
+            shards[int(name[6:-4])] = size // RECORD.size
+    return shards
+
+
+def play_game(rng, options, board_cls, width, height, random_plies, sample):
+    """
+    Play one self-play game and return the records of its sampled positions.
+
+    Parameters
+    ----------
+    rng : random.Random
+        The source of the random opening moves and of the sampling.
+
+    options : dict
+        Keyword arguments of the CustomPlayer of each side; they must
+        include collect_stats=True.
+
+    board_cls : class
+        The board engine.
+
+    width, height : int
+        The size of the board.
+
+    random_plies : int
+        The number of random moves the game starts with; these positions are
+        not sampled.
+
+    sample : float
+        The probability of keeping a searched position.
+
+    Returns
+    ----------
+    list<bytes>
+    """
+    board = board_cls(CustomPlayer(**options), CustomPlayer(**options), width, height)
+    positions = []
+    moves = board.get_legal_moves()
+    while moves:
+        if board.move_count < random_plies:
+            move = rng.choice(moves)
+        else:
+            agent = board.active_player
+            move = agent.get_move(board, moves, lambda: float("inf"))
+            stats = agent.stats
+            if stats.score is not None and abs(stats.score) != float("inf") and \
+                    rng.random() < sample:
+                locations = [-1 if location is None else location[0] * width + location[1]
+                             for location in board._slot_locations()]
+                positions.append((board._blocked_mask(), locations[0], locations[1],
+                                  board._active_slot(), board.move_count, stats.score,
+                                  stats.depth))
+        board.apply_move(move)
+        moves = board.get_legal_moves()
+
+    # the player to move has no legal moves and lost
+    winner = 1 - board._active_slot()
+    return [RECORD.pack(blocked, location_1, location_2, active, winner, width, height,
+                        move_count, score, depth)
+            for blocked, location_1, location_2, active, move_count, score, depth in positions]
+
+
+def generate_shard(job):
+    """
+    Play the games of one shard in a worker process and write the shard.
+    The job is (directory, shard number, seed, number of games, settings);
+    the result is the number of positions written. The records are written
+    to a temporary file as the games end, which is renamed once complete.
+    """
+    directory, index, seed, games, settings = job
+    rng = random.Random("{}-{}".format(seed, index))
+    options = {"score_fn": HEURISTICS[settings["heuristic"]], "method": "alphabeta",
+               "iterative": False, "search_depth": settings["depth"],
+               "move_ordering": True, "collect_stats": True}
+    path = shard_path(directory, index)
+    count = 0
+    with open(path + ".tmp", "wb") as f:
+        for _ in range(games):
+            records = play_game(rng, options, ENGINES[settings["engine"]], settings["width"],
+                                settings["height"], settings["random_plies"], settings["sample"])
+            f.write(b"".join(records))
+            count += len(records)
+    os.replace(path + ".tmp", path)
+    return count
+
+
+def run_jobs(pool, jobs, in_flight):
+    """
+    Yield the results of `jobs` in order. With a pool, at most `in_flight`
+    jobs are submitted ahead of the results consumed, so that `jobs` may be
+    endless and little work is lost when the consumer stops.
+    """
+    if pool is None:
+        for job in jobs:
+            yield generate_shard(job)
+        return
+    pending = deque()
+    for job in jobs:
+        pending.append(pool.apply_async(generate_shard, (job,)))
+        if len(pending) >= in_flight:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
+def generate(directory, positions, workers=1, seed=0, games_per_shard=20, depth=3,
+             heuristic="improved", width=7, height=7, random_plies=4, sample=0.5,
+             engine="bitboard", verbose=False):
+    """
+    Generate shards in `directory` until it holds at least `positions`
+    positions, resuming from the shards already there.
+
+    The settings of a directory are saved in its meta.json file on the first
+    run; resuming with different settings (other than `workers`, `engine`
+    and `positions`) raises a ValueError, since the shards would not form
+    one dataset.
+
+    Returns
+    ----------
+    int
+        The number of positions in the directory.
+    """
+    if width * height > 64:
+        raise ValueError("the blocked cells of {}x{} boards do not fit in 64 bits".format(
+            width, height))
+    if not 0 < sample <= 1:
+        raise ValueError("sample must be in (0, 1]")
+
+    settings = {"seed": seed, "games_per_shard": games_per_shard, "depth": depth,
+                "heuristic": heuristic, "width": width, "height": height,
+                "random_plies": random_plies, "sample": sample, "record": RECORD.format}
+    os.makedirs(directory, exist_ok=True)
+    meta = os.path.join(directory, META_FILE)
+    if os.path.exists(meta):
+        with open(meta) as f:
+            saved = json.load(f)
+        if saved != settings:
+            raise ValueError("{} was generated with different settings: {}".format(
+                directory, saved))
+    else:
+        with open(meta, "w") as f:
+            json.dump(settings, f, indent=1)
+
+    # shards that a previous run left unfinished are started again
+    for name in os.listdir(directory):
+        if name.endswith(".tmp"):
+            os.remove(os.path.join(directory, name))
+
+    done = existing_shards(directory)
+    total = sum(done.values())
+    settings = dict(settings, engine=engine)
+    jobs = ((directory, index, seed, games_per_shard, settings)
+            for index in itertools.count() if index not in done)
+
+    workers = max(1, min(workers, multiprocessing.cpu_count()))
+    pool = multiprocessing.Pool(workers) if workers > 1 and total < positions else None
+    start, generated = timeit.default_timer(), 0
+    try:
+        for count in run_jobs(pool, jobs, workers) if total < positions else ():
+            total += count
+            generated += count
+            if verbose:
+                elapsed = timeit.default_timer() - start
+                print("{} positions ({:.0f} per second)".format(total, generated / elapsed),
+                      flush=True)
+            if total >= positions:
+                break
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+            for name in os.listdir(directory):
+                if name.endswith(".tmp"):
+                    os.remove(os.path.join(directory, name))
+    return total
+
+
+def load_shards(directory):
+    """
+    Memory-map the shards of a dataset directory with NumPy.
+
+    Returns
+    ----------
+    list<numpy.memmap>
+        One read-only array of POSITION_DTYPE records per non-empty shard,
+        in shard order.
+    """
+    if np is None:
+        raise ImportError("loading datasets requires NumPy")
+    shards = existing_shards(directory)
+    return [np.memmap(shard_path(directory, index), dtype=POSITION_DTYPE, mode="r")
+            for index in sorted(shards) if shards[index]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", help="directory of the dataset shards")
+    parser.add_argument("--positions", type=int, default=100000,
+                        help="number of positions the dataset should hold")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count(),
+                        help="number of shards generated in parallel")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed of the random openings and sampling")
+    parser.add_argument("--games-per-shard", type=int, default=20,
+                        help="number of games in each shard")
+    parser.add_argument("--depth", type=int, default=3,
+                        help="search depth of the self-play agents")
+    parser.add_argument("--heuristic", choices=sorted(HEURISTICS), default="improved",
+                        help="heuristic of the self-play agents")
+    parser.add_argument("--random-plies", type=int, default=4,
+                        help="number of random moves each game starts with")
+    parser.add_argument("--sample", type=float, default=0.5,
+                        help="probability of keeping a searched position")
+    parser.add_argument("--size", type=int, nargs=2, default=[7, 7],
+                        metavar=("WIDTH", "HEIGHT"), help="board size")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="bitboard",
+                        help="board implementation used to play the games")
+    args = parser.parse_args()
+
+    total = generate(args.directory, args.positions, args.workers, args.seed,
+                     args.games_per_shard, args.depth, args.heuristic, args.size[0],
+                     args.size[1], args.random_plies, args.sample, args.engine, verbose=True)
+    print("{} holds {} positions".format(args.directory, total))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,8 +6,21 @@ augment the test suite with your own test cases to further test your code.
 You must test your agent's strength against a set of agents with known
 relative strength using tournament.py and include the results in your report.
 """
+import functools
+import itertools
+import json
+import math
+import multiprocessing
+import queue
 import random
 import sys
+import time
+
+from isolation import Board
+from isolation import OpeningBook
+from isolation.batch import mobility_batch
+from isolation.batch import register_batch
+from isolation.endgame import EndgameSolver
 
 class Timeout(Exception):
     """Subclass base exception for code clarity."""
@@ -20,47 +33,35 @@ class Timeout(Exception):
 def flip_game(game, orientation) :
     """ flips the board state of the game """
     new_game = game.copy()
+    board_state = new_game.__board_state__
+    last_moves = new_game.__last_player_move__
 
     # flip around diagnal center
     if orientation == 'diagonal':
-        # reverse columns
-        new_game.__board_state__ = new_game.__board_state__[::-1]
-        # reverse rows
-        i = 0
-        for row in new_game.__board_state__:
-            new_row = row[::-1]
-            new_game.__board_state__[i] = new_row
-            i = i + 1
+        # reverse columns and rows
+        new_game.__board_state__ = [row[::-1] for row in board_state[::-1]]
         # reverse player positions
-        for p in new_game.__last_player_move__:
-            pos = new_game.__last_player_move__[p]
-            new_y = new_game.height - 1 - pos[0]
-            new_x = new_game.width - 1 - pos[1]
-            new_game.__last_player_move__[p] = (new_y, new_x)
+        new_game.__last_player_move__ = {
+            p: (new_game.height - 1 - pos[0], new_game.width - 1 - pos[1])
+            for p, pos in last_moves.items()}
         return new_game
     # flip around horizontal center
     elif (orientation == 'horizontal'):
         # reverse columns
-        new_game.__board_state__ = new_game.__board_state__[::-1]
+        new_game.__board_state__ = board_state[::-1]
         # reverse player positions
-        for p in new_game.__last_player_move__:
-            pos = new_game.__last_player_move__[p]
-            new_y = new_game.height - 1 - pos[0]
-            new_game.__last_player_move__[p] = (new_y, pos[1])
+        new_game.__last_player_move__ = {
+            p: (new_game.height - 1 - pos[0], pos[1])
+            for p, pos in last_moves.items()}
         return new_game
     # flip around vertical center
     elif (orientation == 'vertical'):
         # reverse rows
-        i = 0
-        for row in new_game.__board_state__:
-            new_row = row[::-1]
-            new_game.__board_state__[i] = new_row
-            i = i + 1
+        new_game.__board_state__ = [row[::-1] for row in board_state]
         # reverse player positions
-        for p in new_game.__last_player_move__:
-            pos = new_game.__last_player_move__[p]
-            new_x = new_game.width - 1 - pos[1]
-            new_game.__last_player_move__[p] = (pos[0], new_x)
+        new_game.__last_player_move__ = {
+            p: (pos[0], new_game.width - 1 - pos[1])
+            for p, pos in last_moves.items()}
         return new_game
     else:
         print("flip_game: WARNING: UNRECOGNIZED SYMBOL:", orientation)
@@ -68,83 +69,477 @@ def flip_game(game, orientation) :
 
 def check_h_symmetry(game):
     """ returns True if the board is symetric horizontally"""
-    symmetry = True
-    # create flipped game
-    flipped_game = flip_game(game, 'horizontal')
-    if game.height % 2 == 1:
-        half_height = int(game.height/2 + 1)
-    else:
-        half_height = int(game.height/2)
+    return game.is_symmetric('horizontal')
 
-    # compare blocked out spaces
-    for i in range(half_height):
-        for j in range(game.width):
-            if not game.__board_state__[i][j] and not flipped_game.__board_state__[i][j]:
-                pass
-            elif game.__board_state__[i][j] and flipped_game.__board_state__[i][j]:
-                pass
-            else:
-                symmetry = False
+def check_v_symmetry(game):
+    """ returns True if the board is symetric vertically"""
+    return game.is_symmetric('vertical')
 
-    # compare player locations for symmetry
-    if (flipped_game.get_player_location(flipped_game.active_player) != game.get_player_location(game.inactive_player)):
-        symmetry = False
-    return symmetry
+def check_d_symmetry(game):
+    """ returns True if the board is symetric diagonally"""
+    return game.is_symmetric('diagonal')
 
+def is_symmetric(game) :
 
-def check_v_symmetry(game):
-    """ returns True if the board is symetric vertically"""
-    symmetry = True
-    # create flipped game
-    flipped_game = flip_game(game, 'vertical')
-    if game.height % 2 == 1:
-        half_width = int(game.height/2 + 1)
-    else:
-        half_width = int(game.height/2)
+    return check_h_symmetry(game) or check_v_symmetry(game) or check_d_symmetry(game)
 
-    # compare blocked out spaces
-    for i in range(game.height):
-        for j in range(half_width):
-            if not game.__board_state__[i][j] and not flipped_game.__board_state__[i][j]:
-                pass
-            elif game.__board_state__[i][j] and flipped_game.__board_state__[i][j]:
-                pass
-            else:
-                symmetry = False
+#####################################################################
+# Search helpers: in-place expansion and transposition table
+#####################################################################
 
-    # compare player locations for symmetry
-    if (flipped_game.get_player_location(flipped_game.active_player) != game.get_player_location(game.inactive_player)):
-        symmetry = False
-    return symmetry
+def walks_in_place(game):
+    """ returns True if search may walk `game` down and back up with
+    apply_move()/undo_move() instead of copying it with forecast_move().
+    Boards that override forecast_move() (e.g., to instrument the search)
+    are always expanded through their own forecast_move(). """
+    return type(game).forecast_move is Board.forecast_move
 
-def check_d_symmetry(game):
-    """ returns True if the board is symetric diagonally"""
-    symmetry = True
-    # create flipped game
-    flipped_game = flip_game(game, 'diagonal')
-    if game.height % 2 == 1:
-        half_width = int(game.height/2 + 1)
+# bound types of transposition table entries
+EXACT, LOWER, UPPER = 0, 1, 2
+
+class TranspositionTable:
+    """Fixed-size cache of search results keyed by `Board.hash_key`.
+
+    Each bucket holds two entries: a depth-preferred slot, which is only
+    replaced by a result searched at least as deep, and an always-replace
+    slot, which takes every result the depth-preferred slot refuses. Entries
+    are tuples (key, depth, bound, score, move).
+
+    Entries are kept from one search to the next, but the depth-preferred
+    slot remembers the search (generation) that filled it: an entry left by
+    an earlier search is replaced by any new result, so positions that can
+    no longer be reached age out of the table.
+
+    Parameters
+    ----------
+    size_mb : float
+        Approximate memory budget of the table in megabytes.
+    """
+
+    # approximate size in bytes of one stored entry (tuple, key and score
+    # objects, and the list slot pointing at it)
+    ENTRY_BYTES = 150
+
+    def __init__(self, size_mb=16):
+        self.size_mb = size_mb
+        self.num_buckets = max(1, int(size_mb * 2 ** 20) // (2 * self.ENTRY_BYTES))
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.overwrites = 0
+        self.generation = 0
+        self.clear()
+
+    def clear(self):
+        """ remove every entry; the counters are kept """
+        self._deep = [None] * self.num_buckets
+        self._recent = [None] * self.num_buckets
+        self._generations = [0] * self.num_buckets
+
+    def new_search(self):
+        """ start a new generation: the entries stored so far become the
+        first to be replaced """
+        self.generation += 1
+
+    def peek(self, key):
+        """ return the entry stored for `key`, or None, without counting
+        a hit or a miss """
+        index = key % self.num_buckets
+        for entry in (self._deep[index], self._recent[index]):
+            if entry is not None and entry[0] == key:
+                return entry
+        return None
+
+    def lookup(self, key):
+        """ return the entry stored for `key`, or None """
+        index = key % self.num_buckets
+        entry = self._deep[index]
+        if entry is None or entry[0] != key:
+            entry = self._recent[index]
+            if entry is None or entry[0] != key:
+                self.misses += 1
+                return None
+        self.hits += 1
+        return entry
+
+    def store(self, key, depth, bound, score, move):
+        """ record the result of searching the position `key` to `depth` """
+        index = key % self.num_buckets
+        entry = (key, depth, bound, score, move)
+        self.stores += 1
+        current = self._deep[index]
+        if current is None or current[0] == key or depth >= current[1] or \
+                self._generations[index] != self.generation:
+            if current is not None and current[0] != key:
+                self.overwrites += 1
+            self._deep[index] = entry
+            self._generations[index] = self.generation
+        else:
+            current = self._recent[index]
+            if current is not None and current[0] != key:
+                self.overwrites += 1
+            self._recent[index] = entry
+
+    def __len__(self):
+        return sum(entry is not None for entry in self._deep + self._recent)
+
+# player of a worker process of the parallel search, set by init_search_worker()
+_search_worker = {}
+
+def init_search_worker(player):
+    """ keep the copy of the player that a worker process of the parallel
+    search gets once, when the pool starts, so that only the game state
+    travels with each turn and the worker's transposition table and move
+    ordering tables carry over from one turn to the next """
+    _search_worker['player'] = player
+
+def search_root_split(snapshot, moves, deadline):
+    """ worker side of CustomPlayer's parallel search: iteratively deepen
+    the game state of `snapshot` (see board_snapshot()) over the root moves
+    `moves` only until `deadline` (a time.monotonic() value), and return the
+    (score, move) pair completed at each depth. """
+    player = _search_worker['player']
+    game = restore_board(snapshot, player, 'opponent')
+    player.time_left = lambda: 1000 * (deadline - time.monotonic())
+    player._start_turn(game)
+    results = []
+    try:
+        for depth in range(1, game.width * game.height + 1):
+            score, move = player.search_root_moves(game, moves, depth)
+            results.append((score, move))
+            if math.isinf(score):
+                break
+    except Timeout:
+        pass
+    return results
+
+def merge_root_splits(results):
+    """ combine the results of search_root_split() for the shares of the
+    root moves: return the deepest depth that every share completed and
+    the best (score, move) pair at that depth, or (0, None) without any
+    result. A share whose last score is proven (+/-inf) stopped deepening
+    because deeper searches cannot change it, so it counts as complete at
+    every depth and competes with its last result. If some share has no
+    result at all, the last result of every share competes instead. """
+    proven = [result for result in results if result and math.isinf(result[-1][0])]
+    unproven = [result for result in results if not result or not math.isinf(result[-1][0])]
+    if unproven:
+        depth = min(len(result) for result in unproven)
+    else:
+        depth = max((len(result) for result in proven), default=0)
+    if depth:
+        candidates = [result[depth - 1] for result in unproven]
     else:
-        half_width = int(game.height/2)
+        candidates = [result[-1] for result in unproven if result]
+    candidates += [result[-1] for result in proven]
+    if not candidates:
+        return 0, None
+    return depth, max(candidates, key=lambda candidate: candidate[0])
 
-    # compare blocked out spaces
-    for i in range(game.height):
-        for j in range(half_width):
-            if not game.__board_state__[i][j] and not flipped_game.__board_state__[i][j]:
-                pass
-            elif game.__board_state__[i][j] and flipped_game.__board_state__[i][j]:
+class SearchStats:
+    """Statistics of the search behind one move of a CustomPlayer.
+
+    The counters cover the nodes searched by the player's own process (the
+    worker processes of a parallel search report only the depth reached).
+
+    Attributes
+    ----------
+    move_count : int
+        Number of moves played before the searched position.
+
+    source : str
+        How the move was chosen: 'book', 'ponder', 'endgame', 'parallel' or
+        'search'.
+
+    move : tuple(int, int)
+        The move returned by get_move().
+
+    depth, score : int, float
+        Depth and root score of the last completed iteration.
+
+    nodes, leaves, cutoffs : int
+        Nodes entered, heuristic evaluations, and beta cutoffs.
+
+    cutoff_index : list<int>
+        cutoff_index[i] is the number of cutoffs caused by the i-th move
+        tried at a node; a well-ordered search cuts off on the first move.
+
+    iterations : list<dict>
+        Depth, root score, move, node count and seconds of every completed
+        iterative deepening iteration.
+
+    tt_hits, tt_probes : int
+        Transposition table hits and lookups (zero without a table).
+
+    seconds : float
+        Wall time of the get_move() call.
+    """
+
+    def __init__(self, move_count, tt=None):
+        self.move_count = move_count
+        self.source = 'search'
+        self.move = None
+        self.depth = 0
+        self.score = None
+        self.nodes = 0
+        self.leaves = 0
+        self.cutoffs = 0
+        self.cutoff_index = []
+        self.iterations = []
+        self.tt_hits = 0
+        self.tt_probes = 0
+        self.seconds = 0.
+        self._start = time.perf_counter()
+        self._iteration_start = (self._start, 0)
+        self._tt = tt
+        self._tt_start = (tt.hits, tt.hits + tt.misses) if tt is not None else (0, 0)
+
+    def record_cutoff(self, index):
+        """ count a beta cutoff by the `index`-th move tried at a node """
+        self.cutoffs += 1
+        if index >= len(self.cutoff_index):
+            self.cutoff_index.extend([0] * (index + 1 - len(self.cutoff_index)))
+        self.cutoff_index[index] += 1
+
+    def end_iteration(self, depth, score, move):
+        """ record a completed iterative deepening iteration """
+        now = time.perf_counter()
+        started, nodes = self._iteration_start
+        self.iterations.append({'depth': depth, 'score': score, 'move': move,
+                                'nodes': self.nodes - nodes, 'seconds': now - started})
+        self._iteration_start = (now, self.nodes)
+        self.depth, self.score = depth, score
+
+    def finish(self, move, source):
+        """ record the move returned by get_move() and how it was found """
+        self.move, self.source = move, source
+        self.seconds = time.perf_counter() - self._start
+        if self._tt is not None:
+            self.tt_hits = self._tt.hits - self._tt_start[0]
+            self.tt_probes = self._tt.hits + self._tt.misses - self._tt_start[1]
+        self._tt = None
+
+    @property
+    def branching_factor(self):
+        """ effective branching factor: ratio of the node counts of the last
+        two completed iterations, or None before two have completed """
+        if len(self.iterations) < 2 or not self.iterations[-2]['nodes']:
+            return None
+        return self.iterations[-1]['nodes'] / self.iterations[-2]['nodes']
+
+    @staticmethod
+    def _json_score(score):
+        """ proven scores as the strings 'inf' and '-inf', which strict JSON
+        (unlike Python's json module) has no numbers for """
+        if score is not None and math.isinf(score):
+            return 'inf' if score > 0 else '-inf'
+        return score
+
+    def as_dict(self):
+        """ return the statistics as a dict that serialises to strict JSON """
+        iterations = [dict(iteration, score=self._json_score(iteration['score']))
+                      for iteration in self.iterations]
+        return {'move_count': self.move_count, 'source': self.source,
+                'move': self.move, 'depth': self.depth, 'score': self._json_score(self.score),
+                'nodes': self.nodes, 'leaves': self.leaves, 'cutoffs': self.cutoffs,
+                'cutoff_index': self.cutoff_index, 'iterations': iterations,
+                'branching_factor': self.branching_factor, 'tt_hits': self.tt_hits,
+                'tt_probes': self.tt_probes, 'seconds': self.seconds}
+
+class DeadlineClock:
+    """Replacement for the `time_left` callable of one turn that only reads
+    the clock every `interval` calls, and otherwise returns the time left
+    measured at the last reading.
+
+    The turn's deadline is fixed once, from `time_left()`, as an absolute
+    time.perf_counter() value (the clock behind timeit.default_timer, which
+    `Board.play` uses). After every reading, `interval` is set from the
+    measured call rate so that readings are about `max_gap` milliseconds
+    apart; the value returned between readings is therefore at most that
+    much too high, as long as the calls keep coming at the measured rate.
+    Code that runs for long between two calls (such as the endgame solver)
+    must check the real clock itself and then call `reread()`.
+
+    The callable is `self.time_left`: a `next()` over blocks of repeated
+    readings, so the calls between readings run no Python code at all.
+
+    Parameters
+    ----------
+    time_left : callable
+        The time_left function passed to get_move().
+
+    max_gap : float
+        Target number of milliseconds between two readings of the clock.
+    """
+
+    # largest number of calls between two readings
+    MAX_INTERVAL = 4096
+
+    def __init__(self, time_left, max_gap=2.):
+        self.deadline = time.perf_counter() + time_left() / 1000.
+        self.max_gap = max_gap / 1000.
+        self.interval = 1
+        self.readings = 0
+        self.reread()
+
+    def remaining(self):
+        """ read the clock and return the number of milliseconds left """
+        return 1000 * (self.deadline - time.perf_counter())
+
+    def reread(self):
+        """ drop the time left of the last reading, so that the next call
+        reads the clock, and return the new `time_left` callable """
+        self.time_left = functools.partial(next, itertools.chain.from_iterable(self._blocks()))
+        return self.time_left
+
+    def _blocks(self):
+        """ read the clock, and yield the time left as often as the call
+        rate measured since the previous reading allows """
+        last = None
+        while True:
+            now = time.perf_counter()
+            if last is None:
+                # no call rate to measure yet: keep the current interval
                 pass
+            elif now > last:
+                self.interval = max(1, min(int(self.interval * self.max_gap / (now - last)),
+                                           self.MAX_INTERVAL))
             else:
-                symmetry = False
+                self.interval = min(2 * self.interval, self.MAX_INTERVAL)
+            self.readings += 1
+            last = now
+            yield itertools.repeat(1000 * (self.deadline - now), self.interval)
+
+def board_snapshot(game, player):
+    """ return a small picklable description of the game state of `game`
+    from the point of view of `player`, for restore_board() """
+    locations = game.__last_player_move__
+    return (type(game), game.width, game.height, game.move_count, game.__board_state__,
+            (locations[game.__player_1__], locations[game.__player_2__]),
+            0 if game.active_player == game.__player_1__ else 1,
+            0 if player == game.__player_1__ else 1)
+
+def restore_board(snapshot, player, opponent):
+    """ rebuild the game state described by board_snapshot() with `player`
+    in the slot of the player the snapshot was taken for """
+    board_cls, width, height, move_count, state, locations, active, slot = snapshot
+    players = [player, opponent] if slot == 0 else [opponent, player]
+    board = board_cls(players[0], players[1], width, height)
+    board.move_count = move_count
+    board.__board_state__ = state
+    board.__last_player_move__ = {players[0]: locations[0], players[1]: locations[1]}
+    board.__active_player__ = players[active]
+    return board
+
+def ponder_worker(player, jobs, results, stop):
+    """ body of the pondering process: for every job (job id, snapshot of a
+    game state where the opponent is to move), deepen the searches of all
+    the opponent's replies in turn until `stop` is set, sending each
+    completed search as (job id, key, depth, score, move) on `results`, and
+    acknowledge the job with (job id, None, 0, 0, None) """
+    player.time_left = lambda: float("-inf") if stop.value else float("inf")
+    player.stats = None
+    opponent = "Opponent"
+    for job_id, snapshot in iter(jobs.get, None):
+        game = restore_board(snapshot, player, opponent)
+        children = []
+        for reply in game.get_legal_moves():
+            child = game.forecast_move(reply)
+            moves = child.get_legal_moves()
+            if moves:
+                children.append((child, moves))
+        # the replies that look best for the opponent are searched first
+        children.sort(key=lambda child: player.score(child[0], player))
+        if children:
+            player._start_turn(children[0][0])
+        try:
+            for depth in range(1, game.width * game.height + 1):
+                if not children:
+                    break
+                unresolved = []
+                for child, moves in children:
+                    player._root_best = None
+                    score, move = player.search_root_moves(child, moves, depth)
+                    results.put((job_id, child.hash_key, depth, score, move))
+                    # positions already won or lost need no deeper search
+                    if not math.isinf(score):
+                        unresolved.append((child, moves))
+                children = unresolved
+        except Timeout:
+            pass
+        results.put((job_id, None, 0, 0, None))
 
-    # compare player locations for symmetry
-    if (flipped_game.get_player_location(flipped_game.active_player) != game.get_player_location(game.inactive_player)):
-        symmetry = False
-    return symmetry
+class Ponderer:
+    """Background process that searches the opponent's possible replies
+    while the opponent thinks (see `ponder_worker()`).
 
-def is_symmetric(game) :
+    The process keeps its own copy of the player, whose transposition table
+    persists from one turn to the next, and is stopped through a shared flag
+    that its search checks at every node, so it stops within one node.
+    Completed searches are collected in `results`, which maps the hash key
+    of a position to (depth, score, move) of the deepest search of it.
 
-    return check_h_symmetry(game) or check_v_symmetry(game) or check_d_symmetry(game)
+    Parameters
+    ----------
+    player : CustomPlayer
+        The player to ponder for.
+    """
+
+    def __init__(self, player):
+        self.results = {}
+        self._job = 0
+        self._busy = False
+        self._stop = multiprocessing.RawValue('b', 0)
+        self._jobs = multiprocessing.SimpleQueue()
+        self._results = multiprocessing.Queue()
+        self._process = multiprocessing.Process(
+            target=ponder_worker, args=(player, self._jobs, self._results, self._stop),
+            daemon=True)
+        self._process.start()
+
+    def start(self, game, player):
+        """ start pondering on `game`, where the opponent of `player` is to
+        move; the results of the previous turn are dropped. Nothing is done
+        if the process has not acknowledged the previous stop yet. """
+        if self._busy and not self._collect(0.):
+            return
+        self.results.clear()
+        self._job += 1
+        self._busy = True
+        self._stop.value = 0
+        self._jobs.put((self._job, board_snapshot(game, player)))
+
+    def stop(self, timeout):
+        """ stop pondering and collect the results, waiting at most
+        `timeout` seconds for the process to acknowledge """
+        if self._busy:
+            self._stop.value = 1
+            self._collect(timeout)
+
+    def _collect(self, timeout):
+        """ store the results received until the current job is
+        acknowledged; returns False if that takes longer than `timeout` """
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                job, key, depth, score, move = self._results.get(
+                    timeout=max(deadline - time.monotonic(), 0.))
+            except queue.Empty:
+                return False
+            if key is not None:
+                if depth > self.results.get(key, (0,))[0]:
+                    self.results[key] = (depth, score, move)
+            elif job == self._job:
+                self._busy = False
+                return True
+
+    def close(self):
+        """ stop the process """
+        self._stop.value = 1
+        self._jobs.put(None)
+        self._process.join(1.)
+        if self._process.is_alive():
+            self._process.terminate()
 
 #####################################################################
 # Assignment Code: custom scores
@@ -196,6 +591,30 @@ def custom_score_opponent(game, player):
     opp_moves = len(game.get_legal_moves(game.get_opponent(player)))
 
     return float(-1 * opp_moves)
+
+register_batch(custom_score_weighted, mobility_batch(
+    custom_score_weighted, lambda own, opp: 9.0 * own - 1.0 * opp))
+register_batch(custom_score_opponent, mobility_batch(
+    custom_score_opponent, lambda own, opp: -1.0 * opp))
+
+def custom_score_territory(game, player):
+    """ difference between the number of cells the player reaches before
+    its opponent and the number its opponent reaches first (see
+    `Board.get_territory()`), with the move counts as a tie breaker """
+    if game.is_winner(player):
+        return float("inf")
+
+    if game.is_loser(player):
+        return float("-inf")
+
+    territory = game.get_territory()
+    own_cells = len(territory[player])
+    opp_cells = len(territory[game.get_opponent(player)])
+    own_moves = len(game.get_legal_moves(player))
+    opp_moves = len(game.get_legal_moves(game.get_opponent(player)))
+
+    return float(own_cells - opp_cells) + 0.1 * (own_moves - opp_moves)
+
 def custom_score_distance(game, player):
     """
     same function as custom_(), but also considers the player's
@@ -232,7 +651,9 @@ def custom_score_symmetry(game, player):
         game.__active_player__ == player): # we're up - we went second
         # for future moves, consider if we can copy
         for move in game.get_legal_moves(game.__active_player__):
-            if is_symmetric(game.forecast_move(move)):
+            with game.pushed(move):
+                symmetric = is_symmetric(game)
+            if symmetric:
                 # symmetry can be maintained, this is a good state for 2nd player
                 return 100
 
@@ -266,7 +687,9 @@ def custom_score(game, player):
             game.__active_player__ == player): # we're up - we went second
             # for future moves, consider if we can copy
             for move in game.get_legal_moves(game.__active_player__):
-                if is_symmetric(game.forecast_move(move)):
+                with game.pushed(move):
+                    symmetric = is_symmetric(game)
+                if symmetric:
                     # symmetry can be maintained, this is a good state for 2nd player
                     return 100
 
@@ -310,23 +733,163 @@ class CustomPlayer:
         Flag indicating whether to perform fixed-depth search (False) or
         iterative deepening search (True).
 
-    method : {'minimax', 'alphabeta'} (optional)
-        The name of the search method to use in get_move().
+    method : {'minimax', 'alphabeta', 'pvs'} (optional)
+        The name of the search method to use in get_move(). 'pvs' is
+        alpha-beta with principal variation (null-window) search, and uses
+        aspiration windows when searching iteratively.
 
     timeout : float (optional)
         Time remaining (in milliseconds) when search is aborted. Should be a
         positive value large enough to allow the function to return before the
         timer expires.
+
+    tt_size_mb : float (optional)
+        Size in megabytes of the transposition table used by alphabeta(),
+        which keeps its entries across iterations and across the get_move()
+        calls of one game. Zero (the default) disables the table. With a
+        table, iterative deepening starts at the depth to which earlier
+        turns already searched the position, and the principal variation of
+        each turn is kept: if the opponent plays the predicted reply, the
+        next move of the variation is searched first.
+
+    move_ordering : boolean (optional)
+        Flag indicating whether alphabeta() should reorder the legal moves
+        at each node: the hash move (the transposition table move, or the
+        previous iteration's best move at the root) first, then the killer
+        moves of the ply, then the remaining moves by history score.
+
+    static_ordering : boolean (optional)
+        Flag indicating whether moves with the same history score should be
+        tried fewest onward moves first. Only used with move_ordering.
+
+    aspiration_window : float (optional)
+        Half-width of the window centred on the previous iteration's score
+        that iterative deepening uses with the 'pvs' method.
+
+    workers : int (optional)
+        Number of worker processes used by iterative deepening. With more
+        than one worker the root moves are split between the workers, each
+        of which deepens its share of the moves until the time limit, and
+        the best move of the deepest iteration completed by every worker is
+        played. The processes are started on the first call to get_move()
+        and kept until close() is called.
+
+    book : str or isolation.OpeningBook (optional)
+        Opening book (or the name of a book file written by
+        opening_book.py) consulted by get_move() before searching; a move
+        found in the book is played immediately. The file is only read on
+        the first lookup.
+
+    endgame_cells : int (optional)
+        Once at most this many cells are open and the players have been
+        separated, alphabeta() and pvs() solve the position exactly with
+        `isolation.endgame.EndgameSolver` instead of searching it, and
+        get_move() plays the solution immediately. Zero (the default)
+        disables the solver.
+
+    batch_leaves : boolean (optional)
+        Flag indicating whether alphabeta() should score the children of
+        frontier nodes with one call of the heuristic's batch version (see
+        `isolation.batch`), when it has one and NumPy is installed.
+
+    collect_stats : boolean (optional)
+        Flag indicating whether get_move() should record the statistics of
+        its search in a `SearchStats` object, available as `self.stats`
+        until the next call. When the flag is off `self.stats` stays None
+        and the search only pays for checking it.
+
+    stats_file : str (optional)
+        Name of a file to which get_move() appends the statistics of every
+        move as one line of JSON. Implies collect_stats.
+
+    adaptive_clock : boolean (optional)
+        Flag indicating whether the search should read the clock only every
+        few nodes, through a `DeadlineClock` that spaces its readings about
+        a quarter of `timeout` apart, instead of calling `time_left()` at
+        every node.
+
+    ponder : boolean (optional)
+        Flag indicating whether the player should search the opponent's
+        replies in a background process (see `Ponderer`) while the opponent
+        thinks. If the opponent plays a reply that has been searched at
+        least as deep as the player's previous search reached, get_move()
+        plays the pondered move immediately; otherwise the pondered move is
+        searched first. The process is started on the first call to
+        get_move() and kept until close() is called; it is not started in
+        daemonic processes, which cannot have children.
     """
 
+    # smallest number of children scored with one batch call; below it the
+    # fixed cost of the NumPy call outweighs the scalar calls it replaces
+    BATCH_MIN_MOVES = 6
+
     def __init__(self, search_depth=3, score_fn=custom_score,
-                 iterative=True, method='minimax', timeout=10.):
+                 iterative=True, method='minimax', timeout=10.,
+                 tt_size_mb=0, move_ordering=False, static_ordering=False,
+                 aspiration_window=1., workers=1, book=None, endgame_cells=0,
+                 batch_leaves=False, collect_stats=False, stats_file=None,
+                 adaptive_clock=False, ponder=False):
         self.search_depth = search_depth
         self.iterative = iterative
         self.score = score_fn
         self.method = method
         self.time_left = None
         self.TIMER_THRESHOLD = timeout
+        self.tt = TranspositionTable(tt_size_mb) if tt_size_mb > 0 else None
+        self._game_players = None
+        self._last_move_count = -1
+        self.move_ordering = move_ordering
+        self.static_ordering = static_ordering
+        self._killers = {}
+        self._history = {}
+        self._root_move_count = -1
+        self._root_best = None
+        self.principal_variation = []
+        self._pv_keys = []
+        self.aspiration_window = aspiration_window
+        self.workers = workers
+        self.depth_reached = 0
+        self._pool = None
+        self.book = OpeningBook(book) if isinstance(book, str) else book
+        self.endgame = EndgameSolver(endgame_cells) if endgame_cells > 0 else None
+        self.batch_leaves = batch_leaves
+        self.collect_stats = collect_stats or stats_file is not None
+        self.stats_file = stats_file
+        self.stats = None
+        self.adaptive_clock = adaptive_clock
+        self.clock = None
+        self.ponder = ponder
+        self._ponderer = None
+
+    def __getstate__(self):
+        # worker processes get a copy of the player without the process
+        # pool, the timer of the current turn or the cached search results
+        state = self.__dict__.copy()
+        state['_pool'] = None
+        state['time_left'] = None
+        state['clock'] = None
+        state['_ponderer'] = None
+        state['stats'] = None
+        if self.tt is not None:
+            # only the size: the copy allocates an empty table of its own
+            state['tt'] = self.tt.size_mb
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.tt is not None:
+            self.tt = TranspositionTable(self.tt)
+
+    def close(self):
+        """ stop the worker processes of the parallel search and of
+        pondering, if any """
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+        if self._ponderer is not None:
+            self._ponderer.close()
+            self._ponderer = None
 
     def get_move(self, game, legal_moves, time_left):
         """Search for the best move from the available legal moves and return a
@@ -368,6 +931,15 @@ class CustomPlayer:
             self.search_depth = sys.maxsize
 
         self.time_left = time_left
+        self.clock = None
+        if self._ponderer is not None:
+            self._ponderer.stop(self.TIMER_THRESHOLD / 1000.)
+        elif self.ponder and not multiprocessing.current_process().daemon:
+            # started before searching, so that the search time allows for it
+            self._ponderer = Ponderer(self)
+        self._start_turn(game)
+        if self.collect_stats:
+            self.stats = SearchStats(game.move_count, self.tt)
 
         # TODO: finish this function!
 
@@ -377,6 +949,38 @@ class CustomPlayer:
 
         score = float("-inf")
         i = 0
+        previous_depth, self.depth_reached = self.depth_reached, 0
+        if self.book is not None:
+            move = self.book.lookup(game)
+            if move in legal_moves:
+                return self._finish_move(game, move, 'book')
+
+        if self._ponderer is not None:
+            pondered = self._ponderer.results.get(game.hash_key)
+            if pondered is not None and pondered[2] in legal_moves:
+                depth, value, move = pondered
+                if depth >= max(previous_depth, 1) or math.isinf(value):
+                    self.depth_reached = depth
+                    return self._finish_move(game, move, 'ponder')
+                self._root_best = move
+
+        try:
+            solved = self._solve_endgame(game, True)
+            if solved is not None and solved[1] in legal_moves:
+                return self._finish_move(game, solved[1], 'endgame')
+        except Timeout:
+            pass
+
+        if self.iterative and self.workers > 1 and legal_moves and \
+                not multiprocessing.current_process().daemon:
+            # daemonic processes (e.g., tournament workers) cannot start a
+            # pool of their own and search on a single core instead
+            return self._finish_move(game, self.parallel_search(game, legal_moves), 'parallel')
+
+        if self.adaptive_clock:
+            self.clock = DeadlineClock(time_left, self.TIMER_THRESHOLD / 4.)
+            self.time_left = self.clock.time_left
+
         try:
             # The search method call (alpha beta or minimax) should happen in
             # here in order to avoid timeout. The try/except block will
@@ -385,25 +989,275 @@ class CustomPlayer:
             best_move = [-1, -1]
             if(self.iterative == False) :
                 if self.method == 'minimax' :
-                   _, best_move = self.minimax(game, self.search_depth + 1, True)
+                   score, best_move = self.minimax(game, self.search_depth + 1, True)
                 if self.method == 'alphabeta' :
-                   _, best_move = self.alphabeta(game, self.search_depth + 1, True)
+                   score, best_move = self.alphabeta(game, self.search_depth + 1, True)
+                if self.method == 'pvs' :
+                   score, best_move = self.pvs(game, self.search_depth + 1)
+                if self.stats is not None:
+                    self.stats.end_iteration(self.search_depth + 1, score, best_move)
 
             else :
-                for i in range(0, game.width * game.height): #self.search_depth + 1):
+                start, move = self._start_depth(game, legal_moves)
+                if move is not None:
+                    best_move = move
+                for i in range(start - 1, game.width * game.height): #self.search_depth + 1):
                     if self.method == 'minimax' :
                         score, best_move = self.minimax(game, i + 1, True)
+                        self.depth_reached = i + 1
                     if self.method == 'alphabeta' :
                         score, best_move = self.alphabeta(game, i + 1, float("-inf"), float("inf"), True)
-                        if score == float("inf") :
-                            break;
+                        self._root_best = best_move
+                        self.depth_reached = i + 1
+                    if self.method == 'pvs' :
+                        score, best_move = self.aspiration_search(game, i + 1, score if i else None)
+                        self._root_best = best_move
+                        self.depth_reached = i + 1
+                    if self.stats is not None:
+                        self.stats.end_iteration(i + 1, score, best_move)
+                    if self.method != 'minimax' and score == float("inf") :
+                        break;
         except Timeout:
             # Handle any actions required at timeout, if necessary
             pass
 
+        if self.tt is not None:
+            self._store_principal_variation(game)
+
         # Return the best move from the last completed search iteration
-        return best_move
+        return self._finish_move(game, best_move, 'search')
 
+    def _start_depth(self, game, legal_moves):
+        """Return the depth at which iterative deepening should start, and
+        the move to play if no iteration completes: the depth and move of the
+        transposition table entry that earlier turns left for `game`, or 1
+        and None if there is none.
+        """
+        if self.tt is None:
+            return 1, None
+        entry = self.tt.peek(game.hash_key)
+        if entry is None or entry[4] not in legal_moves:
+            return 1, None
+        return max(entry[1], 1), entry[4]
+
+    def _store_principal_variation(self, game):
+        """ follow the transposition table moves from `game` and keep them
+        as the principal variation, with the key of each position reached """
+        board = game.copy()
+        moves, keys = [], []
+        while len(moves) < max(self.depth_reached, 1):
+            entry = self.tt.peek(board.hash_key)
+            if entry is None or entry[4] not in board.get_legal_moves():
+                break
+            board.apply_move(entry[4])
+            moves.append(entry[4])
+            keys.append(board.hash_key)
+        self.principal_variation, self._pv_keys = moves, keys
+
+    def _finish_move(self, game, move, source):
+        """ complete and log the statistics of the move, if they are being
+        collected, start pondering on the opponent's replies, if enabled,
+        and return the move """
+        stats = self.stats
+        if stats is not None:
+            if source in ('parallel', 'ponder'):
+                stats.depth = self.depth_reached
+            stats.finish(move, source)
+            if self.stats_file is not None:
+                with open(self.stats_file, 'a') as f:
+                    f.write(json.dumps(stats.as_dict(), allow_nan=False) + '\n')
+        if self._ponderer is not None and tuple(move) in game.get_legal_moves():
+            with game.pushed(tuple(move)):
+                if game.get_legal_moves():
+                    self._ponderer.start(game, self)
+        return move
+
+    def _start_turn(self, game):
+        """Detect the start of a new game and drop the search state kept from
+        the previous one. A new game is recognised by different players or by
+        a move count lower than on the previous turn.
+        """
+        players = (game.__player_1__, game.__player_2__)
+        new_game = players != self._game_players or game.move_count < self._last_move_count
+        if new_game:
+            self._game_players = players
+            if self.tt is not None:
+                self.tt.clear()
+            self._killers.clear()
+            self._history.clear()
+            self.principal_variation, self._pv_keys = [], []
+            if self.endgame is not None:
+                self.endgame.clear()
+            if self._ponderer is not None:
+                self._ponderer.results.clear()
+        elif game.move_count != self._last_move_count:
+            # a later turn of the same game: age the state of earlier turns
+            if self.tt is not None:
+                self.tt.new_search()
+            self._history = {key: value >> 1 for key, value in self._history.items()
+                             if value > 1}
+            self._killers = {ply: killers for ply, killers in self._killers.items()
+                             if ply >= game.move_count}
+        self._last_move_count = game.move_count
+        self._root_move_count = game.move_count
+        self._root_best = None
+        # the opponent played the reply the previous search predicted
+        if len(self._pv_keys) > 2 and game.hash_key == self._pv_keys[1]:
+            self._root_best = self.principal_variation[2]
+
+    def parallel_search(self, game, legal_moves):
+        """Split `legal_moves` between the worker processes, let each of
+        them deepen its share until the time limit, and return the best move
+        of the deepest iteration that every worker completed, counting a
+        share already proven won or lost as complete (see
+        `merge_root_splits()`). The result is collected
+        before `time_left()` drops below half of TIMER_THRESHOLD; workers
+        that have not answered by then are ignored.
+        """
+        if self._pool is None:
+            self._pool = multiprocessing.Pool(self.workers, initializer=init_search_worker,
+                                              initargs=(self,))
+
+        deadline = time.monotonic() + self.time_left() / 1000.
+        snapshot = board_snapshot(game, self)
+        shares = [legal_moves[i::self.workers] for i in range(self.workers)]
+        pending = [self._pool.apply_async(search_root_split, (snapshot, share, deadline))
+                   for share in shares if share]
+
+        results = []
+        for result in pending:
+            wait = (self.time_left() - self.TIMER_THRESHOLD / 2.) / 1000.
+            try:
+                results.append(result.get(max(wait, 0.)))
+            except multiprocessing.TimeoutError:
+                results.append([])
+
+        self.depth_reached, best = merge_root_splits(results)
+        if best is None:
+            return legal_moves[0]
+        return best[1]
+
+    def search_root_moves(self, game, moves, depth):
+        """Search the root of `game` to `depth` considering only `moves`
+        (a subset of the legal moves) with the configured search method.
+
+        Returns
+        -------
+        float, tuple(int, int)
+            The best score and the move that achieves it.
+        """
+        best_score, best_move = float("-inf"), moves[0]
+        for move in moves:
+            child = game.forecast_move(move)
+            if self.method == 'minimax':
+                score, _ = self.minimax(child, depth - 1, False)
+            elif self.method == 'pvs':
+                score, _ = self.pvs(child, depth - 1, best_score, float("inf"), False)
+            else:
+                score, _ = self.alphabeta(child, depth - 1, best_score, float("inf"), False)
+            if score > best_score:
+                best_score, best_move = score, move
+        return best_score, best_move
+
+    def _batch_leaves(self, game):
+        """ returns True if the children of `game` may be scored with the
+        batch version of the heuristic: batching must be enabled, the
+        heuristic must have a batch version, and the endgame solver must not
+        be able to prove any of the children """
+        if not self.batch_leaves or getattr(self.score, 'batch', None) is None:
+            return False
+        return self.endgame is None or \
+            game.width * game.height - game.move_count - 1 > self.endgame.max_cells
+
+    def _check_time(self):
+        """ raise Timeout when the search has to return """
+        if self.time_left() < self.TIMER_THRESHOLD:
+            raise Timeout()
+
+    def _check_clock(self):
+        """ raise Timeout when the search has to return, reading the clock
+        itself rather than the last reading of the adaptive clock """
+        if self.clock.remaining() < self.TIMER_THRESHOLD:
+            raise Timeout()
+
+    def _solve_endgame(self, game, maximizing_player):
+        """ return the proven (score, move) of a game where the players have
+        been separated, or None while they can still meet (or the endgame is
+        too large to solve) """
+        if self.endgame is None or \
+                game.width * game.height - game.move_count > self.endgame.max_cells:
+            return None
+        if self.clock is None or self.time_left is not self.clock.time_left:
+            solved = self.endgame.solve(game, self._check_time)
+        else:
+            # the solver checks the time far less often than the search
+            # does, so the last reading of the adaptive clock could be too
+            # old by then
+            try:
+                solved = self.endgame.solve(game, self._check_clock)
+            finally:
+                self.time_left = self.clock.reread()
+        if solved is None:
+            return None
+        wins, move = solved
+        score = float("inf") if wins == maximizing_player else float("-inf")
+        return score, move if move is not None else [-1, -1]
+
+    def aspiration_search(self, game, depth, guess=None):
+        """Search the root with pvs() in a window centred on `guess` (the
+        score of the previous iteration), widening the window and searching
+        again whenever the result falls outside of it.
+
+        Returns
+        -------
+        float, tuple(int, int)
+            The score and best move, as returned by pvs().
+        """
+        if guess is None or math.isinf(guess):
+            return self.pvs(game, depth)
+
+        delta = self.aspiration_window
+        alpha, beta = guess - delta, guess + delta
+        for attempt in range(1, 4):
+            score, move = self.pvs(game, depth, alpha, beta, True)
+            if score <= alpha:
+                delta *= 4
+                alpha = guess - delta if attempt < 3 else float("-inf")
+            elif score >= beta:
+                delta *= 4
+                beta = guess + delta if attempt < 3 else float("inf")
+            else:
+                return score, move
+        return self.pvs(game, depth, alpha, beta, True)
+
+    def _order_moves(self, game, moves, hash_move, maximizing_player):
+        """Return the moves in the order alphabeta() should try them: the
+        hash move, the killer moves recorded for this ply, then the rest by
+        decreasing history score (and optionally fewest onward moves).
+        """
+        history = self._history
+        if self.static_ordering:
+            ordered = sorted(moves, key=lambda m: (-history.get((maximizing_player, m), 0),
+                                                   len(game.__get_moves__(m))))
+        else:
+            ordered = sorted(moves, key=lambda m: -history.get((maximizing_player, m), 0))
+
+        first = []
+        for move in (hash_move,) + self._killers.get(game.move_count, ()):
+            if move in moves and move not in first:
+                first.append(move)
+        if not first:
+            return ordered
+        return first + [m for m in ordered if m not in first]
+
+    def _record_cutoff(self, game, move, depth, maximizing_player):
+        """ remember a move that caused a beta cutoff as a killer move for
+        this ply and credit it in the history table """
+        killers = self._killers.get(game.move_count, ())
+        if move not in killers:
+            self._killers[game.move_count] = (move,) + killers[:1]
+        key = (maximizing_player, move)
+        self._history[key] = self._history.get(key, 0) + depth * depth
 
     def minimax(self, game, depth, maximizing_player=True):
         """Implement the minimax search algorithm as described in the lectures.
@@ -439,10 +1293,16 @@ class CustomPlayer:
         if self.time_left() < self.TIMER_THRESHOLD:
             raise Timeout()
 
+        stats = self.stats
+        if stats is not None:
+            stats.nodes += 1
+
         best_move = [-1, -1]
 
         #if this is the last iteration, return
         if depth == 0:
+            if stats is not None:
+                stats.leaves += 1
             score = self.score(game, self)
             return score, best_move
 
@@ -458,11 +1318,20 @@ class CustomPlayer:
         else:
             minmax_score = float("inf")
 
+        in_place = walks_in_place(game)
+
         # for each legal move, consider new board state
         for move in moves:
-            next_game = game.forecast_move(move)
+            if in_place:
+                game.apply_move(move)
+                try:
+                    score, _ = self.minimax(game, depth-1, not maximizing_player)
+                finally:
+                    game.undo_move()
+            else:
+                next_game = game.forecast_move(move)
+                score, _ = self.minimax(next_game, depth-1, not maximizing_player)
 
-            score, _ = self.minimax(next_game, depth-1, not maximizing_player)
             if maximizing_player and score >= minmax_score:
                 minmax_score = score
                 best_move = move
@@ -513,15 +1382,44 @@ class CustomPlayer:
         if self.time_left() < self.TIMER_THRESHOLD:
             raise Timeout()
 
+        stats = self.stats
+        if stats is not None:
+            stats.nodes += 1
+
         best_move = [-1, -1]
 
+        # separated players: the outcome is known without searching
+        solved = self._solve_endgame(game, maximizing_player)
+        if solved is not None:
+            return solved
+
         #if this is the last iteration, return
         if depth == 0:
+            if stats is not None:
+                stats.leaves += 1
             return self.score(game, self), [-1, -1]
 
+        # reuse a stored result that is deep enough and fits the window
+        tt = self.tt
+        hash_move = None
+        if tt is not None:
+            key = game.hash_key
+            entry = tt.lookup(key)
+            if entry is not None:
+                _, stored_depth, bound, value, hash_move = entry
+                if stored_depth >= depth and (
+                        bound == EXACT or (bound == LOWER and value >= beta) or
+                        (bound == UPPER and value <= alpha)):
+                    return value, hash_move
+
         # find our possible moves from board state
         moves = game.get_legal_moves(game.active_player)
 
+        if self.move_ordering:
+            if hash_move is None and game.move_count == self._root_move_count:
+                hash_move = self._root_best
+            moves = self._order_moves(game, moves, hash_move, maximizing_player)
+
         # initialize minmax depending on active player
         if maximizing_player == True:
             minmax_score = float("-inf")
@@ -530,12 +1428,37 @@ class CustomPlayer:
             minmax_score = float("inf")
             new_beta = beta
 
+        in_place = walks_in_place(game)
+
+        # frontier node: score all the children with one call of the batch
+        # version of the heuristic, if it has one
+        scores = None
+        if depth == 1 and in_place and len(moves) >= self.BATCH_MIN_MOVES and \
+                self._batch_leaves(game):
+            scores = self.score.batch(game, self, moves)
+            if stats is not None:
+                stats.leaves += len(moves)
+
         # for each legal move, consider new board state
-        for move in moves:
-            next_game = game.forecast_move(move)
+        for i, move in enumerate(moves):
+            if maximizing_player:
+                child_alpha, child_beta = new_alpha, beta
+            else:
+                child_alpha, child_beta = alpha, new_beta
+
+            if scores is not None:
+                score = scores[i]
+            elif in_place:
+                game.apply_move(move)
+                try:
+                    score, _ = self.alphabeta(game, depth-1, child_alpha, child_beta, not maximizing_player)
+                finally:
+                    game.undo_move()
+            else:
+                next_game = game.forecast_move(move)
+                score, _ = self.alphabeta(next_game, depth-1, child_alpha, child_beta, not maximizing_player)
 
             if maximizing_player:
-                score, _ = self.alphabeta(next_game, depth-1, new_alpha, beta, not maximizing_player)
                 if score >= minmax_score:
                     minmax_score = score
                     new_alpha = minmax_score
@@ -543,10 +1466,13 @@ class CustomPlayer:
                 # the parent node (a minimizing node) will
                 # not pick this node or any of its children
                 if minmax_score >= beta:
-                    return minmax_score, best_move
+                    if self.move_ordering:
+                        self._record_cutoff(game, move, depth, maximizing_player)
+                    if stats is not None:
+                        stats.record_cutoff(i)
+                    break
 
             if not maximizing_player:
-                score, _ = self.alphabeta(next_game, depth-1, alpha, new_beta, not maximizing_player)
                 if score <= minmax_score:
                     minmax_score = score
                     new_beta = minmax_score
@@ -554,6 +1480,142 @@ class CustomPlayer:
                 # the parent node (a maximizing node) will
                 # not pick this node or any of its children
                 if minmax_score <= alpha:
-                    return minmax_score, best_move
+                    if self.move_ordering:
+                        self._record_cutoff(game, move, depth, maximizing_player)
+                    if stats is not None:
+                        stats.record_cutoff(i)
+                    break
+
+        if tt is not None:
+            if minmax_score >= beta:
+                bound = LOWER
+            elif minmax_score <= alpha:
+                bound = UPPER
+            else:
+                bound = EXACT
+            tt.store(key, depth, bound, minmax_score, best_move)
 
         return minmax_score, best_move
+
+
+    def pvs(self, game, depth, alpha=float("-inf"), beta=float("inf"), maximizing_player=True):
+        """Principal variation search: alpha-beta search that searches the
+        first move of each node with the full window and every other move
+        with a null window, searching again with the full window only when
+        a move turns out to be better than the current best.
+
+        Parameters
+        ----------
+        game : isolation.Board
+            An instance of the Isolation game `Board` class representing the
+            current game state
+
+        depth : int
+            Depth is an integer representing the maximum number of plies to
+            search in the game tree before aborting
+
+        alpha : float
+            Alpha limits the lower bound of search on minimizing layers
+
+        beta : float
+            Beta limits the upper bound of search on maximizing layers
+
+        maximizing_player : bool
+            Flag indicating whether the current search depth corresponds to a
+            maximizing layer (True) or a minimizing layer (False)
+
+        Returns
+        -------
+        float
+            The score for the current search branch
+
+        tuple(int, int)
+            The best move for the current branch; (-1, -1) for no legal moves
+        """
+        if self.time_left() < self.TIMER_THRESHOLD:
+            raise Timeout()
+
+        stats = self.stats
+        if stats is not None:
+            stats.nodes += 1
+
+        solved = self._solve_endgame(game, maximizing_player)
+        if solved is not None:
+            return solved
+
+        if depth == 0:
+            if stats is not None:
+                stats.leaves += 1
+            return self.score(game, self), [-1, -1]
+
+        tt = self.tt
+        hash_move = None
+        if tt is not None:
+            key = game.hash_key
+            entry = tt.lookup(key)
+            if entry is not None:
+                _, stored_depth, bound, value, hash_move = entry
+                if stored_depth >= depth and (
+                        bound == EXACT or (bound == LOWER and value >= beta) or
+                        (bound == UPPER and value <= alpha)):
+                    return value, hash_move
+
+        moves = game.get_legal_moves(game.active_player)
+        if self.move_ordering:
+            if hash_move is None and game.move_count == self._root_move_count:
+                hash_move = self._root_best
+            moves = self._order_moves(game, moves, hash_move, maximizing_player)
+
+        in_place = walks_in_place(game)
+        best_move = [-1, -1]
+        best_score = float("-inf") if maximizing_player else float("inf")
+        low, high = alpha, beta
+
+        for index, move in enumerate(moves):
+            if in_place:
+                game.apply_move(move)
+                child = game
+            else:
+                child = game.forecast_move(move)
+            try:
+                if index == 0:
+                    score, _ = self.pvs(child, depth-1, low, high, not maximizing_player)
+                elif maximizing_player:
+                    # prove the move is no better than the best one so far
+                    score, _ = self.pvs(child, depth-1, low, math.nextafter(low, math.inf), False)
+                    if low < score < high:
+                        score, _ = self.pvs(child, depth-1, low, high, False)
+                else:
+                    score, _ = self.pvs(child, depth-1, math.nextafter(high, -math.inf), high, True)
+                    if low < score < high:
+                        score, _ = self.pvs(child, depth-1, low, high, True)
+            finally:
+                if in_place:
+                    game.undo_move()
+
+            if maximizing_player:
+                if score > best_score or index == 0:
+                    best_score, best_move = score, move
+                    low = max(low, score)
+            else:
+                if score < best_score or index == 0:
+                    best_score, best_move = score, move
+                    high = min(high, score)
+
+            if low >= high:
+                if self.move_ordering:
+                    self._record_cutoff(game, move, depth, maximizing_player)
+                if stats is not None:
+                    stats.record_cutoff(index)
+                break
+
+        if tt is not None:
+            if best_score >= beta:
+                bound = LOWER
+            elif best_score <= alpha:
+                bound = UPPER
+            else:
+                bound = EXACT
+            tt.store(key, depth, bound, best_score, best_move)
+
+        return best_score, best_move
@@ -9,8 +9,15 @@ legal moves loses, and the opponent is declared the winner.
 
 import io
 
-# Make the Board class available at the root of the module for imports
+# Make the Board classes available at the root of the module for imports
 from .isolation import Board
+from .bitboard import BitBoard
+from .book import OpeningBook, write_book
+from .records import GameRecord, RecordWriter, read_records, record_game
+from .replay import ReplayIndex, render_game
+
+# Board engines selectable by name (e.g., from the tournament command line)
+ENGINES = {"board": Board, "bitboard": BitBoard}
 
 
 def game_as_text(winner, move_history, termination="", board=Board(1, 2)):
@@ -0,0 +1,134 @@
+"""
+This file contains the helpers for the batch versions of heuristics: score
+functions that evaluate all the children of a game state at once with NumPy
+instead of calling the scalar heuristic on every child board.
+
+A heuristic offers a batch version through its `batch` attribute (see
+`register_batch()`), a callable `batch(game, player, moves)` that returns
+the list `[score_fn(game.forecast_move(m), player) for m in moves]`,
+computed without creating the child boards. NumPy is optional: without it
+no batch version is registered and searches call the scalar heuristics.
+"""
+
+from functools import lru_cache
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def register_batch(score_fn, batch_fn):
+    """ Attach `batch_fn` as the batch version of `score_fn` if NumPy is
+    available. Returns `score_fn`. """
+    if np is not None:
+        score_fn.batch = batch_fn
+    return score_fn
+
+
+@lru_cache(maxsize=None)
+def adjacency(width, height):
+    """ Return the knight move graph of a board size as an integer matrix
+    A, where A[i, j] is 1 if a knight can move from cell i to cell j. """
+    from .tables import get_geometry
+
+    size = width * height
+    matrix = np.zeros((size, size), dtype=np.int32)
+    for index, targets in enumerate(get_geometry(width, height).moves):
+        for r, c in targets:
+            matrix[index, r * width + c] = 1
+    return matrix
+
+
+def open_cells(board):
+    """ Return the open cells of a board as a 0/1 integer vector indexed by
+    row * width + col. """
+    size = board.width * board.height
+    raw = board._open_mask().to_bytes((size + 7) // 8, "little")
+    bits = np.unpackbits(np.frombuffer(raw, dtype=np.uint8), bitorder="little")
+    return bits[:size].astype(np.int32)
+
+
+def child_mobility(board, player, moves):
+    """
+    Count the legal moves of both players in each child of a game state.
+
+    Parameters
+    ----------
+    board : isolation.Board
+        The parent game state; it is not modified.
+
+    player : object
+        The player whose point of view the counts take.
+
+    moves : list<(int, int)>
+        Legal moves of the active player; one child per move.
+
+    Returns
+    ----------
+    (numpy.ndarray, numpy.ndarray, bool) or None
+        The number of legal moves of `player` and of its opponent in each
+        child, and whether `player` is the one making the moves. None if a
+        player has not moved yet, in which case the counts do not follow
+        from the knight move graph.
+    """
+    locations = board._slot_locations()
+    if locations[0] is None or locations[1] is None:
+        return None
+
+    width = board.width
+    matrix = adjacency(width, board.height)
+    open_vector = open_cells(board)
+    targets = np.array([r * width + c for r, c in moves], dtype=np.intp)
+    active = board._active_slot()
+    waiting = locations[1 - active][0] * width + locations[1 - active][1]
+
+    # a knight cannot move to its own cell, so moving to a target does not
+    # change the number of open cells next to it
+    mover = matrix[targets] @ open_vector
+    other = (matrix[waiting] @ open_vector) - matrix[waiting, targets]
+    if board._player_slot(player) == active:
+        return mover, other, True
+    return other, mover, False
+
+
+def with_terminals(values, own, opp, player_moved):
+    """ Replace the heuristic `values` of the children by +/-inf where the
+    child is won or lost for the player, and return them as a list of
+    Python floats. In a child the player that did not move is to move, so
+    only that player can have lost. """
+    if player_moved:
+        values = np.where(opp == 0, float("inf"), values)
+    else:
+        values = np.where(own == 0, float("-inf"), values)
+    return values.astype(float).tolist()
+
+
+def mobility_batch(score_fn, values):
+    """
+    Build the batch version of a heuristic that only depends on the number
+    of legal moves of the two players.
+
+    Parameters
+    ----------
+    score_fn : callable
+        The scalar heuristic, used for children that the move counts do not
+        describe (before both players have moved).
+
+    values : callable
+        Maps the arrays of move counts (own, opponent) of the children to
+        the array of their heuristic values.
+
+    Returns
+    ----------
+    callable
+        A function batch(game, player, moves) that returns the list of the
+        heuristic values of the children of `game` reached by `moves`.
+    """
+    def batch(game, player, moves):
+        counts = child_mobility(game, player, moves)
+        if counts is None:
+            return [score_fn(game.forecast_move(m), player) for m in moves]
+        own, opp, player_moved = counts
+        return with_terminals(values(own, opp), own, opp, player_moved)
+    return batch
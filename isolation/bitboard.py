@@ -0,0 +1,216 @@
+"""
+This file contains the `BitBoard` class, an alternative engine for the game
+Isolation that packs the blocked cells of the board into a single integer
+(one bit per cell) instead of a list of row lists.
+
+`BitBoard` is a drop-in replacement for `isolation.Board`: it accepts the
+same constructor arguments and exposes the same public methods, so player
+code written against `Board` works unchanged with either engine.
+"""
+
+from operator import xor
+
+from .isolation import Board
+from .tables import get_geometry
+
+
+class BitBoard(Board):
+    """
+    Implement a model for the game Isolation assuming each player moves like
+    a knight in chess, storing the blocked cells as the bits of an integer.
+
+    Parameters
+    ----------
+    player_1 : object
+        An object with a get_move() function. This is the only function
+        directly called by the Board class for each player.
+
+    player_2 : object
+        An object with a get_move() function. This is the only function
+        directly called by the Board class for each player.
+
+    width : int (optional)
+        The number of columns that the board should have.
+
+    height : int (optional)
+        The number of rows that the board should have.
+    """
+
+    __slots__ = ("_blocked",)
+
+    def __init__(self, player_1, player_2, width=7, height=7):
+        self.width = width
+        self.height = height
+        self.move_count = 0
+        self.__player_1__ = player_1
+        self.__player_2__ = player_2
+        self._players = (player_1, player_2)
+        self._active = 0
+        self._blocked = 0
+        self._locations = [Board.NOT_MOVED, Board.NOT_MOVED]
+        self._geometry = get_geometry(width, height)
+        self._undo_stack = []
+        self._hash_key = None
+        self._symmetric_blocked = None
+        self._regions = None
+
+    @property
+    def __board_state__(self):
+        """
+        The board as a list of row lists, for compatibility with code that
+        inspects `Board.__board_state__` directly. Blocked cells are marked
+        with 1 because the bitboard does not record which player blocked them.
+        """
+        blocked = self._blocked
+        return [[1 if blocked >> (i * self.width + j) & 1 else Board.BLANK
+                 for j in range(self.width)] for i in range(self.height)]
+
+    @__board_state__.setter
+    def __board_state__(self, state):
+        blocked = 0
+        for i, row in enumerate(state):
+            for j, value in enumerate(row):
+                if value != Board.BLANK:
+                    blocked |= 1 << (i * self.width + j)
+        self._blocked = blocked
+        self._reset_keys()
+
+    def copy(self):
+        """ Return a deep copy of the current board. """
+        new_board = self.__class__.__new__(self.__class__)
+        new_board.width = self.width
+        new_board.height = self.height
+        new_board.move_count = self.move_count
+        new_board.__player_1__ = self.__player_1__
+        new_board.__player_2__ = self.__player_2__
+        new_board._players = self._players
+        new_board._active = self._active
+        new_board._blocked = self._blocked
+        new_board._locations = self._locations[:]
+        new_board._geometry = self._geometry
+        new_board._undo_stack = self._undo_stack[:]
+        new_board._hash_key = self._hash_key
+        new_board._symmetric_blocked = self._symmetric_blocked
+        new_board._regions = None
+        if hasattr(self, "__dict__"):
+            # attributes added by subclasses without __slots__
+            new_board.__dict__.update(self.__dict__)
+        return new_board
+
+    def move_is_legal(self, move):
+        """
+        Test whether a move is legal in the current game state.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+
+        Returns
+        ----------
+        bool
+            Returns True if the move is legal, False otherwise
+        """
+        row, col = move
+        return 0 <= row < self.height and \
+               0 <= col < self.width and \
+               not self._blocked >> (row * self.width + col) & 1
+
+    def get_blank_spaces(self):
+        """
+        Return a list of the locations that are still available on the board.
+        """
+        blocked = self._blocked
+        return [move for move, bit in self._geometry.cells if not blocked & bit]
+
+    def apply_move(self, move):
+        """
+        Move the active player to a specified location.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+
+        Returns
+        ----------
+        None
+        """
+        row, col = move
+        active = self._active
+        previous = self._locations[active]
+        self._undo_stack.append(previous)
+        self._locations[active] = move
+        self._blocked |= 1 << (row * self.width + col)
+        self._active = 1 - active
+        self.move_count += 1
+        self._regions = None
+        if self._hash_key is not None:
+            self._hash_key ^= self._geometry.zobrist_move(active, previous, move)
+            if self.CHECK_HASH:
+                self.check_hash_key()
+        if self._symmetric_blocked is not None:
+            self._symmetric_blocked = tuple(map(
+                xor, self._symmetric_blocked, self._geometry.zobrist_symmetric[row * self.width + col]))
+
+    def undo_move(self):
+        """
+        Revert the most recent call to apply_move(), restoring the board
+        to exactly the state it had before that move was applied.
+
+        Returns
+        ----------
+        None
+        """
+        active = self._active = 1 - self._active
+        move = self._locations[active]
+        previous = self._undo_stack.pop()
+        row, col = move
+        self._blocked &= ~(1 << (row * self.width + col))
+        self._locations[active] = previous
+        self.move_count -= 1
+        self._regions = None
+        if self._hash_key is not None:
+            self._hash_key ^= self._geometry.zobrist_move(active, previous, move)
+            if self.CHECK_HASH:
+                self.check_hash_key()
+        if self._symmetric_blocked is not None:
+            self._symmetric_blocked = tuple(map(
+                xor, self._symmetric_blocked, self._geometry.zobrist_symmetric[row * self.width + col]))
+
+    def _blocked_indices(self):
+        """ Return the indices (row * width + col) of the blocked cells. """
+        blocked = self._blocked
+        return [index for index in range(self.width * self.height) if blocked >> index & 1]
+
+    def _blocked_mask(self):
+        """ Return the blocked cells as a bitmask (bit row * width + col). """
+        return self._blocked
+
+    def _set_cells(self, cells):
+        """ Replace the blocked cells by the nonzero bytes of `cells`, one
+        byte per cell index. """
+        self._blocked = self._geometry.cells_mask(cells)
+        self._reset_keys()
+
+    def __get_moves__(self, move):
+        """
+        Generate the list of possible moves for an L-shaped motion (like a
+        knight in chess).
+        """
+        if move == Board.NOT_MOVED:
+            return self.get_blank_spaces()
+
+        r, c = move
+        blocked = self._blocked
+        return [target for target, bit in self._geometry.move_bits[r * self.width + c]
+                if not blocked & bit]
+
+    def to_string(self):
+        """Generate a string representation of the current game state, marking
+        the location of each player and indicating which cells have been
+        blocked, and which remain open.
+        """
+        return self._geometry.render(self._geometry.mask_cells(self._blocked), self._locations)
@@ -0,0 +1,136 @@
+"""
+This file contains the reader and writer of opening books: files that map
+game states to the move to play in them, so that an agent can skip the
+search in the opening, where the branching factor is highest.
+
+Game states are stored once per symmetry class, under their canonical key
+(see `Board.canonical_key()`), with the move expressed in the orientation
+that produces the canonical key. A book file is a header followed by
+fixed-size records sorted by key, so it can be searched in place through a
+memory map without being parsed:
+
+    header  : magic b"ISOB", width (uint16), height (uint16), count (uint32)
+    record  : canonical key (uint64), move cell index (uint16)
+
+All values are little-endian.
+"""
+
+import mmap
+import struct
+
+HEADER = struct.Struct("<4sHHI")
+RECORD = struct.Struct("<QH")
+MAGIC = b"ISOB"
+
+
+def _canonical_symmetry(board):
+    """ Return the canonical key of a board and the permutation of the
+    symmetry that maps the board onto its canonical orientation. """
+    keys = board.symmetry_keys()
+    key = min(keys)
+    return key, board._geometry.symmetries[keys.index(key)][1]
+
+
+def write_book(path, entries, width=7, height=7):
+    """
+    Write an opening book file.
+
+    Parameters
+    ----------
+    path : str
+        The name of the file to write.
+
+    entries : iterable<(isolation.Board, (int, int))>
+        Game states paired with the move to play in them. States that are
+        mirror images of one another are stored once (the last one wins).
+
+    width, height : int (optional)
+        The size of the board the book is for.
+
+    Returns
+    ----------
+    int
+        The number of records written.
+    """
+    records = {}
+    for board, move in entries:
+        if (board.width, board.height) != (width, height):
+            raise ValueError("book is for {}x{} boards, got {}x{}".format(
+                width, height, board.width, board.height))
+        key, permutation = _canonical_symmetry(board)
+        records[key] = permutation[move[0] * width + move[1]]
+
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, width, height, len(records)))
+        for key in sorted(records):
+            f.write(RECORD.pack(key, records[key]))
+    return len(records)
+
+
+class OpeningBook(object):
+    """
+    Read-only view of an opening book file. The file is only opened and
+    memory-mapped on the first lookup, so creating the object is free.
+
+    Parameters
+    ----------
+    path : str
+        The name of a file written by `write_book()`.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._map = None
+
+    def __getstate__(self):
+        # memory maps cannot be pickled; the copy maps the file again
+        state = self.__dict__.copy()
+        state["_map"] = None
+        return state
+
+    def _open(self):
+        with open(self.path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.width, self.height, self.count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self._map.close()
+            self._map = None
+            raise ValueError("{} is not an opening book".format(self.path))
+
+    def __len__(self):
+        if self._map is None:
+            self._open()
+        return self.count
+
+    def lookup(self, board):
+        """
+        Return the book move for the game state of `board`, or None if the
+        state is not in the book.
+
+        Parameters
+        ----------
+        board : isolation.Board
+            The game state to look up; it is not modified.
+
+        Returns
+        ----------
+        (int, int) or None
+            The move for the active player, as a (row, column) pair.
+        """
+        if self._map is None:
+            self._open()
+        if (board.width, board.height) != (self.width, self.height):
+            return None
+
+        key, permutation = _canonical_symmetry(board)
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            stored, cell = RECORD.unpack_from(self._map, HEADER.size + mid * RECORD.size)
+            if stored < key:
+                lo = mid + 1
+            elif stored > key:
+                hi = mid
+            else:
+                return divmod(permutation.index(cell), self.width)
+        return None
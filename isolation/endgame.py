@@ -0,0 +1,127 @@
+"""
+This file contains an exact solver for Isolation endgames in which the two
+players have been separated, i.e., no open cell can be reached by both of
+them any more.
+
+From then on the players never interact: each one can only walk its own
+region, and the winner is the player with the longer knight path through
+its region. The player to move loses if its longest path is not strictly
+longer than the opponent's, because it runs out of moves first.
+
+Regions and paths are represented with bitmasks over the cell indices
+`row * width + col`; the regions come from `Board.get_reachable()` and the
+paths are walked with the knight move masks of `isolation.tables`.
+"""
+
+
+class EndgameSolver(object):
+    """
+    Solve separated positions exactly. Longest paths are memoised by
+    (reachable region bitmask, cell), so the solutions of the positions met
+    while searching one endgame are shared.
+
+    Parameters
+    ----------
+    max_cells : int (optional)
+        The largest number of open cells the two regions may hold together
+        for solve() to attempt a solution; larger endgames are left to the
+        heuristic search because the longest path is exponential in the
+        size of the region.
+    """
+
+    # number of new longest-path states between calls of the interrupt
+    INTERRUPT_INTERVAL = 256
+
+    def __init__(self, max_cells=20):
+        self.max_cells = max_cells
+        self.memo = {}
+        self._interrupt = None
+        self._countdown = self.INTERRUPT_INTERVAL
+
+    def clear(self):
+        """ forget the memoised path lengths """
+        self.memo.clear()
+
+    def longest_path(self, geometry, region, start):
+        """
+        Return the number of moves in the longest knight path that starts
+        on the cell `start` and visits only cells of `region`, which must be
+        the cells reachable from `start`.
+        """
+        key = (region, start)
+        length = self.memo.get(key)
+        if length is not None:
+            return length
+
+        if self._interrupt is not None:
+            self._countdown -= 1
+            if not self._countdown:
+                self._countdown = self.INTERRUPT_INTERVAL
+                self._interrupt()
+
+        length = 0
+        bound = bin(region).count("1")
+        moves = geometry.masks[start] & region
+        while moves and length < bound:
+            low = moves & -moves
+            moves ^= low
+            index = low.bit_length() - 1
+            rest = geometry.flood_fill(region ^ low, index)
+            length = max(length, 1 + self.longest_path(geometry, rest, index))
+        self.memo[key] = length
+        return length
+
+    def solve(self, board, interrupt=None):
+        """
+        Solve the game state of `board` if the players are separated.
+
+        Parameters
+        ----------
+        board : isolation.Board
+            The game state to solve; it is not modified.
+
+        interrupt : callable (optional)
+            Called periodically while solving; it may raise an exception to
+            abandon the solution (e.g., when the time for a move runs out).
+            Path lengths found before the exception stay memoised.
+
+        Returns
+        ----------
+        (bool, (int, int)) or None
+            None if the players can still reach a common cell (or the
+            regions are larger than `max_cells`). Otherwise, whether the
+            active player wins, and the first move of its longest path
+            (None if it has no legal move).
+        """
+        locations = board._slot_locations()
+        if locations[0] is None or locations[1] is None:
+            return None
+
+        geometry = board._geometry
+        width = board.width
+        active = board._active_slot()
+        own = locations[active][0] * width + locations[active][1]
+        other = locations[1 - active][0] * width + locations[1 - active][1]
+
+        own_region = board._reachable_mask(active)
+        other_region = board._reachable_mask(1 - active)
+        if own_region & other_region or \
+                bin(own_region | other_region).count("1") > self.max_cells:
+            return None
+
+        self._interrupt = interrupt
+        try:
+            other_length = self.longest_path(geometry, other_region, other)
+            best_length, best_move = -1, None
+            moves = geometry.masks[own] & own_region
+            while moves:
+                low = moves & -moves
+                moves ^= low
+                index = low.bit_length() - 1
+                length = self.longest_path(geometry, geometry.flood_fill(own_region ^ low, index),
+                                           index)
+                if length > best_length:
+                    best_length, best_move = length, divmod(index, width)
+        finally:
+            self._interrupt = None
+        return best_length + 1 > other_length, best_move
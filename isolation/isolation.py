@@ -10,8 +10,10 @@ be available to project reviewers.
 
 import timeit
 
-from copy import deepcopy
-from copy import copy
+from contextlib import contextmanager
+from operator import xor
+
+from .tables import get_geometry
 
 
 TIME_LIMIT_MILLIS = 200
@@ -41,17 +43,97 @@ class Board(object):
     BLANK = 0
     NOT_MOVED = None
 
+    # when True, every update of the Zobrist key is checked against a key
+    # recomputed from scratch (slow; for debugging and tests only)
+    CHECK_HASH = False
+
+    __slots__ = ("width", "height", "move_count", "__player_1__", "__player_2__",
+                 "_players", "_active", "_grid", "_locations", "_geometry",
+                 "_undo_stack", "_hash_key", "_symmetric_blocked", "_regions")
+
     def __init__(self, player_1, player_2, width=7, height=7):
         self.width = width
         self.height = height
         self.move_count = 0
         self.__player_1__ = player_1
         self.__player_2__ = player_2
-        self.__active_player__ = player_1
-        self.__inactive_player__ = player_2
-        self.__board_state__ = [[Board.BLANK for i in range(width)] for j in range(height)]
-        self.__last_player_move__ = {player_1: Board.NOT_MOVED, player_2: Board.NOT_MOVED}
-        self.__player_symbols__ = {Board.BLANK: Board.BLANK, player_1: 1, player_2: 2}
+        # players are referred to by slot: 0 for player 1, 1 for player 2
+        self._players = (player_1, player_2)
+        self._active = 0
+        # one byte per cell (index row * width + col): BLANK, or the symbol
+        # (slot + 1) of the player that blocked the cell
+        self._grid = bytearray(width * height)
+        self._locations = [Board.NOT_MOVED, Board.NOT_MOVED]
+        self._geometry = get_geometry(width, height)
+        self._undo_stack = []
+        self._hash_key = None
+        self._symmetric_blocked = None
+        self._regions = None
+
+    def _slot(self, player):
+        """ Return the index (0 or 1) of a registered player. """
+        if player == self.__player_1__:
+            return 0
+        if player == self.__player_2__:
+            return 1
+        raise KeyError(player)
+
+    @property
+    def __active_player__(self):
+        return self._players[self._active]
+
+    @__active_player__.setter
+    def __active_player__(self, player):
+        self._active = self._slot(player)
+        self._reset_keys()
+
+    @property
+    def __inactive_player__(self):
+        return self._players[1 - self._active]
+
+    @__inactive_player__.setter
+    def __inactive_player__(self, player):
+        self._active = 1 - self._slot(player)
+        self._reset_keys()
+
+    @property
+    def __board_state__(self):
+        """
+        The board as a list of row lists holding BLANK or the symbol of the
+        player that blocked each cell. This is a copy built on every access;
+        assign a new state to change the board.
+        """
+        grid, width = self._grid, self.width
+        return [list(grid[i * width:(i + 1) * width]) for i in range(self.height)]
+
+    @__board_state__.setter
+    def __board_state__(self, state):
+        self._grid = bytearray(value for row in state for value in row)
+        self._reset_keys()
+
+    @property
+    def __last_player_move__(self):
+        """
+        The location of each player, keyed by player. This is a copy built
+        on every access; assign a new dict to move the players.
+        """
+        return {self.__player_1__: self._locations[0],
+                self.__player_2__: self._locations[1]}
+
+    @__last_player_move__.setter
+    def __last_player_move__(self, locations):
+        self._locations = [locations[self.__player_1__], locations[self.__player_2__]]
+        self._reset_keys()
+
+    @property
+    def __player_symbols__(self):
+        return {Board.BLANK: Board.BLANK, self.__player_1__: 1, self.__player_2__: 2}
+
+    @__player_symbols__.setter
+    def __player_symbols__(self, symbols):
+        # the symbols are fixed by the player slots; accepted so that code
+        # copying boards attribute by attribute keeps working
+        pass
 
     @property
     def active_player(self):
@@ -59,7 +141,7 @@ class Board(object):
         The object registered as the player holding initiative in the
         current game state.
         """
-        return self.__active_player__
+        return self._players[self._active]
 
     @property
     def inactive_player(self):
@@ -67,7 +149,7 @@ class Board(object):
         The object registered as the player in waiting for the current
         game state.
         """
-        return self.__inactive_player__
+        return self._players[1 - self._active]
 
     def get_opponent(self, player):
         """
@@ -85,21 +167,33 @@ class Board(object):
         object
             The opponent of the input player object.
         """
-        if player == self.__active_player__:
-            return self.__inactive_player__
-        elif player == self.__inactive_player__:
-            return self.__active_player__
+        if player == self._players[self._active]:
+            return self._players[1 - self._active]
+        elif player == self._players[1 - self._active]:
+            return self._players[self._active]
         raise RuntimeError("`player` must be an object registered as a player in the current game.")
 
     def copy(self):
         """ Return a deep copy of the current board. """
-        new_board = Board(self.__player_1__, self.__player_2__, width=self.width, height=self.height)
+        cls = self.__class__
+        new_board = cls.__new__(cls)
+        new_board.width = self.width
+        new_board.height = self.height
         new_board.move_count = self.move_count
-        new_board.__active_player__ = self.__active_player__
-        new_board.__inactive_player__ = self.__inactive_player__
-        new_board.__last_player_move__ = copy(self.__last_player_move__)
-        new_board.__player_symbols__ = copy(self.__player_symbols__)
-        new_board.__board_state__ = deepcopy(self.__board_state__)
+        new_board.__player_1__ = self.__player_1__
+        new_board.__player_2__ = self.__player_2__
+        new_board._players = self._players
+        new_board._active = self._active
+        new_board._grid = self._grid[:]
+        new_board._locations = self._locations[:]
+        new_board._geometry = self._geometry
+        new_board._undo_stack = self._undo_stack[:]
+        new_board._hash_key = self._hash_key
+        new_board._symmetric_blocked = self._symmetric_blocked
+        new_board._regions = None
+        if hasattr(self, "__dict__"):
+            # attributes added by subclasses without __slots__
+            new_board.__dict__.update(self.__dict__)
         return new_board
 
     def forecast_move(self, move):
@@ -140,14 +234,14 @@ class Board(object):
         row, col = move
         return 0 <= row < self.height and \
                0 <= col < self.width and \
-               self.__board_state__[row][col] == Board.BLANK
+               self._grid[row * self.width + col] == Board.BLANK
 
     def get_blank_spaces(self):
         """
         Return a list of the locations that are still available on the board.
         """
-        return [(i, j) for j in range(self.width) for i in range(self.height)
-            if self.__board_state__[i][j] == Board.BLANK]
+        grid = self._grid
+        return [move for move, index in self._geometry.cell_indices if grid[index] == Board.BLANK]
 
     def get_player_location(self, player):
         """
@@ -163,7 +257,7 @@ class Board(object):
         (int, int)
             The coordinate pair (row, column) of the input player.
         """
-        return self.__last_player_move__[player]
+        return self._locations[self._slot(player)]
 
     def get_legal_moves(self, player=None):
         """
@@ -182,8 +276,8 @@ class Board(object):
             for the player constrained by the current game state.
         """
         if player is None:
-            player = self.active_player
-        return self.__get_moves__(self.__last_player_move__[player])
+            return self.__get_moves__(self._locations[self._active])
+        return self.__get_moves__(self._locations[self._slot(player)])
 
     def apply_move(self, move):
         """
@@ -200,10 +294,302 @@ class Board(object):
         None
         """
         row, col = move
-        self.__last_player_move__[self.active_player] = move
-        self.__board_state__[row][col] = self.__player_symbols__[self.active_player]
-        self.__active_player__, self.__inactive_player__ = self.__inactive_player__, self.__active_player__
+        index = row * self.width + col
+        active = self._active
+        previous = self._locations[active]
+        self._undo_stack.append(previous)
+        self._locations[active] = move
+        self._grid[index] = active + 1
+        self._active = 1 - active
         self.move_count += 1
+        self._regions = None
+        if self._hash_key is not None:
+            self._hash_key ^= self._geometry.zobrist_move(active, previous, move)
+            if self.CHECK_HASH:
+                self.check_hash_key()
+        if self._symmetric_blocked is not None:
+            self._symmetric_blocked = tuple(map(
+                xor, self._symmetric_blocked, self._geometry.zobrist_symmetric[index]))
+
+    def undo_move(self):
+        """
+        Revert the most recent call to apply_move(), restoring the board
+        to exactly the state it had before that move was applied.
+
+        Returns
+        ----------
+        None
+        """
+        active = self._active = 1 - self._active
+        move = self._locations[active]
+        previous = self._undo_stack.pop()
+        index = move[0] * self.width + move[1]
+        self._grid[index] = Board.BLANK
+        self._locations[active] = previous
+        self.move_count -= 1
+        self._regions = None
+        if self._hash_key is not None:
+            self._hash_key ^= self._geometry.zobrist_move(active, previous, move)
+            if self.CHECK_HASH:
+                self.check_hash_key()
+        if self._symmetric_blocked is not None:
+            self._symmetric_blocked = tuple(map(
+                xor, self._symmetric_blocked, self._geometry.zobrist_symmetric[index]))
+
+    @property
+    def hash_key(self):
+        """
+        The 64-bit Zobrist key of the current game state, covering the
+        blocked cells, the location of both players and the side to move.
+        The key is updated incrementally by apply_move() and undo_move().
+        """
+        if self._hash_key is None:
+            self._hash_key = self.compute_hash_key()
+        return self._hash_key
+
+    def _blocked_indices(self):
+        """ Return the indices (row * width + col) of the blocked cells. """
+        return [index for index, value in enumerate(self._grid) if value != Board.BLANK]
+
+    def _blocked_mask(self):
+        """ Return the blocked cells as a bitmask (bit row * width + col). """
+        mask = 0
+        for index in self._blocked_indices():
+            mask |= 1 << index
+        return mask
+
+    def _set_cells(self, cells):
+        """ Replace the blocked cells by `cells`, one byte per cell index:
+        BLANK, or the symbol of the player that blocked the cell. """
+        self._grid = bytearray(cells)
+        self._reset_keys()
+
+    def _slot_locations(self):
+        """ Return the locations of player 1 and player 2, in that order. """
+        return self._locations
+
+    def _active_slot(self):
+        """ Return 0 if player 1 is to move and 1 if player 2 is to move. """
+        return self._active
+
+    def _reset_keys(self):
+        """ Drop the cached keys after the state was replaced wholesale. """
+        self._hash_key = None
+        self._symmetric_blocked = None
+        self._regions = None
+
+    def _region_cache(self):
+        """ Return the cache of region masks, which is emptied by every
+        apply_move() and undo_move(). """
+        if self._regions is None:
+            self._regions = {}
+        return self._regions
+
+    def _open_mask(self):
+        """ Return the open cells as a bitmask (bit row * width + col). """
+        cache = self._region_cache()
+        if "open" not in cache:
+            cache["open"] = ((1 << (self.width * self.height)) - 1) & ~self._blocked_mask()
+        return cache["open"]
+
+    def _reachable_mask(self, slot):
+        """ Return the bitmask of the cells the player in `slot` (0 for
+        player 1, 1 for player 2) can still reach. """
+        cache = self._region_cache()
+        key = ("reachable", slot)
+        if key not in cache:
+            location = self._slot_locations()[slot]
+            if location is None:
+                cache[key] = self._open_mask()
+            else:
+                cache[key] = self._geometry.flood_fill(self._open_mask(),
+                                                       location[0] * self.width + location[1])
+        return cache[key]
+
+    def _territory_masks(self):
+        """ Return the bitmasks of the cells player 1 and player 2 reach in
+        strictly fewer moves than the other player. """
+        cache = self._region_cache()
+        if "territory" not in cache:
+            geometry = self._geometry
+            open_mask = self._open_mask()
+            fronts = []
+            for location in self._slot_locations():
+                if location is None:
+                    fronts.append(open_mask)
+                else:
+                    fronts.append(geometry.masks[location[0] * self.width + location[1]] & open_mask)
+
+            # breadth-first search from both players at once; a cell goes to
+            # the player whose front reaches it first, ties go to neither
+            claimed = 0
+            territory = [0, 0]
+            while fronts[0] or fronts[1]:
+                first, second = fronts[0] & ~claimed, fronts[1] & ~claimed
+                territory[0] |= first & ~second
+                territory[1] |= second & ~first
+                claimed |= first | second
+                fronts = [geometry.neighbours(first) & open_mask & ~claimed,
+                          geometry.neighbours(second) & open_mask & ~claimed]
+            cache["territory"] = tuple(territory)
+        return cache["territory"]
+
+    def _mask_cells(self, mask):
+        """ Return the (row, col) cells of a bitmask, in the order of
+        get_blank_spaces(). """
+        return [move for move, bit in self._geometry.cells if mask & bit]
+
+    def _player_slot(self, player):
+        """ Return 0 for player 1 and 1 for player 2. """
+        if player is None:
+            return self._active
+        return self._slot(player)
+
+    def get_reachable(self, player=None):
+        """
+        Return the open cells that the specified player can still reach by
+        any sequence of knight moves through open cells, ignoring the moves
+        of the opponent. A player that has not moved yet can reach every
+        open cell.
+
+        Parameters
+        ----------
+        player : object (optional)
+            An object registered as a player in the current game. If None,
+            return the reachable cells of the active player.
+
+        Returns
+        ----------
+        list<(int, int)>
+            The reachable cells, in the order of get_blank_spaces().
+        """
+        return self._mask_cells(self._reachable_mask(self._player_slot(player)))
+
+    def get_components(self):
+        """
+        Partition the open cells into the groups connected by knight moves.
+
+        Returns
+        ----------
+        list<list<(int, int)>>
+            The connected components of the open cells; a cell without an
+            open knight target forms a component of its own.
+        """
+        cache = self._region_cache()
+        if "components" not in cache:
+            geometry = self._geometry
+            remaining = self._open_mask()
+            components = []
+            while remaining:
+                low = remaining & -remaining
+                component = low | geometry.flood_fill(remaining, low.bit_length() - 1)
+                components.append(component)
+                remaining &= ~component
+            cache["components"] = components
+        return [self._mask_cells(component) for component in cache["components"]]
+
+    def get_territory(self):
+        """
+        Split the open cells between the players like a Voronoi diagram:
+        each player gets the cells it can reach in strictly fewer knight
+        moves than its opponent. Cells that both players reach in the same
+        number of moves, or that neither can reach, belong to nobody.
+
+        Returns
+        ----------
+        dict<object, list<(int, int)>>
+            The cells of each player, in the order of get_blank_spaces().
+        """
+        first, second = self._territory_masks()
+        return {self.__player_1__: self._mask_cells(first),
+                self.__player_2__: self._mask_cells(second)}
+
+    def compute_hash_key(self):
+        """ Compute the Zobrist key of the current game state from scratch. """
+        return self._geometry.zobrist_hash(self._blocked_indices(), self._slot_locations(),
+                                           self._active_slot())
+
+    def check_hash_key(self):
+        """
+        Assert that the incrementally maintained Zobrist key matches a key
+        computed from scratch. Called after every move when CHECK_HASH is set.
+        """
+        expected = self.compute_hash_key()
+        assert self.hash_key == expected, \
+            "Zobrist key mismatch: {:#x} != {:#x}".format(self.hash_key, expected)
+
+    def symmetry_keys(self):
+        """
+        Return the Zobrist keys of the current game state after applying
+        each symmetry of the board (see `isolation.tables.Geometry`), with
+        the key of the untransformed state first. The blocked-cell part of
+        the keys is cached and updated incrementally by apply_move() and
+        undo_move() once it has been computed, so no board is copied.
+        """
+        geometry = self._geometry
+        if self._symmetric_blocked is None:
+            keys = (0,) * len(geometry.symmetries)
+            for index in self._blocked_indices():
+                keys = tuple(map(xor, keys, geometry.zobrist_symmetric[index]))
+            self._symmetric_blocked = keys
+        return geometry.symmetry_keys(self._symmetric_blocked, self._slot_locations(),
+                                      self._active_slot())
+
+    def canonical_key(self):
+        """
+        Return the smallest key over the symmetry group of the board, which
+        is the same for a game state and all of its mirror images.
+        """
+        return min(self.symmetry_keys())
+
+    def is_symmetric(self, symmetry):
+        """
+        Test whether the game state maps onto itself, with the players
+        trading places, under the named symmetry (e.g., 'horizontal',
+        'vertical' or 'diagonal'). When this holds, the inactive player can
+        keep the board symmetric by mirroring the active player's moves.
+
+        Parameters
+        ----------
+        symmetry : str
+            The name of one of the symmetries of the board.
+
+        Returns
+        ----------
+        bool
+            True if the blocked cells are invariant under the symmetry and it
+            maps the active player's location onto the inactive player's.
+        """
+        names = [name for name, _ in self._geometry.symmetries]
+        index = names.index(symmetry)
+        self.symmetry_keys()
+        if self._symmetric_blocked[index] != self._symmetric_blocked[0]:
+            return False
+        active = self.get_player_location(self.active_player)
+        inactive = self.get_player_location(self.inactive_player)
+        if active is None or inactive is None:
+            return active is inactive
+        permutation = self._geometry.symmetries[index][1]
+        return permutation[active[0] * self.width + active[1]] == inactive[0] * self.width + inactive[1]
+
+    @contextmanager
+    def pushed(self, move):
+        """
+        Context manager that applies a move on entry and reverts it on exit,
+        e.g., `with game.pushed(move): ...`. Unlike forecast_move(), this
+        modifies the calling object instead of returning a copy.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+        """
+        self.apply_move(move)
+        try:
+            yield self
+        finally:
+            self.undo_move()
 
     def is_winner(self, player):
         """ Test whether the specified player has won the game. """
@@ -256,14 +642,9 @@ class Board(object):
         if move == Board.NOT_MOVED:
             return self.get_blank_spaces()
 
-        r, c = move
-
-        directions = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
-                      (1, -2),  (1, 2), (2, -1),  (2, 1)]
-
-        valid_moves = [(r+dr,c+dc) for dr, dc in directions if self.move_is_legal((r+dr, c+dc))]
-
-        return valid_moves
+        grid = self._grid
+        return [target for target, index in self._geometry.move_indices[move[0] * self.width + move[1]]
+                if grid[index] == Board.BLANK]
 
     def print_board(self):
         """DEPRECATED - use Board.to_string()"""
@@ -274,30 +655,7 @@ class Board(object):
         the location of each player and indicating which cells have been
         blocked, and which remain open.
         """
-
-        p1_loc = self.__last_player_move__[self.__player_1__]
-        p2_loc = self.__last_player_move__[self.__player_2__]
-
-        out = ''
-
-        for i in range(self.height):
-            out += ' | '
-
-            for j in range(self.width):
-
-                if not self.__board_state__[i][j]:
-                    out += ' '
-                elif p1_loc and i == p1_loc[0] and j == p1_loc[1]:
-                    out += '1'
-                elif p2_loc and i == p2_loc[0] and j == p2_loc[1]:
-                    out += '2'
-                else:
-                    out += '-'
-
-                out += ' | '
-            out += '\n\r'
-
-        return out
+        return self._geometry.render(self._grid, self._locations)
 
     def play(self, time_limit=TIME_LIMIT_MILLIS):
         """
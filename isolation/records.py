@@ -0,0 +1,188 @@
+"""
+This file contains a compact binary format for recorded games, with a
+streaming writer that appends games to a file and a reader that yields them
+one at a time, so that millions of games can be logged and analysed without
+holding a whole file in memory.
+
+A record file starts with the magic bytes b"ISOR" and holds a sequence of
+game records, each made of a fixed-size header, the names of the players
+(UTF-8) and one byte per move:
+
+    header  : width, height, winner slot, termination code, length of the
+              name of player 1, length of the name of player 2 (uint8 each),
+              number of moves (uint16)
+    names   : name of player 1, name of player 2
+    moves   : cell index (row * width + col) of every move (uint8)
+
+The moves are all the moves applied to the board from the empty board,
+including the opening moves played before `Board.play()`, and exclude the
+move that ended the game (a move returned too late, or an illegal move).
+The winner slot is 0 for player 1 and 1 for player 2. All values are
+little-endian.
+"""
+
+import struct
+
+from collections import namedtuple
+
+from .isolation import Board
+
+MAGIC = b"ISOR"
+HEADER = struct.Struct("<BBBBBBH")
+
+# termination reasons of Board.play(), by code
+TERMINATIONS = ("", "timeout", "illegal move")
+
+
+class GameRecord(namedtuple("GameRecord", ["width", "height", "players", "winner",
+                                           "termination", "moves"])):
+    """
+    One recorded game.
+
+    Attributes
+    ----------
+    width, height : int
+        The size of the board.
+
+    players : (str, str)
+        The names of player 1 and player 2.
+
+    winner : int
+        The slot of the winner: 0 for player 1, 1 for player 2.
+
+    termination : str
+        The reason the game ended, as reported by `Board.play()`.
+
+    moves : list<(int, int)>
+        Every move applied to the board, from the empty board.
+    """
+
+    __slots__ = ()
+
+    def board(self, ply=None, board_cls=Board):
+        """ Return a board of class `board_cls` holding the game state after
+        the first `ply` moves (after all of them if `ply` is None). The
+        players of the board are the names of the players. """
+        board = board_cls(self.players[0], self.players[1], self.width, self.height)
+        for move in self.moves[:ply]:
+            board.apply_move(move)
+        return board
+
+    def positions(self, board_cls=Board):
+        """ Yield a board of class `board_cls` for every game state of the
+        game, from the empty board to the final one. Each board is a new
+        copy that the caller may keep or modify. """
+        board = board_cls(self.players[0], self.players[1], self.width, self.height)
+        yield board.copy()
+        for move in self.moves:
+            board.apply_move(move)
+            yield board.copy()
+
+
+def record_game(game, opening, winner, move_history, termination="", names=None):
+    """
+    Build the record of a game played with `Board.play()`.
+
+    Parameters
+    ----------
+    game : isolation.Board
+        The board the game was played on.
+
+    opening : list<(int, int)>
+        The moves applied to the empty board before `Board.play()` was called.
+
+    winner, move_history, termination :
+        The values returned by `Board.play()`.
+
+    names : (str, str) (optional)
+        The names of player 1 and player 2; `str()` of the players by
+        default.
+
+    Returns
+    ----------
+    GameRecord
+    """
+    if names is None:
+        names = (str(game.__player_1__), str(game.__player_2__))
+    played = [move for turn in move_history for move in turn]
+    return GameRecord(game.width, game.height, tuple(names),
+                      0 if winner == game.__player_1__ else 1,
+                      termination, list(opening) + played[:-1])
+
+
+class RecordWriter(object):
+    """
+    Append game records to a file, creating it if needed. Usable as a
+    context manager; records are buffered until the writer is closed.
+
+    Parameters
+    ----------
+    path : str
+        The name of the record file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "a+b")
+        self._file.seek(0)
+        magic = self._file.read(len(MAGIC))
+        if not magic:
+            self._file.write(MAGIC)
+        elif magic != MAGIC:
+            self._file.close()
+            raise ValueError("{} is not a game record file".format(path))
+
+    def write(self, record):
+        """ Append a GameRecord to the file. """
+        width = record.width
+        if width * record.height > 255:
+            raise ValueError("moves of {}x{} boards do not fit in one byte".format(
+                width, record.height))
+        names = [name.encode("utf-8") for name in record.players]
+        if max(len(name) for name in names) > 255:
+            raise ValueError("player names are limited to 255 bytes of UTF-8")
+        self._file.write(HEADER.pack(width, record.height, record.winner,
+                                     TERMINATIONS.index(record.termination),
+                                     len(names[0]), len(names[1]), len(record.moves)))
+        self._file.write(names[0] + names[1])
+        self._file.write(bytes(r * width + c for r, c in record.moves))
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_records(path):
+    """
+    Yield the GameRecords of a record file in order, reading the file one
+    record at a time.
+
+    Parameters
+    ----------
+    path : str
+        The name of a file written by `RecordWriter`.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError("{} is not a game record file".format(path))
+        while True:
+            header = f.read(HEADER.size)
+            if not header:
+                return
+            if len(header) < HEADER.size:
+                raise ValueError("truncated record in {}".format(path))
+            width, height, winner, termination, length_1, length_2, count = \
+                HEADER.unpack(header)
+            names = f.read(length_1 + length_2)
+            cells = f.read(count)
+            if len(names) < length_1 + length_2 or len(cells) < count:
+                raise ValueError("truncated record in {}".format(path))
+            players = (names[:length_1].decode("utf-8"), names[length_1:].decode("utf-8"))
+            yield GameRecord(width, height, players, winner,
+                             TERMINATIONS[termination],
+                             [divmod(cell, width) for cell in cells])
@@ -0,0 +1,118 @@
+"""
+This file contains a replay index for recorded games (see records.py): a
+game whose positions can be restored at any ply without replaying every
+earlier move, and rendered to text without building boards.
+
+The index keeps a checkpoint every `interval` plies, a compact snapshot of
+the game state made of the cell bytes of `Board` (BLANK, or the symbol of
+the player that blocked the cell) and the locations of both players.
+Restoring a ply copies the nearest checkpoint at or before it and applies
+at most `interval - 1` moves, so the cost does not grow with the length of
+the game.
+"""
+
+from .isolation import Board
+from .tables import get_geometry
+
+
+class ReplayIndex(object):
+    """
+    Random access to the game states of a recorded game.
+
+    Parameters
+    ----------
+    record : isolation.GameRecord
+        The recorded game.
+
+    interval : int (optional)
+        The number of plies between two checkpoints.
+    """
+
+    def __init__(self, record, interval=8):
+        self.record = record
+        self.interval = interval
+        self._geometry = get_geometry(record.width, record.height)
+
+        width = record.width
+        cells = bytearray(width * record.height)
+        locations = [Board.NOT_MOVED, Board.NOT_MOVED]
+        self._checkpoints = []
+        for ply, move in enumerate(record.moves):
+            if ply % interval == 0:
+                self._checkpoints.append((bytes(cells), tuple(locations)))
+            cells[move[0] * width + move[1]] = ply % 2 + 1
+            locations[ply % 2] = move
+        if len(record.moves) % interval == 0:
+            self._checkpoints.append((bytes(cells), tuple(locations)))
+
+    def __len__(self):
+        """ The number of game states, from the empty board to the final
+        one. """
+        return len(self.record.moves) + 1
+
+    def _state(self, ply):
+        """ Return the cells (a new bytearray) and the locations (a new
+        list) of the game state after `ply` moves. """
+        if not 0 <= ply < len(self):
+            raise IndexError("ply {} is not in a game of {} moves".format(
+                ply, len(self.record.moves)))
+        width = self.record.width
+        start = ply - ply % self.interval
+        cells, locations = self._checkpoints[start // self.interval]
+        cells, locations = bytearray(cells), list(locations)
+        for index in range(start, ply):
+            move = self.record.moves[index]
+            cells[move[0] * width + move[1]] = index % 2 + 1
+            locations[index % 2] = move
+        return cells, locations
+
+    def board(self, ply, board_cls=Board):
+        """
+        Return a board of class `board_cls` holding the game state after the
+        first `ply` moves, with the names of the players as players. The
+        board is equal to the one `GameRecord.board(ply)` replays move by
+        move, undo history included.
+        """
+        cells, locations = self._state(ply)
+        record = self.record
+        board = board_cls(record.players[0], record.players[1], record.width, record.height)
+        board._set_cells(cells)
+        board._locations = locations
+        board._active = ply % 2
+        board.move_count = ply
+        # the undo stack holds the location each move left
+        board._undo_stack = [Board.NOT_MOVED] * min(ply, 2) + record.moves[:max(ply - 2, 0)]
+        return board
+
+    def render(self, ply):
+        """ Return the text of `Board.to_string()` for the game state after
+        the first `ply` moves. """
+        cells, locations = self._state(ply)
+        return self._geometry.render(cells, locations)
+
+
+def render_game(record):
+    """
+    Return the text of `Board.to_string()` for every game state of a
+    recorded game, from the empty board to the final one, without creating
+    boards.
+
+    Parameters
+    ----------
+    record : isolation.GameRecord
+        The recorded game.
+
+    Returns
+    ----------
+    list<str>
+    """
+    geometry = get_geometry(record.width, record.height)
+    width = record.width
+    cells = bytearray(width * record.height)
+    locations = [Board.NOT_MOVED, Board.NOT_MOVED]
+    texts = [geometry.render(cells, locations)]
+    for ply, move in enumerate(record.moves):
+        cells[move[0] * width + move[1]] = ply % 2 + 1
+        locations[ply % 2] = move
+        texts.append(geometry.render(cells, locations))
+    return texts
@@ -0,0 +1,313 @@
+"""
+This file contains lookup tables that depend only on the size of the board.
+
+Each table is computed once per (width, height) pair and shared by every
+board instance of that size, so move generation never has to rebuild the
+list of knight directions or bounds-check the targets.
+
+Cells are numbered in row-major order, i.e., the cell at (row, col) has
+index `row * width + col` and corresponds to the bit `1 << index` in a
+bitmask.
+"""
+
+import random
+
+from functools import lru_cache
+
+
+KNIGHT_DIRECTIONS = ((-2, -1), (-2, 1), (-1, -2), (-1, 2),
+                     (1, -2),  (1, 2), (2, -1),  (2, 1))
+
+# bytes.translate() tables mapping a cell byte (0 for an open cell, anything
+# else for a blocked one) to its character in Board.to_string() and to its
+# binary digit
+RENDER_CELLS = b" " + b"-" * 255
+BIT_DIGITS = b"0" + b"1" * 255
+
+# for each byte value, its 8 bits as cell bytes (least significant first)
+BYTE_CELLS = tuple(bytes(value >> bit & 1 for bit in range(8)) for value in range(256))
+
+
+class Geometry(object):
+    """
+    Precomputed move tables for a board of a fixed size. Use
+    `get_geometry()` rather than constructing instances directly so that the
+    tables are shared.
+
+    Attributes
+    ----------
+    width, height : int
+        The board dimensions.
+
+    moves : tuple<tuple<(int, int)>>
+        For each cell index, the on-board knight targets in the same order
+        `Board.__get_moves__` has always produced them.
+
+    masks : tuple<int>
+        For each cell index, the knight targets as a bitmask.
+
+    move_bits : tuple<tuple<((int, int), int)>>
+        For each cell index, the knight targets paired with their bit.
+
+    move_indices : tuple<tuple<((int, int), int)>>
+        For each cell index, the knight targets paired with their index.
+
+    cells : tuple<((int, int), int)>
+        Every cell paired with its bit, in the column-major order used by
+        `Board.get_blank_spaces()`.
+
+    cell_indices : tuple<((int, int), int)>
+        Every cell paired with its index, in the same order as `cells`.
+
+    zobrist_blocked : tuple<int>
+        For each cell index, the 64-bit Zobrist key of that cell being blocked.
+
+    zobrist_locations : (tuple<int>, tuple<int>)
+        For each player slot (0 for player 1, 1 for player 2) and cell index,
+        the 64-bit Zobrist key of that player standing on the cell.
+
+    zobrist_side : int
+        The 64-bit Zobrist key toggled when player 2 is the one to move.
+
+    symmetries : tuple<(str, tuple<int>)>
+        The symmetry group of the board as (name, permutation) pairs, where
+        the permutation maps each cell index to the index of the cell it is
+        moved to. The identity comes first; square boards have eight
+        symmetries and rectangular boards four.
+
+    zobrist_symmetric : tuple<tuple<int>>
+        For each cell index, the key of that cell being blocked after
+        applying each of the symmetries, in the order of `symmetries`.
+
+    template : bytes
+        The text of `Board.to_string()` for the empty board.
+
+    template_rows : tuple<(slice, slice)>
+        For each row, the slice of `template` holding its cells and the
+        slice of the cell indices of the row.
+    """
+
+    __slots__ = ("width", "height", "moves", "masks", "move_bits", "move_indices",
+                 "cells", "cell_indices", "zobrist_blocked", "zobrist_locations",
+                 "zobrist_side", "symmetries", "zobrist_symmetric", "template",
+                 "template_rows")
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+
+        moves = []
+        for r in range(height):
+            for c in range(width):
+                moves.append(tuple((r + dr, c + dc) for dr, dc in KNIGHT_DIRECTIONS
+                                   if 0 <= r + dr < height and 0 <= c + dc < width))
+
+        self.moves = tuple(moves)
+        self.move_bits = tuple(tuple(((r, c), 1 << (r * width + c)) for r, c in targets)
+                               for targets in self.moves)
+        self.move_indices = tuple(tuple(((r, c), r * width + c) for r, c in targets)
+                                  for targets in self.moves)
+        self.masks = tuple(sum(bit for _, bit in targets) for targets in self.move_bits)
+        self.cells = tuple(((i, j), 1 << (i * width + j))
+                           for j in range(width) for i in range(height))
+        self.cell_indices = tuple(((i, j), i * width + j)
+                                  for j in range(width) for i in range(height))
+
+        # seed from the board size so keys are identical across processes
+        rng = random.Random("zobrist-{}x{}".format(width, height))
+        size = width * height
+        self.zobrist_blocked = tuple(rng.getrandbits(64) for _ in range(size))
+        self.zobrist_locations = (tuple(rng.getrandbits(64) for _ in range(size)),
+                                  tuple(rng.getrandbits(64) for _ in range(size)))
+        self.zobrist_side = rng.getrandbits(64)
+
+        w, h = width - 1, height - 1
+        transforms = [("identity", lambda r, c: (r, c)),
+                      ("horizontal", lambda r, c: (h - r, c)),
+                      ("vertical", lambda r, c: (r, w - c)),
+                      ("diagonal", lambda r, c: (h - r, w - c))]
+        if width == height:
+            transforms += [("transpose", lambda r, c: (c, r)),
+                           ("antitranspose", lambda r, c: (w - c, h - r)),
+                           ("rotate90", lambda r, c: (c, w - r)),
+                           ("rotate270", lambda r, c: (h - c, r))]
+        symmetries = []
+        for name, transform in transforms:
+            permutation = []
+            for r in range(height):
+                for c in range(width):
+                    tr, tc = transform(r, c)
+                    permutation.append(tr * width + tc)
+            symmetries.append((name, tuple(permutation)))
+        self.symmetries = tuple(symmetries)
+        self.zobrist_symmetric = tuple(
+            tuple(self.zobrist_blocked[permutation[index]] for _, permutation in symmetries)
+            for index in range(size))
+
+        row = " | " + " | ".join([" "] * width) + " | \n\r"
+        self.template = (row * height).encode("ascii")
+        self.template_rows = tuple((slice(i * len(row) + 3, (i + 1) * len(row) - 3, 4),
+                                    slice(i * width, (i + 1) * width))
+                                   for i in range(height))
+
+    def render(self, cells, locations):
+        """
+        Return the text of `Board.to_string()` for a game state.
+
+        Parameters
+        ----------
+        cells : bytes-like
+            One byte per cell index, 0 for an open cell and anything else for
+            a blocked one.
+
+        locations : sequence<(int, int)>
+            The (row, col) location of player 1 and player 2, or None for a
+            player that has not moved yet.
+
+        Returns
+        ----------
+        str
+        """
+        text = bytearray(cells).translate(RENDER_CELLS)
+        for symbol, location in zip(b"12", locations):
+            if location is not None:
+                index = location[0] * self.width + location[1]
+                if text[index] == ord("-"):
+                    text[index] = symbol
+        out = bytearray(self.template)
+        for target, source in self.template_rows:
+            out[target] = text[source]
+        return out.decode("ascii")
+
+    def mask_cells(self, mask):
+        """ Return the cells of the bitmask `mask` as one byte per cell
+        index (1 for the cells in the mask, 0 for the others). """
+        size = self.width * self.height
+        raw = mask.to_bytes((size + 7) // 8, "little")
+        return b"".join(map(BYTE_CELLS.__getitem__, raw))[:size]
+
+    def cells_mask(self, cells):
+        """ Return the bitmask of the nonzero bytes of `cells` (one byte per
+        cell index); the inverse of `mask_cells()`. """
+        return int(bytes(cells).translate(BIT_DIGITS)[::-1], 2)
+
+    def neighbours(self, cells):
+        """ Return the bitmask of the knight targets of every cell in the
+        bitmask `cells`. """
+        masks = self.masks
+        targets = 0
+        while cells:
+            low = cells & -cells
+            targets |= masks[low.bit_length() - 1]
+            cells ^= low
+        return targets
+
+    def flood_fill(self, open_mask, start):
+        """
+        Return the bitmask of the open cells reachable by a knight standing
+        on the cell `start`, moving through open cells only.
+
+        Parameters
+        ----------
+        open_mask : int
+            The bitmask of the open (unblocked) cells.
+
+        start : int
+            The index of the cell the knight stands on.
+
+        Returns
+        ----------
+        int
+            The reachable cells, excluding `start` itself unless it is open
+            and can be reached again.
+        """
+        reached = 0
+        frontier = self.masks[start] & open_mask
+        while frontier:
+            reached |= frontier
+            frontier = self.neighbours(frontier) & open_mask & ~reached
+        return reached
+
+    def zobrist_hash(self, blocked, locations, active_slot):
+        """
+        Compute a Zobrist key from scratch.
+
+        Parameters
+        ----------
+        blocked : iterable<int>
+            The indices of the blocked cells.
+
+        locations : sequence<(int, int)>
+            The (row, col) location of player 1 and player 2, or None for a
+            player that has not moved yet.
+
+        active_slot : int
+            0 if player 1 is to move, 1 if player 2 is to move.
+
+        Returns
+        ----------
+        int
+            The 64-bit key of the position.
+        """
+        key = self.zobrist_side if active_slot else 0
+        for index in blocked:
+            key ^= self.zobrist_blocked[index]
+        for slot, location in enumerate(locations):
+            if location is not None:
+                key ^= self.zobrist_locations[slot][location[0] * self.width + location[1]]
+        return key
+
+    def zobrist_move(self, slot, source, target):
+        """
+        Return the value to XOR into a Zobrist key when the player in `slot`
+        moves from `source` (None if the player has not moved yet) to
+        `target`, including the change of side to move. Applying the same
+        value again reverts the move.
+        """
+        index = target[0] * self.width + target[1]
+        locations = self.zobrist_locations[slot]
+        delta = self.zobrist_side ^ self.zobrist_blocked[index] ^ locations[index]
+        if source is not None:
+            delta ^= locations[source[0] * self.width + source[1]]
+        return delta
+
+    def symmetry_keys(self, symmetric_blocked, locations, active_slot):
+        """
+        Return the Zobrist key of a position after applying each symmetry.
+
+        Parameters
+        ----------
+        symmetric_blocked : sequence<int>
+            For each symmetry, the XOR of `zobrist_symmetric` over the
+            blocked cells (i.e., the blocked-cell part of the key).
+
+        locations : sequence<(int, int)>
+            The (row, col) location of player 1 and player 2, or None for a
+            player that has not moved yet.
+
+        active_slot : int
+            0 if player 1 is to move, 1 if player 2 is to move.
+
+        Returns
+        ----------
+        tuple<int>
+            The keys in the order of `symmetries`; the first one is the key
+            of the untransformed position.
+        """
+        cells = [None if location is None else location[0] * self.width + location[1]
+                 for location in locations]
+        side = self.zobrist_side if active_slot else 0
+        keys = []
+        for (_, permutation), key in zip(self.symmetries, symmetric_blocked):
+            key ^= side
+            for slot, cell in enumerate(cells):
+                if cell is not None:
+                    key ^= self.zobrist_locations[slot][permutation[cell]]
+            keys.append(key)
+        return tuple(keys)
+
+
+@lru_cache(maxsize=None)
+def get_geometry(width, height):
+    """ Return the shared `Geometry` tables for a board of the given size. """
+    return Geometry(width, height)
@@ -0,0 +1,553 @@
+"""
+This file contains test cases for the board engines in the `isolation`
+package. The alternative engines are checked against the reference
+`isolation.Board` implementation by playing random games on both and
+comparing every observable result along the way.
+"""
+import os
+import pickle
+import random
+import tempfile
+import unittest
+
+import isolation
+
+from benchmark import PERFT_POSITIONS
+from benchmark import perft
+from isolation.endgame import EndgameSolver
+from isolation.records import read_records
+from isolation.tables import KNIGHT_DIRECTIONS
+from isolation.tables import get_geometry
+
+
+def random_game(board_cls, seed, width=7, height=7):
+    """Play a game of random moves to completion, yielding the board after
+    every ply (including the empty starting board).
+    """
+    rng = random.Random(seed)
+    board = board_cls("Player1", "Player2", width, height)
+    yield board
+    while True:
+        moves = board.get_legal_moves()
+        if not moves:
+            return
+        board.apply_move(rng.choice(moves))
+        yield board
+
+
+class BitBoardTest(unittest.TestCase):
+
+    def assertSameState(self, expected, actual):
+        for player in ("Player1", "Player2"):
+            self.assertEqual(expected.get_legal_moves(player),
+                             actual.get_legal_moves(player))
+            self.assertEqual(expected.get_player_location(player),
+                             actual.get_player_location(player))
+            self.assertEqual(expected.utility(player), actual.utility(player))
+        self.assertEqual(expected.active_player, actual.active_player)
+        self.assertEqual(expected.inactive_player, actual.inactive_player)
+        self.assertEqual(expected.move_count, actual.move_count)
+        self.assertEqual(expected.get_blank_spaces(), actual.get_blank_spaces())
+        self.assertEqual(expected.to_string(), actual.to_string())
+
+    def test_random_games(self):
+        """ BitBoard matches Board move for move on several board sizes """
+        for seed, (w, h) in enumerate([(7, 7), (5, 5), (9, 6), (4, 8)]):
+            games = zip(random_game(isolation.Board, seed, w, h),
+                        random_game(isolation.BitBoard, seed, w, h))
+            for expected, actual in games:
+                self.assertSameState(expected, actual)
+
+    def test_forecast_and_copy(self):
+        """ forecast_move and copy leave the original BitBoard untouched """
+        board = isolation.BitBoard("Player1", "Player2")
+        board.apply_move((3, 3))
+        board.apply_move((0, 0))
+        before = board.to_string()
+        for move in board.get_legal_moves():
+            child = board.forecast_move(move)
+            self.assertEqual(child.get_player_location("Player1"), move)
+            self.assertFalse(child.move_is_legal(move))
+        clone = board.copy()
+        clone.apply_move(clone.get_legal_moves()[0])
+        self.assertEqual(board.to_string(), before)
+
+    def test_compatibility_attributes(self):
+        """ BitBoard exposes the Board attributes that agents inspect """
+        board = isolation.BitBoard("Player1", "Player2", 5, 4)
+        reference = isolation.Board("Player1", "Player2", 5, 4)
+        for move in [(1, 2), (0, 0), (3, 3)]:
+            board.apply_move(move)
+            reference.apply_move(move)
+        self.assertEqual(board.__active_player__, reference.__active_player__)
+        self.assertEqual(board.__last_player_move__, reference.__last_player_move__)
+        self.assertEqual([[bool(c) for c in row] for row in board.__board_state__],
+                         [[bool(c) for c in row] for row in reference.__board_state__])
+
+        board.__board_state__ = reference.__board_state__
+        board.__last_player_move__ = reference.__last_player_move__
+        self.assertEqual(board.to_string(), reference.to_string())
+
+
+class CompactBoardTest(unittest.TestCase):
+
+    def test_no_instance_dict(self):
+        """ Boards keep their state in slots, and copies survive pickling """
+        for board_cls in (isolation.Board, isolation.BitBoard):
+            board = board_cls("Player1", "Player2")
+            self.assertFalse(hasattr(board, "__dict__"))
+            board.apply_move((2, 3))
+            clone = pickle.loads(pickle.dumps(board))
+            self.assertEqual(clone.to_string(), board.to_string())
+            self.assertEqual(clone.hash_key, board.hash_key)
+
+    def test_compatibility_attributes(self):
+        """ The player-keyed attributes read and write the compact state """
+        board = isolation.Board("Player1", "Player2", 5, 4)
+        board.apply_move((1, 2))
+        board.apply_move((0, 0))
+        self.assertEqual(board.__board_state__[1][2], 1)
+        self.assertEqual(board.__board_state__[0][0], 2)
+        self.assertEqual(board.__last_player_move__, {"Player1": (1, 2), "Player2": (0, 0)})
+        self.assertEqual(board.__player_symbols__["Player2"], 2)
+
+        state = board.__board_state__
+        state[3][4] = 1
+        board.__board_state__ = state
+        board.__last_player_move__ = {"Player1": (3, 4), "Player2": (0, 0)}
+        board.__inactive_player__ = "Player1"
+        self.assertEqual(board.active_player, "Player2")
+        self.assertEqual(board.get_player_location("Player1"), (3, 4))
+        self.assertFalse(board.move_is_legal((3, 4)))
+        self.assertRaises(KeyError, board.get_player_location, "Player3")
+
+    def test_subclass_copy(self):
+        """ copy() carries the attributes of subclasses without slots """
+        class Tagged(isolation.Board):
+            pass
+        board = Tagged("Player1", "Player2")
+        board.tag = "root"
+        clone = board.forecast_move((3, 3))
+        self.assertIsInstance(clone, Tagged)
+        self.assertEqual(clone.tag, "root")
+
+
+class UndoMoveTest(unittest.TestCase):
+
+    def test_undo_restores_state(self):
+        """ undo_move reverts apply_move on every engine """
+        for board_cls in (isolation.Board, isolation.BitBoard):
+            moves = [state.get_player_location(state.inactive_player)
+                     for state in random_game(board_cls, 3)][1:]
+            board = board_cls("Player1", "Player2")
+            snapshots = []
+            for move in moves:
+                snapshots.append((board.to_string(), board.get_legal_moves(),
+                                  board.active_player, board.move_count))
+                board.apply_move(move)
+            for snapshot in reversed(snapshots):
+                board.undo_move()
+                self.assertEqual(snapshot, (board.to_string(), board.get_legal_moves(),
+                                            board.active_player, board.move_count))
+
+    def test_pushed(self):
+        """ pushed() applies a move for the duration of a with block """
+        for board_cls in (isolation.Board, isolation.BitBoard):
+            board = board_cls("Player1", "Player2")
+            board.apply_move((3, 3))
+            before = board.to_string()
+            with board.pushed((0, 0)) as pushed:
+                self.assertIs(pushed, board)
+                self.assertEqual(board.get_player_location("Player2"), (0, 0))
+            self.assertEqual(board.to_string(), before)
+            self.assertIsNone(board.get_player_location("Player2"))
+
+
+class HashKeyTest(unittest.TestCase):
+
+    def setUp(self):
+        isolation.Board.CHECK_HASH = True
+
+    def tearDown(self):
+        isolation.Board.CHECK_HASH = False
+
+    def test_incremental_key(self):
+        """ The key is maintained through apply_move and undo_move """
+        for board_cls in (isolation.Board, isolation.BitBoard):
+            keys = []
+            for board in random_game(board_cls, 5):
+                keys.append(board.hash_key)
+            self.assertEqual(len(set(keys)), len(keys))
+            while board.move_count:
+                board.undo_move()
+                keys.pop()
+                self.assertEqual(board.hash_key, keys[-1])
+
+    def test_engines_agree(self):
+        """ Board and BitBoard produce the same key for the same position """
+        games = zip(random_game(isolation.Board, 6), random_game(isolation.BitBoard, 6))
+        for board, bitboard in games:
+            self.assertEqual(board.hash_key, bitboard.hash_key)
+
+    def test_copy_carries_key(self):
+        """ copy() keeps the key and forecast_move() updates it """
+        board = isolation.Board("Player1", "Player2")
+        board.apply_move((2, 3))
+        key = board.hash_key
+        clone = board.copy()
+        self.assertEqual(clone._hash_key, key)
+        child = board.forecast_move((0, 0))
+        self.assertNotEqual(child.hash_key, key)
+        self.assertEqual(child.hash_key, child.compute_hash_key())
+
+    def test_side_to_move(self):
+        """ The same cells with the other side to move hash differently """
+        board = isolation.Board("Player1", "Player2")
+        board.apply_move((2, 3))
+        board.apply_move((0, 0))
+        other = board.copy()
+        other.__active_player__, other.__inactive_player__ = "Player2", "Player1"
+        self.assertNotEqual(board.hash_key, other.compute_hash_key())
+
+
+class SymmetryTest(unittest.TestCase):
+
+    def mirrored_game(self, board_cls, symmetry, seed, width=7, height=7):
+        """ Play random moves for player 1 and mirror them with player 2 """
+        rng = random.Random(seed)
+        board = board_cls("Player1", "Player2", width, height)
+        permutation = dict(board._geometry.symmetries)[symmetry]
+        while True:
+            moves = [m for m in board.get_legal_moves()
+                     if permutation[m[0] * width + m[1]] != m[0] * width + m[1]]
+            if not moves:
+                return
+            move = rng.choice(moves)
+            board.apply_move(move)
+            index = permutation[move[0] * width + move[1]]
+            reply = (index // width, index % width)
+            if reply not in board.get_legal_moves():
+                return
+            board.apply_move(reply)
+            yield board
+
+    def test_mirrored_positions(self):
+        """ Mirrored moves keep the board symmetric under that symmetry """
+        for board_cls in (isolation.Board, isolation.BitBoard):
+            for symmetry in ("horizontal", "vertical", "diagonal"):
+                for board in self.mirrored_game(board_cls, symmetry, 1, 7, 6):
+                    self.assertTrue(board.is_symmetric(symmetry))
+                    # a single move blocks a cell whose mirror image is open
+                    for move in board.get_legal_moves()[:1]:
+                        with board.pushed(move):
+                            self.assertFalse(board.is_symmetric(symmetry))
+
+    def test_canonical_key(self):
+        """ All mirror images of a game share one canonical key """
+        for w, h in [(7, 7), (6, 5)]:
+            for board in random_game(isolation.Board, 2, w, h):
+                keys = board.symmetry_keys()
+                self.assertEqual(len(keys), 8 if w == h else 4)
+                self.assertEqual(keys[0], board.hash_key)
+                for (name, permutation), key in zip(board._geometry.symmetries, keys):
+                    image = isolation.BitBoard("Player1", "Player2", w, h)
+                    image.__board_state__ = [
+                        [1 if permutation.index(i * w + j) in board._blocked_indices() else 0
+                         for j in range(w)] for i in range(h)]
+                    image.__last_player_move__ = {
+                        player: None if loc is None else divmod(permutation[loc[0] * w + loc[1]], w)
+                        for player, loc in board.__last_player_move__.items()}
+                    image.__active_player__ = board.active_player
+                    image.move_count = board.move_count
+                    self.assertEqual(image.hash_key, key)
+                    self.assertEqual(image.canonical_key(), board.canonical_key())
+
+
+class GeometryTest(unittest.TestCase):
+
+    def test_tables_are_shared(self):
+        """ Boards of the same size share one set of move tables """
+        a = isolation.Board("Player1", "Player2", 6, 5)
+        b = isolation.BitBoard("Player1", "Player2", 6, 5)
+        self.assertIs(a._geometry, b._geometry)
+        self.assertIsNot(a._geometry, isolation.Board("Player1", "Player2")._geometry)
+
+    def test_knight_targets(self):
+        """ Tuple and bitmask tables agree and stay on the board """
+        geometry = get_geometry(5, 4)
+        self.assertEqual(geometry.moves[0], ((1, 2), (2, 1)))
+        for index, targets in enumerate(geometry.moves):
+            self.assertEqual(len(targets), bin(geometry.masks[index]).count("1"))
+            for r, c in targets:
+                self.assertTrue(geometry.masks[index] >> (r * 5 + c) & 1)
+                self.assertTrue(0 <= r < 4 and 0 <= c < 5)
+
+
+class OpeningBookTest(unittest.TestCase):
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".bin")
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_lookup_mirror_images(self):
+        """ A booked state answers for all of its mirror images """
+        board = isolation.Board("Player1", "Player2")
+        board.apply_move((1, 2))
+        empty = isolation.Board("Player1", "Player2")
+        count = isolation.write_book(self.path, [(board, (4, 3)), (empty, (3, 3))])
+        self.assertEqual(count, 2)
+
+        book = isolation.OpeningBook(self.path)
+        self.assertEqual(len(book), 2)
+        self.assertEqual(book.lookup(board), (4, 3))
+        self.assertEqual(book.lookup(empty), (3, 3))
+        for name, permutation in board._geometry.symmetries:
+            image = isolation.BitBoard("Player1", "Player2")
+            image.apply_move(divmod(permutation[1 * 7 + 2], 7))
+            self.assertEqual(book.lookup(image), divmod(permutation[4 * 7 + 3], 7))
+
+        board.apply_move((4, 3))
+        self.assertIsNone(book.lookup(board))
+        self.assertIsNone(book.lookup(isolation.Board("Player1", "Player2", 5, 5)))
+
+
+class RegionTest(unittest.TestCase):
+
+    def distances(self, board, player):
+        """ Knight distances from a player to the open cells, by plain BFS """
+        blank = set(board.get_blank_spaces())
+        location = board.get_player_location(player)
+        if location is None:
+            return {cell: 1 for cell in blank}
+        distance = {}
+        frontier = [location]
+        steps = 0
+        while frontier:
+            steps += 1
+            reached = []
+            for r, c in frontier:
+                for dr, dc in KNIGHT_DIRECTIONS:
+                    cell = (r + dr, c + dc)
+                    if cell in blank and cell not in distance:
+                        distance[cell] = steps
+                        reached.append(cell)
+            frontier = reached
+        return distance
+
+    def test_regions_match_search(self):
+        """ Reachability, components and territory agree with plain BFS """
+        for board_cls in (isolation.Board, isolation.BitBoard):
+            for board in random_game(board_cls, 4, 7, 6):
+                blank = board.get_blank_spaces()
+                first = self.distances(board, "Player1")
+                second = self.distances(board, "Player2")
+                self.assertEqual(board.get_reachable("Player1"), [c for c in blank if c in first])
+                self.assertEqual(board.get_reachable(), board.get_reachable(board.active_player))
+                territory = board.get_territory()
+                self.assertEqual(territory["Player1"], [c for c in blank if c in first and
+                                                        first[c] < second.get(c, float("inf"))])
+                self.assertEqual(territory["Player2"], [c for c in blank if c in second and
+                                                        second[c] < first.get(c, float("inf"))])
+
+                components = board.get_components()
+                self.assertEqual(sorted(c for component in components for c in component),
+                                 sorted(blank))
+                for component in components:
+                    cell = component[0]
+                    reached = set(self.distances_from(board, cell))
+                    self.assertEqual(set(component) - {cell}, reached - {cell})
+
+    def distances_from(self, board, cell):
+        """ Open cells reachable from an open cell """
+        other = isolation.Board("Player1", "Player2", board.width, board.height)
+        other.__board_state__ = [[0 if (i, j) in board.get_blank_spaces() else 1
+                                  for j in range(board.width)] for i in range(board.height)]
+        other.__last_player_move__ = {"Player1": cell, "Player2": None}
+        return self.distances(other, "Player1")
+
+    def test_cache_invalidated(self):
+        """ apply_move and undo_move drop the cached regions """
+        for board_cls in (isolation.Board, isolation.BitBoard):
+            board = board_cls("Player1", "Player2", 5, 5)
+            board.apply_move((2, 2))
+            board.apply_move((0, 0))
+            before = board.get_territory(), board.get_components()
+            board.apply_move((4, 1))
+            self.assertNotEqual(board.get_territory(), before[0])
+            self.assertNotIn((4, 1), board.get_reachable("Player2"))
+            board.undo_move()
+            self.assertEqual((board.get_territory(), board.get_components()), before)
+
+
+class EndgameSolverTest(unittest.TestCase):
+
+    def active_wins(self, board):
+        """ Solve a game state by exhaustive search """
+        for move in board.get_legal_moves():
+            with board.pushed(move):
+                if not self.active_wins(board):
+                    return True
+        return False
+
+    def test_matches_exhaustive_search(self):
+        """ Solved endgames agree with a full search of the game tree """
+        solved = 0
+        for seed in range(40):
+            solver = EndgameSolver(max_cells=25)
+            for board in random_game(isolation.BitBoard, seed, 5, 5):
+                result = solver.solve(board)
+                if result is None:
+                    continue
+                solved += 1
+                wins, move = result
+                self.assertEqual(wins, self.active_wins(board))
+                if move is None:
+                    self.assertEqual(board.get_legal_moves(), [])
+                elif wins:
+                    with board.pushed(move):
+                        self.assertFalse(self.active_wins(board))
+        self.assertGreater(solved, 0)
+
+    def test_players_not_separated(self):
+        """ Positions where the players can still meet are not solved """
+        board = isolation.Board("Player1", "Player2")
+        self.assertIsNone(EndgameSolver().solve(board))
+        board.apply_move((3, 3))
+        board.apply_move((0, 0))
+        self.assertIsNone(EndgameSolver(max_cells=49).solve(board))
+
+
+class PerftTest(unittest.TestCase):
+
+    def test_engines_match_expected_counts(self):
+        """ Every board engine generates the recorded number of move
+        sequences from the perft positions """
+        for name, board_cls in isolation.ENGINES.items():
+            for width, height, opening, depth, expected in PERFT_POSITIONS:
+                board = board_cls("Player1", "Player2", width, height)
+                for move in opening:
+                    board.apply_move(move)
+                before = board.hash_key
+                self.assertEqual(perft(board, depth), expected, (name, width, height))
+                self.assertEqual(board.hash_key, before)
+
+
+class RecordTest(unittest.TestCase):
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".isor")
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def play_game(self, seed):
+        """ Play a game between random players from a two-move opening and
+        return the final board and its record """
+        from sample_players import RandomPlayer
+
+        random.seed(seed)
+        game = isolation.Board(RandomPlayer(), RandomPlayer(), 5, 5)
+        opening = [(2, 2), (0, 1)]
+        for move in opening:
+            game.apply_move(move)
+        winner, move_history, termination = game.play()
+        return game, isolation.record_game(game, opening, winner, move_history, termination,
+                                           ("first", "second"))
+
+    def test_round_trip(self):
+        """ Records written across writer sessions read back unchanged and
+        replay to the final game states """
+        games = [self.play_game(seed) for seed in range(3)]
+        with isolation.RecordWriter(self.path) as writer:
+            writer.write(games[0][1])
+        with isolation.RecordWriter(self.path) as writer:
+            for _, record in games[1:]:
+                writer.write(record)
+
+        records = list(read_records(self.path))
+        self.assertEqual(records, [record for _, record in games])
+        for (game, record), read in zip(games, records):
+            self.assertEqual(read.players, ("first", "second"))
+            self.assertEqual(read.moves[:2], [(2, 2), (0, 1)])
+            self.assertEqual(read.winner, 0 if game.is_winner(game.__player_1__) else 1)
+            for board_cls in isolation.ENGINES.values():
+                board = read.board(board_cls=board_cls)
+                self.assertEqual(board.hash_key, game.hash_key)
+                self.assertEqual(board.get_legal_moves(), game.get_legal_moves())
+            positions = list(read.positions())
+            self.assertEqual(len(positions), len(read.moves) + 1)
+            self.assertEqual(positions[3].hash_key, read.board(3).hash_key)
+
+    def test_non_ascii_names(self):
+        """ Names are stored as UTF-8 and must fit in 255 bytes """
+        _, record = self.play_game(0)
+        record = record._replace(players=("Élise", "Bob"))
+        with isolation.RecordWriter(self.path) as writer:
+            writer.write(record)
+            self.assertRaises(ValueError, writer.write, record._replace(players=("é" * 128, "")))
+        self.assertEqual(list(read_records(self.path)), [record])
+
+        with open(self.path, "rb") as f:
+            data = f.read()
+        with open(self.path, "wb") as f:
+            f.write(data[:-len(record.moves) - 3])
+        with self.assertRaises(ValueError):
+            list(read_records(self.path))
+
+    def test_rejects_other_files(self):
+        """ Files without the record magic are not read or appended to """
+        with open(self.path, "wb") as f:
+            f.write(b"not a record file")
+        with self.assertRaises(ValueError):
+            list(read_records(self.path))
+        with self.assertRaises(ValueError):
+            isolation.RecordWriter(self.path)
+
+
+class ReplayTest(unittest.TestCase):
+
+    def setUp(self):
+        moves = []
+        for board in random_game(isolation.Board, 5, 5, 4):
+            if board.move_count:
+                moves.append(board.get_player_location(board.inactive_player))
+        self.record = isolation.GameRecord(5, 4, ("Player1", "Player2"), 0, "", moves)
+
+    def test_render(self):
+        """ The renderer draws open, blocked and occupied cells like the
+        original string concatenation """
+        for board_cls in isolation.ENGINES.values():
+            board = board_cls("Player1", "Player2", 3, 2)
+            for move in [(0, 0), (1, 2), (1, 1)]:
+                board.apply_move(move)
+            self.assertEqual(board.to_string(),
+                             " | - |   |   | \n\r |   | 1 | 2 | \n\r")
+
+    def test_index_matches_replay(self):
+        """ Every ply restored from checkpoints equals the move-by-move
+        replay, including its undo history """
+        texts = isolation.render_game(self.record)
+        self.assertEqual(len(texts), len(self.record.moves) + 1)
+        for interval in (1, 3):
+            index = isolation.ReplayIndex(self.record, interval)
+            self.assertEqual(len(index), len(texts))
+            for ply in range(len(index)):
+                for board_cls in isolation.ENGINES.values():
+                    expected = self.record.board(ply, board_cls)
+                    board = index.board(ply, board_cls)
+                    self.assertEqual(board.to_string(), texts[ply])
+                    self.assertEqual(index.render(ply), texts[ply])
+                    self.assertEqual(board.hash_key, expected.hash_key)
+                    self.assertEqual(board.get_legal_moves(), expected.get_legal_moves())
+                    while board.move_count:
+                        board.undo_move()
+                    self.assertEqual(board.hash_key, board_cls("Player1", "Player2", 5, 4).hash_key)
+            self.assertRaises(IndexError, index.board, len(index))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+"""
+Build an opening book for `CustomPlayer(book=...)` by searching every game
+state of the first plies of the game offline, far longer than the time
+limit of a real turn allows.
+
+Only one game state of each symmetry class is searched, since the book
+stores mirror images under one canonical key (see `isolation.book`), and
+the searches are spread over a pool of processes.
+
+Usage:
+
+    python opening_book.py book.bin --plies 3 --time 2000 --workers 4
+"""
+
+import argparse
+import multiprocessing
+import timeit
+
+from isolation import Board
+from isolation import write_book
+from game_agent import CustomPlayer
+from sample_players import improved_score
+
+
+def opening_positions(width=7, height=7, plies=3):
+    """
+    Return the move sequences that reach one game state of each symmetry
+    class in which fewer than `plies` moves have been played.
+    """
+    positions = []
+    frontier = [()]
+    for _ in range(plies):
+        positions += frontier
+        seen = set()
+        successors = []
+        for moves in frontier:
+            board = Board("Player1", "Player2", width, height)
+            for move in moves:
+                board.apply_move(move)
+            for move in board.get_legal_moves():
+                with board.pushed(move):
+                    key = board.canonical_key()
+                    if key not in seen and board.get_legal_moves():
+                        seen.add(key)
+                        successors.append(moves + (move,))
+        frontier = successors
+    return positions
+
+
+def search_position(job):
+    """
+    Search one opening position in a worker process. The job is (moves,
+    width, height, time limit in milliseconds, agent keyword arguments);
+    the result is the position's moves and the move found for it.
+    """
+    moves, width, height, time_limit, options = job
+    agent = CustomPlayer(**options)
+    players = [agent, "Opponent"] if len(moves) % 2 == 0 else ["Opponent", agent]
+    board = Board(players[0], players[1], width, height)
+    for move in moves:
+        board.apply_move(move)
+    end = timeit.default_timer() + time_limit / 1000.
+    move = agent.get_move(board, board.get_legal_moves(),
+                          lambda: 1000 * (end - timeit.default_timer()))
+    return moves, move
+
+
+def build_book(path, width=7, height=7, plies=3, time_limit=2000, workers=1,
+               options=None):
+    """
+    Search every opening position up to `plies` for `time_limit`
+    milliseconds with a CustomPlayer constructed from `options`, and write
+    the resulting book to `path`. Returns the number of book entries.
+
+    The default agent uses `improved_score`, because `custom_score` needs
+    both players to be on the board.
+    """
+    if options is None:
+        options = {"score_fn": improved_score, "method": "alphabeta",
+                   "tt_size_mb": 64, "move_ordering": True}
+    jobs = [(moves, width, height, time_limit, options)
+            for moves in opening_positions(width, height, plies)]
+
+    if workers > 1:
+        pool = multiprocessing.Pool(workers)
+        try:
+            results = pool.map(search_position, jobs)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = [search_position(job) for job in jobs]
+
+    entries = []
+    for moves, move in results:
+        board = Board("Player1", "Player2", width, height)
+        for m in moves:
+            board.apply_move(m)
+        entries.append((board, move))
+    return write_book(path, entries, width, height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="name of the book file to write")
+    parser.add_argument("--plies", type=int, default=3,
+                        help="book every position with fewer moves played than this")
+    parser.add_argument("--time", type=int, default=2000,
+                        help="milliseconds of search per position")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count(),
+                        help="number of positions searched in parallel")
+    parser.add_argument("--size", type=int, nargs=2, default=[7, 7],
+                        metavar=("WIDTH", "HEIGHT"), help="board size")
+    args = parser.parse_args()
+
+    count = build_book(args.path, args.size[0], args.size[1], args.plies,
+                       args.time, args.workers)
+    print("wrote {} positions to {}".format(count, args.path))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,9 @@ own agent and example heuristic functions.
 
 from random import randint
 
+from isolation.batch import mobility_batch
+from isolation.batch import register_batch
+
 
 def null_score(game, player):
     """This heuristic presumes no knowledge for non-terminal states, and
@@ -96,6 +99,11 @@ def improved_score(game, player):
     return float(own_moves - opp_moves)
 
 
+register_batch(null_score, mobility_batch(null_score, lambda own, opp: own * 0.))
+register_batch(open_move_score, mobility_batch(open_move_score, lambda own, opp: own * 1.))
+register_batch(improved_score, mobility_batch(improved_score, lambda own, opp: own - opp * 1.))
+
+
 class RandomPlayer():
     """Player that chooses a move randomly."""
 
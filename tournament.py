@@ -17,15 +17,33 @@ For example, if the random moves chosen for initialization are (5, 2) and
 agentB at (1, 3) as player 2 then play to conclusion; the agents swap
 initiative in the second match with agentB at (5, 2) as player 1 and agentA at
 (1, 3) as player 2.
+
+With --sprt the number of matches against each opponent is not fixed:
+matches are played until a sequential probability ratio test (SPRT) decides
+whether the agent under test is at least --elo1 Elo stronger than the
+opponent or at most --elo0 Elo stronger, at error rates --alpha and --beta
+(or until --max-matches have been played). Clear-cut pairings are decided
+after a few matches, and close ones get more games.
+
+With --record PATH every game of the tournament is appended to a game
+record file (see isolation/records.py), including its opening moves.
 """
 
-import itertools
+import argparse
+import math
+import multiprocessing
+import os
 import random
 import warnings
 
+from collections import deque
 from collections import namedtuple
+from contextlib import nullcontext
 
 from isolation import Board
+from isolation import ENGINES
+from isolation import RecordWriter
+from isolation import record_game
 from sample_players import RandomPlayer
 from sample_players import null_score
 from sample_players import open_move_score
@@ -57,27 +75,35 @@ same opponents.
 Agent = namedtuple("Agent", ["player", "name"])
 
 
-def play_match(player1, player2):
+def play_match(player1, player2, board_cls=Board, records=None, names=None):
     """
     Play a "fair" set of matches between two agents by playing two games
     between the players, forcing each agent to play from randomly selected
     positions. This should control for differences in outcome resulting from
     advantage due to starting position on the board.
+
+    If `records` is a list, the GameRecord of each game is appended to it,
+    with the players named by `names` (the names of player1 and player2).
     """
     num_wins = {player1: 0, player2: 0}
     num_timeouts = {player1: 0, player2: 0}
     num_invalid_moves = {player1: 0, player2: 0}
-    games = [Board(player1, player2), Board(player2, player1)]
+    games = [board_cls(player1, player2), board_cls(player2, player1)]
 
     # initialize both games with a random move and response
+    opening = []
     for _ in range(2):
         move = random.choice(games[0].get_legal_moves())
         games[0].apply_move(move)
         games[1].apply_move(move)
+        opening.append(move)
 
     # play both games and tally the results
-    for game in games:
-        winner, _, termination = game.play(time_limit=TIME_LIMIT)
+    for game, order in zip(games, (1, -1)):
+        winner, move_history, termination = game.play(time_limit=TIME_LIMIT)
+        if records is not None:
+            records.append(record_game(game, opening, winner, move_history, termination,
+                                       names and names[::order]))
 
         if player1 == winner:
             num_wins[player1] += 1
@@ -102,47 +128,351 @@ def play_match(player1, player2):
     return num_wins[player1], num_wins[player2]
 
 
-def play_round(agents, num_matches):
+def play_seeded_match(player1, player2, board_cls, seed, records=None, names=None):
+    """
+    Play a match with the global random number generator seeded from `seed`,
+    so the opening moves (and the choices of random agents) only depend on
+    the seed and not on which process plays the match or when.
+    """
+    random.seed(seed)
+    return play_match(player1, player2, board_cls, records, names)
+
+
+def tt_counters(player):
+    """ Return the transposition table counters of a player, if it has one """
+    tt = getattr(player, "tt", None)
+    if tt is None:
+        return None
+    return tt.hits, tt.misses, tt.stores, tt.overwrites
+
+
+# agents and board class of a worker process, set by init_worker()
+_worker_state = {}
+
+
+def init_worker(agents, board_cls, record, next_core, cores):
+    """
+    Initialize a worker process of the tournament pool. Each worker is
+    pinned to its own core (where the platform supports it) so that the
+    matches running in parallel do not compete for cores, which would make
+    the agents search less within the same time limit and cause timeouts.
+    """
+    _worker_state["agents"] = agents
+    _worker_state["board_cls"] = board_cls
+    _worker_state["record"] = record
+    if hasattr(os, "sched_setaffinity"):
+        with next_core.get_lock():
+            core = cores[next_core.value % len(cores)]
+            next_core.value += 1
+        os.sched_setaffinity(0, {core})
+
+
+def play_worker_match(job):
+    """
+    Play one match in a worker process. The job is (opponent index,
+    whether the agent under test moves first, seed); the result holds the
+    scores of the agent under test and the opponent, the change in the
+    transposition table counters of the agent under test and the records of
+    the games (None unless the games are recorded).
+    """
+    idx, first, seed = job
+    agents = _worker_state["agents"]
+    agent_1, agent_2 = agents[-1], agents[idx]
+    board_cls = _worker_state["board_cls"]
+    records = [] if _worker_state["record"] else None
+    before = tt_counters(agent_1.player)
+    if first:
+        score_1, score_2 = play_seeded_match(agent_1.player, agent_2.player, board_cls, seed,
+                                             records, (agent_1.name, agent_2.name))
+    else:
+        score_2, score_1 = play_seeded_match(agent_2.player, agent_1.player, board_cls, seed,
+                                             records, (agent_2.name, agent_1.name))
+    after = tt_counters(agent_1.player)
+    delta = None if after is None else tuple(a - b for a, b in zip(after, before))
+    return score_1, score_2, delta, records
+
+
+def available_cores():
+    """ Return the cores this process may run on """
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def start_pool(agents, board_cls, workers, record=False):
+    """
+    Return a pool of `workers` processes (at most one per available core)
+    that play matches between `agents` on `board_cls` boards, or None if
+    the matches are to be played in this process. With `record`, the
+    matches also return the records of their games.
+    """
+    cores = available_cores()
+    if workers > len(cores):
+        warnings.warn("Only {} cores are available; limiting the tournament "
+                      "to {} workers.".format(len(cores), len(cores)))
+        workers = len(cores)
+    if workers > 1:
+        return multiprocessing.Pool(workers, initializer=init_worker,
+                                    initargs=(agents, board_cls, record,
+                                              multiprocessing.Value('i', 0), cores))
+    _worker_state.update(agents=agents, board_cls=board_cls, record=record)
+    return None
+
+
+def merge_tt_counters(player, delta):
+    """ Add the transposition table counters of a match played in a worker
+    process to the player's own table """
+    if delta is not None:
+        tt = player.tt
+        tt.hits += delta[0]
+        tt.misses += delta[1]
+        tt.stores += delta[2]
+        tt.overwrites += delta[3]
+
+
+def write_records(recorder, records):
+    """ Write the game records returned by a match, if any """
+    if recorder is not None:
+        for record in records:
+            recorder.write(record)
+
+
+def play_round(agents, num_matches, board_cls=Board, workers=1, seed=None, recorder=None):
     """
     Play one round (i.e., a single match between each pair of opponents)
+
+    The matches are independent, so with `workers` > 1 they are played in a
+    pool of processes, one pinned core per worker. Every match is seeded
+    from `seed` and its position in the round, so a round played with the
+    same seed gives the same openings for any number of workers. The games
+    are written to `recorder` (a RecordWriter) if one is given.
     """
     agent_1 = agents[-1]
     wins = 0.
     total = 0.
 
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+
     print("\nPlaying Matches:")
     print("----------")
 
-    for idx, agent_2 in enumerate(agents[:-1]):
-
-        counts = {agent_1.player: 0., agent_2.player: 0.}
-        names = [agent_1.name, agent_2.name]
-        print("  Match {}: {!s:^11} vs {!s:^11}".format(idx + 1, *names), end=' ')
-
-        # Each player takes a turn going first
-        for p1, p2 in itertools.permutations((agent_1.player, agent_2.player)):
-            for _ in range(num_matches):
-                score_1, score_2 = play_match(p1, p2)
-                counts[p1] += score_1
-                counts[p2] += score_2
+    # one job per match: (opponent index, agent under test first, seed)
+    jobs = [(idx, first, "{}-{}-{}-{}".format(seed, idx, int(first), num))
+            for idx in range(len(agents) - 1)
+            for first in (True, False)
+            for num in range(num_matches)]
+
+    pool = start_pool(agents, board_cls, workers, recorder is not None)
+    if pool is not None:
+        results = pool.imap(play_worker_match, jobs)
+    else:
+        results = (play_worker_match(job) for job in jobs)
+
+    try:
+        for idx, agent_2 in enumerate(agents[:-1]):
+
+            counts = {agent_1.player: 0., agent_2.player: 0.}
+            names = [agent_1.name, agent_2.name]
+            print("  Match {}: {!s:^11} vs {!s:^11}".format(idx + 1, *names), end=' ', flush=True)
+
+            # Each player takes a turn going first
+            for _ in range(2 * num_matches):
+                score_1, score_2, tt_delta, records = next(results)
+                write_records(recorder, records)
+                counts[agent_1.player] += score_1
+                counts[agent_2.player] += score_2
                 total += score_1 + score_2
+                if pool is not None:
+                    merge_tt_counters(agent_1.player, tt_delta)
 
-        wins += counts[agent_1.player]
+            wins += counts[agent_1.player]
 
-        print("\tResult: {} to {}".format(int(counts[agent_1.player]),
-                                          int(counts[agent_2.player])))
+            print("\tResult: {} to {}".format(int(counts[agent_1.player]),
+                                              int(counts[agent_2.player])))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
 
     return 100. * wins / total
 
 
+def positive_int(text):
+    """ argparse type of the options that count at least one of something """
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError("must be at least 1, not {}".format(value))
+    return value
+
+
+def expected_score(elo):
+    """ Return the expected fraction of games won by a player that is `elo`
+    Elo points stronger than its opponent """
+    return 1. / (1. + 10. ** (-elo / 400.))
+
+
+def elo_difference(score):
+    """ Return the Elo difference that gives the expected `score` (the
+    fraction of games won); the inverse of expected_score() """
+    return -400. * math.log10(1. / score - 1.)
+
+
+def elo_estimate(wins, losses, z=1.96):
+    """
+    Return the Elo difference estimated from game results and the half-width
+    of its confidence interval (95% for the default `z`). Isolation games
+    cannot be drawn. The score is kept half a game away from 0 and 1, where
+    the Elo difference is infinite.
+    """
+    games = wins + losses
+    if games <= 0:
+        raise ValueError("the Elo difference needs at least one game")
+    bound = 0.5 / games
+    score = min(max(wins / games, bound), 1. - bound)
+    error = z * math.sqrt(score * (1. - score) / games)
+    low = elo_difference(max(score - error, bound))
+    high = elo_difference(min(score + error, 1. - bound))
+    return elo_difference(score) + 0., (high - low) / 2.
+
+
+def sprt_llr(wins, losses, elo0, elo1):
+    """ Return the log-likelihood ratio of the hypotheses that the player
+    is `elo1` (H1) rather than `elo0` (H0) Elo points stronger, given its
+    game results """
+    p0, p1 = expected_score(elo0), expected_score(elo1)
+    return wins * math.log(p1 / p0) + losses * math.log((1. - p1) / (1. - p0))
+
+
+def play_jobs(pool, jobs, in_flight):
+    """
+    Yield the results of the match `jobs` in order. With a pool, at most
+    `in_flight` jobs are submitted ahead of the results consumed, so that
+    few matches are wasted when the consumer stops early.
+    """
+    if pool is None:
+        for job in jobs:
+            yield play_worker_match(job)
+        return
+    pending = deque()
+    for job in jobs:
+        pending.append(pool.apply_async(play_worker_match, (job,)))
+        if len(pending) >= in_flight:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
+def play_round_sprt(agents, board_cls=Board, workers=1, seed=None, elo0=0., elo1=100.,
+                    alpha=0.05, beta=0.05, max_matches=50, recorder=None):
+    """
+    Play one round in which the agent under test (the last of `agents`)
+    plays "fair" matches against each opponent until a sequential
+    probability ratio test accepts H1 (it is `elo1` Elo stronger) or H0 (it
+    is `elo0` Elo stronger) with error rates `alpha` and `beta`, or until
+    `max_matches` matches have been played. The games are written to
+    `recorder` (a RecordWriter) if one is given.
+
+    Returns the win percentage of the agent under test over all games and,
+    for each opponent, a dict with the wins, losses, Elo estimate and error,
+    log-likelihood ratio and decision ('H1', 'H0' or None).
+    """
+    if max_matches < 1:
+        raise ValueError("max_matches must be at least 1")
+    agent_1 = agents[-1]
+    lower, upper = math.log(beta / (1. - alpha)), math.log((1. - beta) / alpha)
+
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+
+    print("\nPlaying Matches:")
+    print("----------")
+
+    outcomes = []
+    pool = start_pool(agents, board_cls, workers, recorder is not None)
+    try:
+        for idx, agent_2 in enumerate(agents[:-1]):
+            print("  Match {}: {!s:^11} vs {!s:^11}".format(idx + 1, agent_1.name, agent_2.name),
+                  end=' ', flush=True)
+            jobs = ((idx, True, "{}-{}-1-{}".format(seed, idx, num)) for num in range(max_matches))
+            wins = losses = 0
+            llr, decision = 0., None
+            for score_1, score_2, tt_delta, records in play_jobs(pool, jobs,
+                                                                 min(workers, len(available_cores()))):
+                write_records(recorder, records)
+                wins += score_1
+                losses += score_2
+                if pool is not None:
+                    merge_tt_counters(agent_1.player, tt_delta)
+                llr = sprt_llr(wins, losses, elo0, elo1)
+                if llr >= upper or llr <= lower:
+                    decision = "H1" if llr >= upper else "H0"
+                    break
+
+            elo, error = elo_estimate(wins, losses)
+            outcomes.append({"opponent": agent_2.name, "wins": wins, "losses": losses,
+                             "elo": elo, "error": error, "llr": llr, "decision": decision})
+            print("\tResult: {} to {}\tElo {:+.0f} +/- {:.0f}\t{}".format(
+                int(wins), int(losses), elo, error,
+                {"H1": "stronger", "H0": "not stronger", None: "inconclusive"}[decision]))
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+    wins = sum(outcome["wins"] for outcome in outcomes)
+    total = sum(outcome["wins"] + outcome["losses"] for outcome in outcomes)
+    return 100. * wins / total, outcomes
+
+
 def main():
 
+    parser = argparse.ArgumentParser(description=DESCRIPTION,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="board",
+                        help="board implementation used to play the matches")
+    parser.add_argument("--tt-size", type=float, default=0, metavar="MB",
+                        help="transposition table size of the agents under test")
+    parser.add_argument("--method", choices=["alphabeta", "pvs"], default="alphabeta",
+                        help="search method of the agents under test")
+    parser.add_argument("--move-ordering", action="store_true",
+                        help="enable hash/killer/history move ordering for the agents under test")
+    parser.add_argument("--book", default=None, metavar="PATH",
+                        help="opening book file (see opening_book.py) for the agents under test")
+    parser.add_argument("--endgame", type=int, default=0, metavar="CELLS",
+                        help="solve separated endgames with at most CELLS open cells exactly "
+                             "for the agents under test")
+    parser.add_argument("--ponder", action="store_true",
+                        help="let the agents under test search on their opponents' time "
+                             "(only without --workers)")
+    parser.add_argument("--workers", type=int, default=1, metavar="N",
+                        help="number of matches to play in parallel (at most one per core)")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="seed of the random openings, to reproduce a tournament")
+    parser.add_argument("--record", default=None, metavar="PATH",
+                        help="append every game to a game record file")
+    parser.add_argument("--sprt", action="store_true",
+                        help="play each opponent until an SPRT decides instead of NUM_MATCHES times")
+    parser.add_argument("--elo0", type=float, default=0.,
+                        help="Elo advantage under H0 (SPRT)")
+    parser.add_argument("--elo1", type=float, default=100.,
+                        help="Elo advantage under H1 (SPRT)")
+    parser.add_argument("--alpha", type=float, default=0.05,
+                        help="probability of accepting H1 when H0 holds (SPRT)")
+    parser.add_argument("--beta", type=float, default=0.05,
+                        help="probability of accepting H0 when H1 holds (SPRT)")
+    parser.add_argument("--max-matches", type=positive_int, default=50,
+                        help="matches against one opponent after which an SPRT is abandoned")
+    args = parser.parse_args()
+
     HEURISTICS = [("Null", null_score),
                   ("Open", open_move_score),
                   ("Improved", improved_score)]
     AB_ARGS = {"search_depth": 5, "method": 'alphabeta', "iterative": False}
     MM_ARGS = {"search_depth": 3, "method": 'minimax', "iterative": False}
-    CUSTOM_ARGS = {"method": 'alphabeta', 'iterative': True}
+    CUSTOM_ARGS = {"method": args.method, 'iterative': True, 'tt_size_mb': args.tt_size,
+                   'move_ordering': args.move_ordering, 'book': args.book,
+                   'endgame_cells': args.endgame, 'ponder': args.ponder}
 
     # Create a collection of CPU agents using fixed-depth minimax or alpha beta
     # search, or random selection.  The agent names encode the search method
@@ -164,18 +494,39 @@ def main():
                    Agent(CustomPlayer(score_fn=custom_score, **CUSTOM_ARGS), "Student")]
 
     print(DESCRIPTION)
-    for agentUT in test_agents:
-        print("")
-        print("*************************")
-        print("{:^25}".format("Evaluating: " + agentUT.name))
-        print("*************************")
-
-        agents = random_agents + mm_agents + ab_agents + [agentUT]
-        win_ratio = play_round(agents, NUM_MATCHES)
-
-        print("\n\nResults:")
-        print("----------")
-        print("{!s:<15}{:>10.2f}%".format(agentUT.name, win_ratio))
+    # the games are recorded as they end, and the file closed on any exit
+    with RecordWriter(args.record) if args.record else nullcontext() as recorder:
+        for agentUT in test_agents:
+            print("")
+            print("*************************")
+            print("{:^25}".format("Evaluating: " + agentUT.name))
+            print("*************************")
+
+            agents = random_agents + mm_agents + ab_agents + [agentUT]
+            try:
+                if args.sprt:
+                    win_ratio, outcomes = play_round_sprt(
+                        agents, ENGINES[args.engine], args.workers, args.seed, args.elo0,
+                        args.elo1, args.alpha, args.beta, args.max_matches, recorder)
+                else:
+                    win_ratio = play_round(agents, NUM_MATCHES, ENGINES[args.engine],
+                                           args.workers, args.seed, recorder)
+            finally:
+                agentUT.player.close()
+
+            print("\n\nResults:")
+            print("----------")
+            print("{!s:<15}{:>10.2f}%".format(agentUT.name, win_ratio))
+            if args.sprt:
+                games = sum(outcome["wins"] + outcome["losses"] for outcome in outcomes)
+                print("{} games; Elo difference to each opponent (95% interval):".format(games))
+                for outcome in outcomes:
+                    print("  {opponent:<12}{elo:>+8.0f} +/- {error:<6.0f}LLR {llr:+.2f}".format(**outcome))
+
+            tt = agentUT.player.tt
+            if tt is not None:
+                print("Transposition table: {} hits, {} misses, {} stores, {} overwrites".format(
+                    tt.hits, tt.misses, tt.stores, tt.overwrites))
 
 
 if __name__ == "__main__":
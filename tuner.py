@@ -0,0 +1,318 @@
+"""
+Tune the weights of a linear heuristic on a dataset of self-play positions
+(see datagen.py) by logistic regression against the game results, in the
+manner of Texel tuning: the heuristic value of a position, passed through
+the logistic function, is fitted to the probability that the player to move
+wins the game.
+
+The features of all the positions are computed with NumPy from the memory-
+mapped shards, without building boards. The features are small integers,
+so a single pass over the data reduces it to a table of the distinct
+feature vectors with their number of positions and wins, and the fit runs
+on that table: tens of millions of positions cost one pass.
+
+The weights are written to a JSON file that `load_score()` turns into a
+score function for `CustomPlayer(score_fn=...)`.
+
+Usage:
+
+    python tuner.py positions/ --features custom --output weights.json
+"""
+
+import argparse
+import json
+
+import numpy as np
+
+from datagen import load_shards
+from isolation.batch import mobility_batch
+from isolation.batch import register_batch
+from isolation.tables import get_geometry
+
+# features of a game state from the point of view of a player
+FEATURES = ("own_moves", "opp_moves", "distance")
+
+# feature sets of the hand-tuned heuristics, with their weights: the linear
+# parts of custom_score_weighted and custom_score
+PRESETS = {"weighted": (("own_moves", "opp_moves"), (9.0, -1.0)),
+           "custom": (("own_moves", "opp_moves", "distance"), (0.1, -0.9, -0.01))}
+
+CHUNK = 1 << 20  # positions whose features are computed at once
+
+
+class LinearScore(object):
+    """
+    A heuristic that is a weighted sum of features (see FEATURES), with
+    +/-inf for won and lost game states. It is a batch heuristic (see
+    `isolation.batch`) when it only uses the move counts.
+
+    Parameters
+    ----------
+    features : sequence<str>
+        The names of the features.
+
+    weights : sequence<float>
+        The weight of each feature.
+    """
+
+    def __init__(self, features, weights):
+        self.features = tuple(features)
+        self.weights = tuple(float(weight) for weight in weights)
+        self._weights = dict(zip(self.features, self.weights))
+        if set(self.features) <= {"own_moves", "opp_moves"}:
+            register_batch(self, mobility_batch(self, self._mobility_values))
+
+    def __call__(self, game, player):
+        if game.is_winner(player):
+            return float("inf")
+
+        if game.is_loser(player):
+            return float("-inf")
+
+        weights = self._weights
+        opponent = game.get_opponent(player)
+        score = 0.
+        if "own_moves" in weights:
+            score += weights["own_moves"] * len(game.get_legal_moves(player))
+        if "opp_moves" in weights:
+            score += weights["opp_moves"] * len(game.get_legal_moves(opponent))
+        if "distance" in weights:
+            own_pos = game.get_player_location(player)
+            opp_pos = game.get_player_location(opponent)
+            # the expression of custom_score, kept so the feature matches it
+            dist = (own_pos[0] - opp_pos[0])^2 + (own_pos[1] - opp_pos[1])^2
+            score += weights["distance"] * dist
+        return score
+
+    def _mobility_values(self, own, opp):
+        return (self._weights.get("own_moves", 0.) * own +
+                self._weights.get("opp_moves", 0.) * opp)
+
+    def __reduce__(self):
+        # the batch version is a closure; rebuild it instead of pickling it
+        return LinearScore, (self.features, self.weights)
+
+    def __repr__(self):
+        return "LinearScore({!r}, {!r})".format(self.features, self.weights)
+
+
+def load_score(path):
+    """ Return the LinearScore of a weights file written by `tune()` """
+    with open(path) as f:
+        tuned = json.load(f)
+    return LinearScore(tuned["features"], tuned["weights"])
+
+
+def popcount(values):
+    """ Return the number of set bits of each element of a uint64 array """
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values).astype(np.int64)
+    bits = np.unpackbits(values.view(np.uint8).reshape(-1, 8), axis=1)
+    return bits.sum(axis=1, dtype=np.int64)
+
+
+def position_features(positions, features):
+    """
+    Compute the features of positions from the point of view of the player
+    to move.
+
+    Parameters
+    ----------
+    positions : numpy.ndarray
+        Records of `datagen.POSITION_DTYPE`, all on boards of one size and
+        with both players on the board.
+
+    features : sequence<str>
+        The names of the features.
+
+    Returns
+    ----------
+    numpy.ndarray
+        An integer array with one row per position and one column per
+        feature.
+    """
+    width, height = int(positions["width"][0]), int(positions["height"][0])
+    masks = np.array(get_geometry(width, height).masks, dtype=np.uint64)
+    open_cells = ~positions["blocked"] & np.uint64((1 << width * height) - 1)
+    first = positions["active"] == 0
+    own = np.where(first, positions["location_1"], positions["location_2"]).astype(np.int64)
+    opp = np.where(first, positions["location_2"], positions["location_1"]).astype(np.int64)
+
+    columns = []
+    for name in features:
+        if name == "own_moves":
+            columns.append(popcount(masks[own] & open_cells))
+        elif name == "opp_moves":
+            columns.append(popcount(masks[opp] & open_cells))
+        elif name == "distance":
+            rows, cols = own // width - opp // width, own % width - opp % width
+            # custom_score's (dr)^2 + (dc)^2 parses as dr ^ (2 + dc) ^ 2
+            columns.append(np.bitwise_xor(np.bitwise_xor(rows, cols + 2), 2))
+        else:
+            raise ValueError("unknown feature: {}".format(name))
+    return np.stack(columns, axis=1)
+
+
+def feature_table(shards, features, chunk=CHUNK):
+    """
+    Reduce positions to the table of their distinct feature vectors in one
+    pass, skipping positions in which a player has not moved yet.
+
+    Parameters
+    ----------
+    shards : iterable<numpy.ndarray>
+        Arrays of `datagen.POSITION_DTYPE` records, e.g., memory-mapped
+        shards.
+
+    features : sequence<str>
+        The names of the features.
+
+    chunk : int (optional)
+        The number of positions processed at once, which bounds the memory
+        used.
+
+    Returns
+    ----------
+    (numpy.ndarray, numpy.ndarray, numpy.ndarray)
+        The distinct feature vectors (one per row), and for each of them
+        the number of positions and the number won by the player to move.
+    """
+    counts = {}
+    for shard in shards:
+        for start in range(0, len(shard), chunk):
+            positions = np.asarray(shard[start:start + chunk])
+            positions = positions[(positions["location_1"] >= 0) &
+                                  (positions["location_2"] >= 0)]
+            if not len(positions):
+                continue
+            values = position_features(positions, features)
+            won = (positions["winner"] == positions["active"]).astype(np.int64)
+            # features fit in a byte each, so a vector packs into one int64
+            keys = np.zeros(len(values), dtype=np.int64)
+            for column in range(values.shape[1]):
+                keys = keys * 256 + (values[:, column] + 128)
+            unique, inverse = np.unique(keys, return_inverse=True)
+            totals = np.bincount(inverse, minlength=len(unique))
+            wins = np.bincount(inverse, weights=won, minlength=len(unique))
+            for key, total, win in zip(unique.tolist(), totals.tolist(), wins.tolist()):
+                entry = counts.setdefault(key, [0, 0])
+                entry[0] += total
+                entry[1] += int(win)
+
+    keys = np.array(sorted(counts), dtype=np.int64)
+    values = np.empty((len(keys), len(features)), dtype=np.int64)
+    remainder = keys.copy()
+    for column in reversed(range(len(features))):
+        values[:, column] = remainder % 256 - 128
+        remainder //= 256
+    totals = np.array([counts[key][0] for key in keys.tolist()], dtype=np.float64)
+    wins = np.array([counts[key][1] for key in keys.tolist()], dtype=np.float64)
+    return values, totals, wins
+
+
+def log_loss(design, totals, wins, coefficients):
+    """ Return the mean cross-entropy of the logistic model on the table """
+    logits = design @ coefficients
+    # log(1 + e^x), computed without overflow
+    softplus = np.logaddexp(0., logits)
+    return float(np.sum(totals * softplus - wins * logits) / np.sum(totals))
+
+
+def fit_logistic(design, totals, wins, l2=1e-6, iterations=50, tolerance=1e-10):
+    """
+    Fit a logistic regression to grouped data by Newton's method.
+
+    Parameters
+    ----------
+    design : numpy.ndarray
+        One row of regressors per group.
+
+    totals, wins : numpy.ndarray
+        The number of observations and of successes of each group.
+
+    l2 : float (optional)
+        The weight of an L2 penalty, relative to the number of observations,
+        which keeps the fit finite when the data are separable.
+
+    Returns
+    ----------
+    numpy.ndarray
+        The coefficients.
+    """
+    design = np.asarray(design, dtype=np.float64)
+    count = np.sum(totals)
+    penalty = l2 * count * np.eye(design.shape[1])
+    coefficients = np.zeros(design.shape[1])
+    for _ in range(iterations):
+        p = 1. / (1. + np.exp(-(design @ coefficients)))
+        gradient = design.T @ (totals * p - wins) + penalty @ coefficients
+        hessian = (design.T * (totals * p * (1. - p))) @ design + penalty
+        step = np.linalg.solve(hessian, gradient)
+        coefficients -= step
+        if np.max(np.abs(step)) < tolerance:
+            break
+    return coefficients
+
+
+def tune(directory, features, baseline=None, output=None):
+    """
+    Fit the weights of `features` on the dataset in `directory`.
+
+    The fit includes an intercept for the advantage of being the player to
+    move, which is not exported: the heuristic is compared between game
+    states at the same depth, where it is the same for every state. When
+    `baseline` weights are given, the hand-tuned heuristic is fitted with
+    its weights scaled by a single factor (as in Texel tuning) so that the
+    two fits can be compared.
+
+    Returns
+    ----------
+    dict
+        The features, weights, intercept, log loss and number of positions
+        (and the loss and scale of the baseline), as written to `output`.
+    """
+    values, totals, wins = feature_table(load_shards(directory), features)
+    if not len(values):
+        raise ValueError("{} holds no positions with both players on the board".format(
+            directory))
+    ones = np.ones((len(values), 1))
+    design = np.hstack([values, ones])
+    coefficients = fit_logistic(design, totals, wins)
+    result = {"features": list(features), "weights": coefficients[:-1].tolist(),
+              "intercept": float(coefficients[-1]),
+              "loss": log_loss(design, totals, wins, coefficients),
+              "positions": int(np.sum(totals))}
+
+    if baseline is not None:
+        scaled = np.hstack([values @ np.asarray(baseline, dtype=np.float64)[:, None], ones])
+        scale = fit_logistic(scaled, totals, wins)
+        result["baseline"] = {"weights": list(baseline), "scale": float(scale[0]),
+                              "loss": log_loss(scaled, totals, wins, scale)}
+
+    if output is not None:
+        with open(output, "w") as f:
+            json.dump(result, f, indent=1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", help="directory of the dataset shards (see datagen.py)")
+    parser.add_argument("--features", choices=sorted(PRESETS), default="custom",
+                        help="feature set, compared to the hand-tuned heuristic using it")
+    parser.add_argument("--output", default=None, metavar="PATH",
+                        help="file to write the weights to")
+    args = parser.parse_args()
+
+    features, baseline = PRESETS[args.features]
+    result = tune(args.directory, features, baseline, args.output)
+    print("{} positions".format(result["positions"]))
+    for name, weight, hand in zip(features, result["weights"], baseline):
+        print("  {:<10}{:>+10.4f}   (hand-tuned {:+g})".format(name, weight, hand))
+    print("log loss {:.5f}, hand-tuned weights {:.5f} (scale {:.4f})".format(
+        result["loss"], result["baseline"]["loss"], result["baseline"]["scale"]))
+
+
+if __name__ == "__main__":
+    main()